@@ -0,0 +1,130 @@
+"""
+Admission control for POST /webhook and /webhook/batch
+
+Every check here runs on the request line and headers only, before the body
+is read or parsed, so a flood of junk POSTs is refused for the price of a
+set lookup instead of a JSON parse and a store write:
+
+    IPAllowlist  - source addresses allowed to send alerts (e.g. TradingView's
+                   alert servers), precomputed into a set; CIDR ranges are
+                   only consulted when configured
+    client_ip    - the source address, taken from X-Forwarded-For when the
+                   app sits behind a known number of proxies (Render has one)
+    RateLimiter  - a token bucket per source address: O(1) per request, and
+                   at most `max_sources` buckets, least recently used dropped
+                   first
+
+The shared-secret check itself is a hmac.compare_digest in app.py.
+
+An evicted source gets a full bucket back, so under more than `max_sources`
+senders the limit is approximate; with an allowlist in front that can't
+happen.
+"""
+import ipaddress
+import threading
+import time
+from collections import OrderedDict
+
+# The addresses TradingView sends webhook alerts from
+TRADINGVIEW_IPS = ('52.89.214.238', '34.212.75.30', '54.218.53.128', '52.32.178.7')
+
+DEFAULT_RATE_BURST = 50
+DEFAULT_MAX_SOURCES = 10000
+
+
+def parse_allowlist(value):
+    """IPAllowlist for a comma-separated list of addresses and CIDR ranges ('tradingview' = TRADINGVIEW_IPS)"""
+    entries = []
+    for item in (value or '').split(','):
+        item = item.strip()
+        if item.lower() == 'tradingview':
+            entries.extend(TRADINGVIEW_IPS)
+        elif item:
+            entries.append(item)
+    return IPAllowlist(entries)
+
+
+def client_ip(remote_addr, forwarded_for=None, trusted_proxies=0):
+    """
+    Address of the client behind `trusted_proxies` proxies
+
+    Each proxy appends the address it received the request from to
+    X-Forwarded-For, so the client is that many entries from the end; anything
+    before it was supplied by the client and can't be trusted. Without proxies,
+    or if the header is shorter than expected, it's the socket's peer address.
+    """
+    if trusted_proxies and forwarded_for:
+        hops = forwarded_for.split(',')
+        if len(hops) >= trusted_proxies:
+            return hops[-trusted_proxies].strip()
+    return remote_addr
+
+
+class IPAllowlist:
+    """Addresses (and optionally networks) allowed to send webhooks"""
+
+    def __init__(self, entries):
+        addresses = set()
+        networks = []
+        for entry in entries:
+            try:
+                if '/' in entry:
+                    networks.append(ipaddress.ip_network(entry, strict=False))
+                else:
+                    addresses.add(ipaddress.ip_address(entry))
+            except ValueError:
+                raise ValueError(f"Invalid address or network in WEBHOOK_IP_ALLOWLIST: {entry!r}")
+        self._addresses = frozenset(addresses)
+        # Canonical strings, so the common case is a lookup without parsing
+        self._strings = frozenset(str(address) for address in addresses)
+        self._networks = tuple(networks)
+
+    def __bool__(self):
+        return bool(self._addresses or self._networks)
+
+    def allows(self, address):
+        if address in self._strings:
+            return True
+        if not address or (not self._networks and ':' not in address):
+            return False  # A peer's IPv4 address is already canonical: no need to parse it
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        if ip.version == 6 and ip.ipv4_mapped is not None:
+            ip = ip.ipv4_mapped  # ::ffff:a.b.c.d from a dual-stack socket
+        return ip in self._addresses or any(ip in network for network in self._networks)
+
+
+class RateLimiter:
+    """Token bucket per source: `rate` requests per second on average, bursts of up to `burst`"""
+
+    def __init__(self, rate, burst=DEFAULT_RATE_BURST, max_sources=DEFAULT_MAX_SOURCES):
+        if rate <= 0 or burst < 1 or max_sources < 1:
+            raise ValueError("rate must be positive, burst and max_sources at least 1")
+        self.rate = rate
+        self.burst = burst
+        self.max_sources = max_sources
+        self._buckets = OrderedDict()  # source -> [tokens, last refill (monotonic)], least recently used first
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def take(self, source):
+        """Spend one of `source`'s tokens; returns 0 if it had one, else seconds until it will"""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(source)
+            if bucket is None:
+                if len(self._buckets) >= self.max_sources:
+                    self._buckets.popitem(last=False)
+                bucket = self._buckets[source] = [self.burst, now]
+            else:
+                self._buckets.move_to_end(source)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0
+            return (1 - bucket[0]) / self.rate
@@ -0,0 +1,153 @@
+"""
+Structured parsing of plain-text TradingView alerts
+
+A webhook body that isn't JSON is matched against alert templates, e.g.
+
+    {action} {symbol} at {price}
+
+and the captured fields are stored alongside the original text, so bots get
+`action`/`symbol`/`price` instead of regex-parsing `message` on every poll.
+A template is the alert message as configured in TradingView: `{field}`
+captures one word into `field`, and TradingView placeholders such as
+`{{ticker}}` or `{{close}}` capture the value TradingView substitutes (into
+`symbol` and `price` here; see PLACEHOLDER_FIELDS). Literal text matches
+case-insensitively and any run of whitespace matches any other. `action` must
+be one of buy/sell/long/short/close/exit and `symbol` must look like a
+ticker (upper case, e.g. BTCUSDT, BINANCE:BTCUSDT or ES1!), so ordinary
+sentences such as "Exit now" aren't mistaken for trade signals.
+
+The templates are compiled once, at startup, into one regular expression that
+tries them in order (an alternation), so a message is always parsed by the
+first template that matches it, in a single match call.
+"""
+import re
+
+# Templates used when ALERT_TEMPLATES / ALERT_TEMPLATES_FILE aren't set
+DEFAULT_TEMPLATES = (
+    '{action} {symbol} at {price}',
+    '{action} {symbol} @ {price}',
+    '{action} {quantity} {symbol} at {price}',
+)
+
+# TradingView placeholders and the signal field each one is stored in;
+# others are stored under their own name with dots replaced by underscores
+PLACEHOLDER_FIELDS = {
+    'ticker': 'symbol',
+    'close': 'price',
+    'strategy.order.action': 'action',
+    'strategy.order.contracts': 'quantity',
+    'strategy.order.price': 'price',
+    'strategy.order.id': 'order_id',
+    'strategy.order.comment': 'comment',
+    'strategy.market_position': 'market_position',
+}
+
+# Fields converted to numbers, and the pattern each special field accepts
+NUMERIC_FIELDS = frozenset({'price', 'quantity', 'open', 'high', 'low', 'volume'})
+_NUMBER = r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?'
+_FIELD_PATTERNS = {
+    'action': r'buy|sell|long|short|close|exit',
+    # Case-sensitive inside the case-insensitive template: an optional
+    # exchange prefix, then upper-case letters, digits and . _ / ! -, with
+    # at least one letter
+    'symbol': r'(?-i:(?=[^\s,;]*[A-Z])(?:[A-Z0-9_]+:)?[A-Z0-9][A-Z0-9._/!-]*)',
+}
+_WORD = r'\S+'
+
+_PLACEHOLDER = re.compile(r'\{\{\s*([\w.]+)\s*\}\}|\{(\w+)\}')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def load_templates(text=None, path=None):
+    """
+    Templates from `text` (one per line) and/or a file at `path`
+
+    Blank lines and lines starting with '#' are skipped. Returns
+    DEFAULT_TEMPLATES when neither is given.
+    """
+    if text is None and path is None:
+        return list(DEFAULT_TEMPLATES)
+    lines = text.splitlines() if text else []
+    if path:
+        with open(path, encoding='utf-8') as f:
+            lines.extend(f.read().splitlines())
+    return [line.strip() for line in lines if line.strip() and not line.lstrip().startswith('#')]
+
+
+def _compile(template):
+    """Regex source for one template and the fields it captures, in order"""
+    parts = []
+    fields = []
+    position = 0
+    for match in _PLACEHOLDER.finditer(template):
+        parts.append(_literal(template[position:match.start()]))
+        if match.group(1) is not None:
+            name = match.group(1)
+            field = PLACEHOLDER_FIELDS.get(name, name.replace('.', '_'))
+        else:
+            field = match.group(2)
+        if field in fields:
+            raise ValueError(f"Alert template {template!r} captures {field!r} twice")
+        if field in NUMERIC_FIELDS:
+            pattern = _NUMBER
+        else:
+            pattern = _FIELD_PATTERNS.get(field, _WORD)
+        parts.append(f'({pattern})')
+        fields.append(field)
+        position = match.end()
+    parts.append(_literal(template[position:]))
+    if not fields:
+        raise ValueError(f"Alert template {template!r} has no {{field}} or {{{{placeholder}}}}")
+    return ''.join(parts), fields
+
+
+def _literal(text):
+    return r'\s+'.join(re.escape(word) for word in _WHITESPACE.split(text)) if text else ''
+
+
+def _number(text):
+    """int or float for text matched by _NUMBER"""
+    if '.' in text or 'e' in text or 'E' in text:
+        return float(text)
+    return int(text)
+
+
+def _convert(field):
+    """How a captured field is stored: a number, an upper-case action, or the text as is"""
+    if field in NUMERIC_FIELDS:
+        return _number
+    if field == 'action':
+        return str.upper
+    return None
+
+
+class AlertTemplates:
+    """Compiled set of alert templates; parse() turns alert text into fields"""
+
+    def __init__(self, templates):
+        self.templates = list(templates)
+        alternatives = []
+        # Group number of each template's own group -> (first field group, last + 1, [(field, conversion)])
+        self._fields = {}
+        group = 1
+        for template in self.templates:
+            source, fields = _compile(template)
+            alternatives.append(f'({source})')
+            self._fields[group] = (group, group + len(fields), [(field, _convert(field)) for field in fields])
+            group += len(fields) + 1
+        self._regex = re.compile('|'.join(alternatives), re.IGNORECASE) if alternatives else None
+
+    def __len__(self):
+        return len(self.templates)
+
+    def parse(self, message):
+        """The fields `message` matches, or None if no template matches it (the first template that does wins)"""
+        if self._regex is None:
+            return None
+        match = self._regex.fullmatch(message.strip())
+        if match is None:
+            return None
+        # The template's own group encloses its fields, so it is the last to close
+        first, last, fields = self._fields[match.lastindex]
+        return {field: value if convert is None else convert(value)
+                for (field, convert), value in zip(fields, match.groups()[first:last])}
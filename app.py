@@ -1,143 +1,907 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from datetime import datetime
+import atexit
+import hmac
+import math
 import threading
+import time
 import json
 import os
 import logging
 
+import metrics
+import wire_formats
+from signal_codec import encode_signal, signals_body
+from signal_expiry import SignalTTL, parse_strategy_ttls
+from storage_backends import StoreFullError, create_backend
+from signal_stream import SignalBroadcaster
+from consumer_groups import ConsumerGroups, SignalFeed, timestamp_seconds
+from dedup import DedupIndex, digest
+from alert_templates import AlertTemplates, load_templates
+from admission import RateLimiter, client_ip, parse_allowlist
+from latest_signals import LatestSignals
+from push_delivery import PushDispatcher
+
 app = Flask(__name__)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# In-memory storage for signals
-MAX_SIGNALS = 1000
-_signals = []  # List to store signals (most recent first)
-_signals_lock = threading.Lock()  # Thread lock for thread-safe operations
+# Signal storage: in-memory by default, or Redis with SIGNALS_BACKEND=redis
+MAX_SIGNALS = int(os.environ.get('MAX_SIGNALS', 1000))
+SIGNALS_BACKEND = os.environ.get('SIGNALS_BACKEND', 'memory')
+# Optional durable mode for the memory backend: write-ahead log replayed on startup
+SIGNALS_WAL_DIR = os.environ.get('SIGNALS_WAL_DIR')
+SIGNALS_WAL_FSYNC = os.environ.get('SIGNALS_WAL_FSYNC', 'group')
+# What to do when the store is full: drop-oldest, reject (429) or spill (to disk)
+SIGNALS_OVERFLOW = os.environ.get('SIGNALS_OVERFLOW', 'drop-oldest')
+# Optional memory budget for the memory backend, in bytes (0 = count limit only).
+# It applies separately to the queue, the consumer-group feed and the
+# /signals/stream replay buffer, each of which retains up to MAX_SIGNALS signals
+MAX_SIGNALS_BYTES = int(os.environ.get('MAX_SIGNALS_BYTES', 0))
+# Where spill files go (default: the system temp directory)
+SIGNALS_SPILL_DIR = os.environ.get('SIGNALS_SPILL_DIR')
+# Optional time-to-live for queued signals (memory backend only, see
+# signal_expiry.py): the number of seconds in the alert's SIGNAL_TTL_FIELD
+# field if set, else its strategy's SIGNAL_TTL_BY_STRATEGY entry
+# ("RSIStrategy=300,MACD=60"), else SIGNAL_TTL_SECONDS (0 = never expire)
+SIGNAL_TTL_SECONDS = float(os.environ.get('SIGNAL_TTL_SECONDS', 0))
+SIGNAL_TTL_BY_STRATEGY = parse_strategy_ttls(os.environ.get('SIGNAL_TTL_BY_STRATEGY'))
+SIGNAL_TTL_FIELD = os.environ.get('SIGNAL_TTL_FIELD') or None
+_signal_ttl = SignalTTL(SIGNAL_TTL_SECONDS, SIGNAL_TTL_BY_STRATEGY, SIGNAL_TTL_FIELD)
+_store = create_backend(SIGNALS_BACKEND, capacity=MAX_SIGNALS,
+                        wal_dir=SIGNALS_WAL_DIR, wal_fsync=SIGNALS_WAL_FSYNC,
+                        overflow=SIGNALS_OVERFLOW, max_bytes=MAX_SIGNALS_BYTES,
+                        spill_dir=SIGNALS_SPILL_DIR,
+                        ttl=_signal_ttl or None)  # Served most recent first
+atexit.register(_store.close)
+
+# Largest batch accepted by POST /webhook/batch
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 1000))
+
+# Long polling (GET /signals?wait=N) holds a gunicorn thread while it waits, so
+# cap both the wait and the number of concurrent waiters. Once every slot is
+# taken, further requests return immediately like a normal poll, which keeps
+# the remaining threads free for /webhook (TradingView's 3 second deadline).
+LONG_POLL_MAX_WAIT = float(os.environ.get('LONG_POLL_MAX_WAIT', 25))  # < gunicorn --timeout
+LONG_POLL_MAX_WAITERS = int(os.environ.get('LONG_POLL_MAX_WAITERS', 4))
+_long_poll_slots = threading.BoundedSemaphore(LONG_POLL_MAX_WAITERS)
+
+# GET /signals answers in JSON, NDJSON or MessagePack (Accept header), and
+# gzip/deflate-compresses bodies of at least SIGNALS_COMPRESS_MIN_BYTES when
+# the client accepts it (0 = never compress)
+SIGNALS_COMPRESS_MIN_BYTES = int(os.environ.get('SIGNALS_COMPRESS_MIN_BYTES', 1400))
+SIGNALS_COMPRESS_LEVEL = int(os.environ.get('SIGNALS_COMPRESS_LEVEL', 6))  # zlib level, 1 (fast) to 9
+
+# Server-Sent Events push stream (GET /signals/stream). Each open stream also
+# holds a thread, so the number of concurrent subscribers is capped as well.
+STREAM_MAX_SUBSCRIBERS = int(os.environ.get('STREAM_MAX_SUBSCRIBERS', 2))
+STREAM_HEARTBEAT_INTERVAL = float(os.environ.get('STREAM_HEARTBEAT_INTERVAL', 15))
+STREAM_BUFFER_SIZE = int(os.environ.get('STREAM_BUFFER_SIZE', 256))  # Per subscriber
+_broadcaster = SignalBroadcaster(replay_size=MAX_SIGNALS, buffer_size=STREAM_BUFFER_SIZE,
+                                 max_subscribers=STREAM_MAX_SUBSCRIBERS, max_bytes=MAX_SIGNALS_BYTES)
+
+# Consumer groups (GET /signals?group=<name>): each named group gets every
+# signal once, under a lease it must ack before CONSUMER_LEASE_SECONDS or the
+# signals are redelivered. Groups read from a feed retaining MAX_SIGNALS signals
+# (and at most MAX_SIGNALS_BYTES of them, if set) and skip signals whose TTL
+# has passed.
+CONSUMER_LEASE_SECONDS = float(os.environ.get('CONSUMER_LEASE_SECONDS', 30))
+CONSUMER_GROUP_MAX = int(os.environ.get('CONSUMER_GROUP_MAX', 100))
+_feed = SignalFeed(retention=MAX_SIGNALS, ttl=_signal_ttl, max_bytes=MAX_SIGNALS_BYTES)
+_groups = ConsumerGroups(_feed, lease_seconds=CONSUMER_LEASE_SECONDS, max_groups=CONSUMER_GROUP_MAX)
+
+# GET /signals/history reads the same feed (the last MAX_SIGNALS signals
+# received, consumed or not) and streams matches HISTORY_PAGE_SIZE at a time
+HISTORY_PAGE_SIZE = int(os.environ.get('HISTORY_PAGE_SIZE', 100))
+
+# Latest signal per symbol (and per symbol and strategy) for GET /signals/latest,
+# kept up to date as signals are stored. Seeded from the queue on startup. At
+# most LATEST_MAX_SYMBOLS symbols, each with up to LATEST_MAX_STRATEGIES
+# strategies, are kept; past that the least recently updated are forgotten
+LATEST_MAX_SYMBOLS = int(os.environ.get('LATEST_MAX_SYMBOLS', 10000))
+LATEST_MAX_STRATEGIES = int(os.environ.get('LATEST_MAX_STRATEGIES', 100))
+_latest = LatestSignals(max_symbols=LATEST_MAX_SYMBOLS, max_strategies=LATEST_MAX_STRATEGIES)
+for _signal in reversed(_store.snapshot()):
+    _latest.update(_signal, encode_signal(_signal))
+
+# Admission control for POST /webhook and /webhook/batch (see admission.py),
+# checked before the body is read so a flood of junk can't take the CPU real
+# alerts need. All off by default.
+# - WEBHOOK_IP_ALLOWLIST: comma-separated addresses / CIDR ranges allowed to
+#   send ('tradingview' = TradingView's alert servers)
+# - WEBHOOK_TRUSTED_PROXIES: proxies in front of the app that append to
+#   X-Forwarded-For (1 on Render); the client address is taken from there
+# - WEBHOOK_SECRET: required as ?token= in the webhook URL (TradingView can't
+#   send custom headers) or in an X-Webhook-Token header
+# - WEBHOOK_RATE_LIMIT: requests per second per source address, in bursts of
+#   up to WEBHOOK_RATE_BURST (0 = unlimited). TradingView sends every alert
+#   from the same four addresses, so leave room for all of your alerts.
+WEBHOOK_IP_ALLOWLIST = os.environ.get('WEBHOOK_IP_ALLOWLIST', '')
+WEBHOOK_TRUSTED_PROXIES = int(os.environ.get('WEBHOOK_TRUSTED_PROXIES', 0))
+WEBHOOK_SECRET = os.environ.get('WEBHOOK_SECRET') or None
+WEBHOOK_RATE_LIMIT = float(os.environ.get('WEBHOOK_RATE_LIMIT', 0))
+WEBHOOK_RATE_BURST = int(os.environ.get('WEBHOOK_RATE_BURST', 50))
+_webhook_allowlist = parse_allowlist(WEBHOOK_IP_ALLOWLIST) or None
+_webhook_secret = WEBHOOK_SECRET.encode() if WEBHOOK_SECRET else None
+_webhook_limiter = (RateLimiter(WEBHOOK_RATE_LIMIT, WEBHOOK_RATE_BURST,
+                                int(os.environ.get('WEBHOOK_RATE_MAX_SOURCES', 10000)))
+                    if WEBHOOK_RATE_LIMIT > 0 else None)
+
+# Webhook deduplication: a signal whose key was seen in the last
+# DEDUP_WINDOW_SECONDS is acknowledged but not stored (0 disables). The key is
+# the Idempotency-Key header, else the DEDUP_KEY_FIELD field of the signal
+# (e.g. an alert id), else - only with DEDUP_CONTENT_HASH=true - a hash of the
+# body, which catches TradingView retries and alerts that fire twice.
+DEDUP_WINDOW_SECONDS = float(os.environ.get('DEDUP_WINDOW_SECONDS', 60))
+DEDUP_MAX_KEYS = int(os.environ.get('DEDUP_MAX_KEYS', 100000))
+DEDUP_KEY_FIELD = os.environ.get('DEDUP_KEY_FIELD') or None
+DEDUP_CONTENT_HASH = os.environ.get('DEDUP_CONTENT_HASH', 'False').lower() == 'true'
+_dedup = DedupIndex(DEDUP_WINDOW_SECONDS, DEDUP_MAX_KEYS) if DEDUP_WINDOW_SECONDS > 0 else None
+
+# Push delivery (see push_delivery.py): every stored signal is also POSTed, in
+# batches, by background threads to the comma-separated PUSH_DESTINATIONS URLs
+# and to destinations registered with POST /destinations. Registration
+# requires PUSH_REGISTRATION_TOKEN (as a bearer token) and is off without it.
+# Signals whose TTL passes before a delivery attempt are dropped, not pushed.
+PUSH_DESTINATIONS = [url.strip() for url in os.environ.get('PUSH_DESTINATIONS', '').split(',') if url.strip()]
+PUSH_REGISTRATION_TOKEN = os.environ.get('PUSH_REGISTRATION_TOKEN') or None
+_push = PushDispatcher(workers=int(os.environ.get('PUSH_WORKERS', 4)),
+                       batch_size=int(os.environ.get('PUSH_BATCH_SIZE', 100)),
+                       batch_delay=float(os.environ.get('PUSH_BATCH_DELAY', 0.005)),
+                       max_retries=int(os.environ.get('PUSH_MAX_RETRIES', 5)),
+                       timeout=float(os.environ.get('PUSH_TIMEOUT', 5)),
+                       queue_size=int(os.environ.get('PUSH_QUEUE_SIZE', 10000)),
+                       ttl=_signal_ttl or None)
+for _url in PUSH_DESTINATIONS:
+    _push.register(_url)
+atexit.register(_push.close)
+
+# Plain-text alerts are matched against templates such as
+# "{action} {symbol} at {price}" at ingest (see alert_templates.py), one per
+# line in ALERT_TEMPLATES and/or ALERT_TEMPLATES_FILE. ALERT_TEMPLATES=''
+# turns parsing off; unset, a few common formats are recognized.
+ALERT_TEMPLATES = os.environ.get('ALERT_TEMPLATES')
+ALERT_TEMPLATES_FILE = os.environ.get('ALERT_TEMPLATES_FILE')
+_alert_templates = AlertTemplates(load_templates(ALERT_TEMPLATES, ALERT_TEMPLATES_FILE))
+
+# Metrics (GET /metrics, Prometheus text format). Stage histograms are observed
+# on the request path; depth, drops and oldest age are read when scraped.
+_metrics = metrics.Registry()
+_stage_latency = {
+    stage: _metrics.histogram('signals_stage_duration_seconds',
+                              'Time spent in each stage of handling a webhook or poll', stage=stage)
+    for stage in ('parse', 'timestamp', 'lock_wait', 'store', 'pop', 'serialize')
+}
+_request_latency = {
+    endpoint: _metrics.histogram('signals_request_duration_seconds',
+                                 'Time spent in the view (long-polling requests are not included)',
+                                 endpoint=endpoint)
+    for endpoint in ('webhook', 'signals')
+}
+_signals_received = _metrics.counter('signals_received', 'Signals stored')
+_signals_served = _metrics.counter('signals_served', 'Signals removed from the queue by GET /signals')
+_webhook_refused = {
+    reason: _metrics.counter('signals_webhook_refused', 'Webhook requests refused before their body was read',
+                             reason=reason)
+    for reason in ('address', 'rate_limit', 'token')
+}
+_signals_duplicate = _metrics.counter('signals_duplicate', 'Webhook signals acknowledged but not stored as duplicates')
+_metrics.gauge('signals_dedup_keys', 'Keys in the deduplication index',
+               fn=lambda: len(_dedup) if _dedup is not None else None)
+_metrics.counter('signals_dropped', 'Signals discarded because the queue was full',
+                 fn=lambda: _store.dropped)
+_metrics.counter('signals_rejected', 'Signals refused with 429 because the queue was full',
+                 fn=lambda: _store.rejected)
+_metrics.counter('signals_expired', 'Signals removed from the queue because their TTL passed',
+                 fn=lambda: _store.expired)
+_metrics.gauge('signals_spilled', 'Queued signals currently spilled to disk', fn=lambda: _store.spilled)
+_metrics.gauge('signals_queue_depth', 'Signals waiting in the queue', fn=lambda: len(_store))
+_metrics.gauge('signals_oldest_age_seconds', 'Age of the oldest queued signal', fn=lambda: _store.oldest_age())
+_metrics.counter('signals_pushed', 'Signals delivered to push destinations', fn=lambda: _push.delivered)
+_metrics.counter('signals_push_retries', 'Push batches retried after a failed attempt', fn=lambda: _push.retries)
+_metrics.counter('signals_push_dead_lettered', 'Signals given up on after failed push attempts',
+                 fn=lambda: sum(d.dead_lettered for d in _push.destinations()))
+_metrics.counter('signals_push_dropped', 'Signals dropped because a push destination queue was full',
+                 fn=lambda: sum(d.dropped for d in _push.destinations()))
+_metrics.counter('signals_push_expired', 'Signals dropped from push delivery because their TTL passed',
+                 fn=lambda: _push.expired)
+_metrics.gauge('signals_push_pending', 'Signals waiting for push delivery', fn=lambda: _push.pending())
+_metrics.gauge('signals_consumer_groups', 'Consumer groups in this worker', fn=lambda: len(_groups))
+# Lock wait is only observed when the store's lock was actually contended
+_store.set_lock_wait_observer(_stage_latency['lock_wait'].observe)
 
 def load_signals():
-    """Load signals from in-memory storage"""
-    with _signals_lock:
-        # Return a copy to avoid external modification
-        return _signals.copy()
-
-def pop_signals(count):
-    """Remove and return the most recent signals from in-memory storage (queue behavior)"""
-    with _signals_lock:
-        if not _signals:
-            return []
-        
-        # Get the most recent signals (first N in the list)
-        signals_to_return = _signals[:count]
-        
-        # Remove them from memory
-        _signals[:] = _signals[count:]
-        
-        return signals_to_return
+    """Load signals from storage"""
+    # Returns a copy (most recent first) to avoid external modification
+    return _store.snapshot()
+
+def pop_signals(count, wait=None, symbol=None, strategy=None, encoded=False):
+    """
+    Remove and return the most recent signals from storage (queue behavior)
+
+    Only signals matching `symbol` / `strategy` are removed when given. With
+    `wait` (seconds), block until at least one matching signal is available or
+    the wait expires. With `encoded`, return each signal's cached JSON bytes
+    instead of a dict.
+    """
+    pop = _store.pop_encoded if encoded else _store.pop
+    if wait and wait > 0 and _long_poll_slots.acquire(blocking=False):
+        try:
+            signals = pop(count, timeout=min(wait, LONG_POLL_MAX_WAIT), symbol=symbol, strategy=strategy)
+        finally:
+            _long_poll_slots.release()
+    else:
+        # No wait, or all long-poll slots are busy (don't take another thread hostage)
+        started = time.perf_counter()
+        signals = pop(count, symbol=symbol, strategy=strategy)
+        _stage_latency['pop'].observe(time.perf_counter() - started)
+    if signals:
+        _signals_served.inc(len(signals))
+    return signals
+
+def lease_signals(group, count, wait=None):
+    """
+    Lease up to `count` signals (oldest first) for a consumer group
+
+    Returns (lease, [(seq, signal)], skipped); see ConsumerGroup.fetch. With
+    `wait`, block like pop_signals until a signal is available.
+    """
+    lease, entries, skipped = group.fetch(count)
+    if entries or not wait or wait <= 0 or not _long_poll_slots.acquire(blocking=False):
+        return lease, entries, skipped
+    try:
+        deadline = time.monotonic() + min(wait, LONG_POLL_MAX_WAIT)
+        while not entries:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # Wake up at least once a second to pick up expired leases
+            _feed.wait(group.offset - 1, min(remaining, 1.0))
+            lease, entries, more_skipped = group.fetch(count)
+            skipped += more_skipped
+        return lease, entries, skipped
+    finally:
+        _long_poll_slots.release()
 
 def save_signal(signal_data):
-    """Save a single signal to in-memory storage"""
-    with _signals_lock:
-        # Add signal to the beginning of the list (most recent first)
-        _signals.insert(0, signal_data)
-        
-        # Trim list to keep only the last MAX_SIGNALS
-        if len(_signals) > MAX_SIGNALS:
-            _signals[:] = _signals[:MAX_SIGNALS]
+    """Save a single signal to storage"""
+    started = time.perf_counter()
+    # Serialize once; storage, the WAL and the stream all reuse these bytes
+    encoded = encode_signal(signal_data)
+    # Once the store is full its overflow policy applies (SIGNALS_OVERFLOW);
+    # 'reject' raises StoreFullError
+    _store.push(signal_data, encoded)
+    # Sequence the signal for consumer groups
+    _feed.append(signal_data, encoded)
+    _latest.update(signal_data, encoded)
+    # Hand to push delivery (queued only; background threads do the POSTs)
+    _push.publish(((signal_data, encoded),))
+    # Push to /signals/stream subscribers (non-blocking, bounded per subscriber)
+    _broadcaster.publish(signal_data, encoded)
+    _stage_latency['store'].observe(time.perf_counter() - started)
+    _signals_received.inc()
 
-@app.route('/webhook', methods=['POST'])
-def webhook():
-    """Receive signal from TradingView webhook - optimized for fast response"""
+def save_signals(signals):
+    """Save a batch of signals to storage in one operation"""
+    encoded = [encode_signal(signal_data) for signal_data in signals]
+    _store.push_many(signals, encoded)
+    _feed.append_many(signals, encoded)
+    for signal_data, data in zip(signals, encoded):
+        _latest.update(signal_data, data)
+        _broadcaster.publish(signal_data, data)
+    _push.publish(list(zip(signals, encoded)))
+    _signals_received.inc(len(signals))
+
+def dedup_key(signal_data, content, idempotency_key=None):
+    """
+    Deduplication key of a signal, or None if it shouldn't be deduplicated
+
+    `content` is the bytes hashed when DEDUP_CONTENT_HASH is on.
+    """
+    if _dedup is None:
+        return None
+    if idempotency_key:
+        return digest('header:' + idempotency_key)
+    if DEDUP_KEY_FIELD is not None and signal_data.get(DEDUP_KEY_FIELD) is not None:
+        return digest(f'field:{signal_data[DEDUP_KEY_FIELD]}')
+    if DEDUP_CONTENT_HASH:
+        return digest(content)
+    return None
+
+def serves_compact_json():
+    """True if jsonify writes compact JSON, i.e. cached signal bytes match what it would send"""
+    provider = app.json
+    if not (getattr(provider, 'sort_keys', False) and getattr(provider, 'ensure_ascii', False)):
+        return False
+    return provider.compact or (provider.compact is None and not app.debug)
+
+def signals_response(signals, mimetype, encoded):
+    """
+    GET /signals response in the negotiated format, compressed if the client accepts it
+
+    `signals` are cached JSON bytes when `encoded` (always, for NDJSON and MessagePack), dicts otherwise.
+    """
+    if mimetype == wire_formats.NDJSON:
+        # Streamed: the first lines go out while the rest are joined (and compressed)
+        encoding = wire_formats.choose_encoding(request.accept_encodings, wire_formats.ndjson_size(signals),
+                                                SIGNALS_COMPRESS_MIN_BYTES)
+        chunks = wire_formats.ndjson_chunks(signals)
+        if encoding:
+            chunks = wire_formats.compress_chunks(chunks, encoding, SIGNALS_COMPRESS_LEVEL)
+        response = Response(chunks, mimetype=mimetype)
+    else:
+        if mimetype == wire_formats.MSGPACK:
+            response = Response(wire_formats.msgpack_body(signals), mimetype=mimetype)
+        elif encoded:
+            # Join the bytes encoded at ingest instead of re-serializing each signal
+            response = Response(signals_body(signals), mimetype=app.json.mimetype)
+        else:
+            response = jsonify({'status': 'success', 'count': len(signals), 'signals': signals})
+        encoding = wire_formats.choose_encoding(request.accept_encodings, response.content_length,
+                                                SIGNALS_COMPRESS_MIN_BYTES)
+        if encoding:
+            response.set_data(wire_formats.compress(response.get_data(), encoding, SIGNALS_COMPRESS_LEVEL))
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.update(('Accept', 'Accept-Encoding'))
+    return response
+
+def parse_text_alert(raw_data):
+    """Signal for a plain-text alert: the text plus any fields an alert template captures"""
+    fields = _alert_templates.parse(raw_data)
+    if fields:
+        return {**fields, 'message': raw_data, 'raw': True}
+    return {'message': raw_data, 'raw': True}
+
+def parse_batch(raw_data):
+    """
+    Split a batch body into per-item (signal, error) pairs
+
+    Accepts a JSON array, or newline-delimited JSON (one signal per line).
+    Items are normalized the same way /webhook normalizes a single signal.
+    """
+    items = None
+    if raw_data.lstrip().startswith('['):
+        try:
+            items = [(item, None) for item in json.loads(raw_data)]
+        except (json.JSONDecodeError, ValueError):
+            pass  # Not a valid array; maybe NDJSON whose first line is an array
+    if items is None:
+        items = []
+        for line in raw_data.splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append((json.loads(line), None))
+            except (json.JSONDecodeError, ValueError) as e:
+                items.append((None, f'Invalid JSON: {e}'))
+    
+    parsed = []
+    for item, error in items:
+        if error is None and not item:
+            error = 'No data received'
+        if error is not None:
+            parsed.append((None, error))
+        else:
+            parsed.append((item if isinstance(item, dict) else {'data': item}, None))
+    return parsed
+
+def open_group(group_name, start, symbol=None, strategy=None):
+    """(group, None) for a GET /signals?group= request, or (None, (error payload, status))"""
+    if symbol or strategy:
+        return None, ({'error': 'symbol/strategy filters are not supported with group'}, 400)
+    if not group_name or len(group_name) > 64:
+        return None, ({'error': 'group must be 1-64 characters'}, 400)
+    if start not in ('latest', 'earliest'):
+        return None, ({'error': "start must be 'latest' or 'earliest'"}, 400)
+    group = _groups.get(group_name, create=True, start=start)
+    if group is None:
+        return None, ({'error': 'Too many consumer groups'}, 429)
+    return group, None
+
+def group_payload(group, lease, entries, skipped):
+    """Response payload for signals leased to a consumer group"""
+    return {
+        'status': 'success',
+        'count': len(entries),
+        'group': group.name,
+        'lease_id': lease.id if lease else None,
+        'lease_expires_in': group.lease_seconds if lease else None,
+        'skipped': skipped,
+        'signals': [dict(signal, seq=seq) for seq, signal in entries]
+    }
+
+def parse_history_time(value):
+    """A since/until parameter (Unix seconds or ISO 8601) as a feed index time"""
+    try:
+        moment = datetime.fromtimestamp(float(value))
+    except ValueError:
+        moment = datetime.fromisoformat(value)
+        if moment.tzinfo is not None:
+            # Stored timestamps are naive local time
+            moment = moment.astimezone().replace(tzinfo=None)
+    return timestamp_seconds(moment)
+
+def push_authorization_error():
+    """Error response unless the request carries PUSH_REGISTRATION_TOKEN as a bearer token"""
+    if PUSH_REGISTRATION_TOKEN is None:
+        return jsonify({'error': 'Destination registration is disabled (set PUSH_REGISTRATION_TOKEN)'}), 403
+    supplied = request.headers.get('Authorization', '').encode()
+    if not hmac.compare_digest(supplied, f'Bearer {PUSH_REGISTRATION_TOKEN}'.encode()):
+        return jsonify({'error': 'Invalid or missing bearer token'}), 401
+    return None
+
+def admit_webhook(remote_addr, forwarded_for=None, token=None):
+    """
+    None if a webhook request may proceed, else (payload, status, headers) refusing it
+
+    Only looks at the peer address and headers, so it runs before the body is
+    read. Checks the cheapest and most selective first: allowlist, then the
+    source's rate limit, then the shared secret (constant-time).
+    """
+    if _webhook_allowlist is None and _webhook_limiter is None and _webhook_secret is None:
+        return None
+    source = client_ip(remote_addr, forwarded_for, WEBHOOK_TRUSTED_PROXIES)
+    if _webhook_allowlist is not None and not _webhook_allowlist.allows(source):
+        _webhook_refused['address'].inc()
+        return {'error': 'Source address not allowed'}, 403, {}
+    if _webhook_limiter is not None:
+        retry_after = _webhook_limiter.take(source)
+        if retry_after:
+            _webhook_refused['rate_limit'].inc()
+            return {'error': 'Rate limit exceeded'}, 429, {'Retry-After': str(math.ceil(retry_after))}
+    if _webhook_secret is not None and not hmac.compare_digest((token or '').encode('utf-8', 'replace'),
+                                                               _webhook_secret):
+        _webhook_refused['token'].inc()
+        return {'error': 'Invalid or missing webhook token'}, 401, {}
+    return None
+
+def webhook_admission_error():
+    """Error response if admit_webhook refuses the current request, else None"""
+    refusal = admit_webhook(request.remote_addr, request.headers.get('X-Forwarded-For'),
+                            request.headers.get('X-Webhook-Token') or request.args.get('token'))
+    if refusal is None:
+        return None
+    payload, status, headers = refusal
+    # Don't keep the connection (and a worker thread) for a sender we've just refused
+    return jsonify(payload), status, {**headers, 'Connection': 'close'}
+
+# Response to a signal refused under SIGNALS_OVERFLOW=reject
+QUEUE_FULL = ({
+    'status': 'error',
+    'message': 'Signal queue is full, retry later'
+}, 429, {'Retry-After': '1'})
+
+def receive_webhook(raw, idempotency_key=None):
+    """
+    Parse, timestamp, deduplicate and store one webhook body (bytes)
+
+    Returns (payload, status, headers) for the response. This is all of POST
+    /webhook except HTTP itself, shared by the Flask view and the asyncio
+    server (async_server.py).
+    """
+    started = time.perf_counter()
     try:
-        # Optimized parsing: try JSON first, then fallback to text
+        # JSON if it parses, otherwise a plain-text alert
         signal_data = None
-        
-        # Fast path: try to get JSON directly
-        if request.is_json:
-            signal_data = request.get_json(silent=True, force=False)
-        
-        # If no JSON, try parsing raw data
-        if not signal_data:
-            raw_data = request.get_data(as_text=True)
-            if raw_data:
-                try:
-                    signal_data = json.loads(raw_data)
-                except (json.JSONDecodeError, ValueError):
-                    # Treat as plain text
-                    signal_data = {'message': raw_data, 'raw': True}
-        
+        raw_data = raw.decode('utf-8', 'replace')
+        if raw_data:
+            try:
+                signal_data = json.loads(raw_data)
+            except (json.JSONDecodeError, ValueError):
+                signal_data = parse_text_alert(raw_data)
+
         if not signal_data:
-            return jsonify({'error': 'No data received'}), 400
-        
+            return {'error': 'No data received'}, 400, {}
+
         # Ensure signal_data is a dict
         if not isinstance(signal_data, dict):
             signal_data = {'data': signal_data}
-        
+
+        parsed = time.perf_counter()
+
         # Add timestamp (single datetime.now() call for efficiency)
         now = datetime.now()
         signal_data['timestamp'] = now.isoformat()
         signal_data['received_at'] = now.strftime('%Y-%m-%d %H:%M:%S')
-        
-        # Save signal to in-memory storage
+        stamped = time.perf_counter()
+
+        # Acknowledge retries and double-fired alerts without storing them again
+        key = dedup_key(signal_data, raw, idempotency_key)
+        if key is not None:
+            original_timestamp = _dedup.claim(key, signal_data['timestamp'])
+            if original_timestamp is not None:
+                _signals_duplicate.inc()
+                return {
+                    'status': 'duplicate',
+                    'message': 'Duplicate signal ignored',
+                    'timestamp': original_timestamp
+                }, 200, {}
+
+        # Save signal to storage
         try:
             save_signal(signal_data)
+        except StoreFullError:
+            if key is not None:
+                _dedup.release(key)
+            return QUEUE_FULL
         except Exception as save_err:
+            if key is not None:
+                _dedup.release(key)  # Let TradingView's retry through
             logger.error(f"Error saving signal: {save_err}", exc_info=True)
-            return jsonify({
+            return {
                 'status': 'warning',
                 'message': 'Signal received but storage failed',
                 'error': str(save_err)
-            }), 200
-        
-        # Return quickly (TradingView requires response within 3 seconds)
-        return jsonify({
+            }, 200, {}
+
+        _stage_latency['parse'].observe(parsed - started)
+        _stage_latency['timestamp'].observe(stamped - parsed)
+        return {
             'status': 'success',
             'message': 'Signal received and stored',
             'timestamp': signal_data['timestamp']
-        }), 200
-        
+        }, 200, {}
+
     except Exception as e:
         logger.error(f"Unexpected error processing webhook: {str(e)}", exc_info=True)
+        return {'error': 'Internal server error', 'message': str(e)}, 500, {}
+
+@app.route('/webhook', methods=['POST'])
+def webhook():
+    """Receive signal from TradingView webhook - optimized for fast response"""
+    started = time.perf_counter()
+    # Refuse unwanted senders before reading the body
+    error = webhook_admission_error()
+    if error is not None:
+        return error
+    payload, status, headers = receive_webhook(request.get_data(), request.headers.get('Idempotency-Key'))
+
+    # Return quickly (TradingView requires response within 3 seconds)
+    serialize_started = time.perf_counter()
+    try:
+        response = jsonify(payload)
+    except Exception:
+        return '{"error":"Internal server error"}', 500, {'Content-Type': 'application/json'}
+    if payload.get('status') == 'success':
+        finished = time.perf_counter()
+        _stage_latency['serialize'].observe(finished - serialize_started)
+        _request_latency['webhook'].observe(finished - started)
+    return response, status, headers
+
+@app.route('/webhook/batch', methods=['POST'])
+def webhook_batch():
+    """Receive many signals in one request (JSON array or NDJSON body)"""
+    error = webhook_admission_error()
+    if error is not None:
+        return error
+    try:
+        raw_data = request.get_data(as_text=True)
+        if not raw_data.strip():
+            return jsonify({'error': 'No data received'}), 400
+        
+        items = parse_batch(raw_data)
+        if len(items) > MAX_BATCH_SIZE:
+            return jsonify({'error': f'Batch too large (max {MAX_BATCH_SIZE} signals)'}), 413
+        
+        # One clock read for the whole batch
+        now = datetime.now()
+        timestamp = now.isoformat()
+        received_at = now.strftime('%Y-%m-%d %H:%M:%S')
+        
+        # An Idempotency-Key header covers the whole batch; otherwise each
+        # signal is deduplicated on its own key field / content
+        claimed = []
+        idempotency_key = request.headers.get('Idempotency-Key')
+        batch_key = dedup_key(None, None, idempotency_key) if idempotency_key else None
+        if batch_key is not None:
+            original_timestamp = _dedup.claim(batch_key, timestamp)
+            if original_timestamp is not None:
+                _signals_duplicate.inc(len(items))
+                return jsonify({
+                    'status': 'duplicate',
+                    'message': 'Duplicate batch ignored',
+                    'timestamp': original_timestamp
+                }), 200
+            claimed.append(batch_key)
+        
+        signals = []
+        results = []
+        for index, (signal_data, error) in enumerate(items):
+            if error is not None:
+                results.append({'index': index, 'status': 'error', 'error': error})
+                continue
+            if batch_key is None and _dedup is not None:
+                content = encode_signal(signal_data) if DEDUP_CONTENT_HASH else None
+                key = dedup_key(signal_data, content)
+                if key is not None:
+                    if _dedup.claim(key, timestamp) is not None:
+                        _signals_duplicate.inc()
+                        results.append({'index': index, 'status': 'duplicate'})
+                        continue
+                    claimed.append(key)
+            signal_data['timestamp'] = timestamp
+            signal_data['received_at'] = received_at
+            signals.append(signal_data)
+            results.append({'index': index, 'status': 'stored'})
+        
         try:
-            return jsonify({'error': 'Internal server error', 'message': str(e)}), 500
-        except Exception:
-            return '{"error":"Internal server error"}', 500, {'Content-Type': 'application/json'}
+            save_signals(signals)
+        except StoreFullError:
+            # The batch is refused as a whole
+            for key in claimed:
+                _dedup.release(key)
+            return QUEUE_FULL
+        except Exception as save_err:
+            for key in claimed:
+                _dedup.release(key)
+            logger.error(f"Error saving signal batch: {save_err}", exc_info=True)
+            return jsonify({
+                'status': 'warning',
+                'message': 'Signals received but storage failed',
+                'error': str(save_err)
+            }), 200
+        
+        duplicates = sum(1 for result in results if result['status'] == 'duplicate')
+        return jsonify({
+            'status': 'success' if len(signals) + duplicates == len(items) else 'partial',
+            'received': len(items),
+            'stored': len(signals),
+            'duplicates': duplicates,
+            'timestamp': timestamp,
+            'results': results
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Unexpected error processing webhook batch: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Internal server error', 'message': str(e)}), 500
 
 @app.route('/signals', methods=['GET'])
 def get_signals():
     """Get recent signals for the trading bot and remove them from memory"""
+    started = time.perf_counter()
     try:
         # Get optional query parameters
         limit = request.args.get('limit', default=10, type=int)
+        wait = request.args.get('wait', default=None, type=float)
+        symbol = request.args.get('symbol') or None
+        strategy = request.args.get('strategy') or None
+        group_name = request.args.get('group')
         
-        # Pop signals from memory (removes them after retrieving)
-        recent_signals = pop_signals(limit)
+        if group_name is not None:
+            # Consumer group mode: non-destructive, leased, oldest first
+            group, error = open_group(group_name, request.args.get('start', default='latest'), symbol, strategy)
+            if error is not None:
+                return error
+            lease, entries, skipped = lease_signals(group, limit, wait=wait)
+            return group_payload(group, lease, entries, skipped), 200
         
-        return jsonify({
-            'status': 'success',
-            'count': len(recent_signals),
-            'signals': recent_signals
-        }), 200
+        # Pop signals from storage (removes them after retrieving).
+        # With ?symbol=/?strategy=, only matching signals are removed.
+        # With ?wait=N, hold the request until a signal arrives or N seconds pass.
+        mimetype = wire_formats.choose_format(request.accept_mimetypes)
+        encoded = mimetype != wire_formats.JSON or serves_compact_json()
+        signals = pop_signals(limit, wait=wait, symbol=symbol, strategy=strategy, encoded=encoded)
+        serialize_started = time.perf_counter()
+        response = signals_response(signals, mimetype, encoded)
+        finished = time.perf_counter()
+        _stage_latency['serialize'].observe(finished - serialize_started)
+        if not wait:
+            _request_latency['signals'].observe(finished - started)
+        return response, 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/signals/latest', methods=['GET'])
+def latest_signals():
+    """Latest signal per symbol (or per symbol and strategy), without removing anything"""
+    by = request.args.get('by', default='symbol')
+    if by not in ('symbol', 'strategy'):
+        return jsonify({'error': "by must be 'symbol' or 'strategy'"}), 400
+    symbol = request.args.get('symbol') or None
+    strategy = request.args.get('strategy') or None
+    by_strategy = by == 'strategy' or strategy is not None
+
+    # Unchanged since the client's copy: answer from the version alone
+    etag = _latest.etag(_latest.view_version(by_strategy, symbol, strategy))
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        version, body = _latest.view(by_strategy, symbol, strategy)
+        etag = _latest.etag(version)
+        if serves_compact_json():
+            response = Response(body, mimetype=app.json.mimetype)
+        else:
+            response = jsonify(json.loads(body))
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/signals/history', methods=['GET'])
+def signals_history():
+    """Signals received between since and until, oldest first, without removing them"""
+    try:
+        since = parse_history_time(request.args['since']) if request.args.get('since') else None
+        until = parse_history_time(request.args['until']) if request.args.get('until') else None
+    except (ValueError, OverflowError, OSError):
+        return jsonify({'error': 'since/until must be Unix seconds or an ISO 8601 date and time'}), 400
+    symbol = request.args.get('symbol') or None
+    strategy = request.args.get('strategy') or None
+    limit = request.args.get('limit', default=None, type=int)
+
+    # Bisect the feed's time index; the lock is only held for that
+    first, last = _feed.seq_range(since, until)
+
+    def generate():
+        # Signals are read one at a time, lock-free, and sent a page at a time
+        count = 0
+        page = []
+        yield b'{"signals":['
+        for seq in range(first, last + 1):
+            if limit is not None and count >= limit:
+                break
+            signal = _feed.get(seq)
+            if signal is None:
+                continue  # Aged out of the feed since the range was found
+            if symbol is not None and signal.get('symbol') != symbol:
+                continue
+            if strategy is not None and signal.get('strategy') != strategy:
+                continue
+            page.append(encode_signal(dict(signal, seq=seq)))
+            count += 1
+            if len(page) == HISTORY_PAGE_SIZE:
+                yield (b',' if count > len(page) else b'') + b','.join(page)
+                page = []
+        if page:
+            yield (b',' if count > len(page) else b'') + b','.join(page)
+        yield b'],"count":%d,"status":"success"}\n' % count
+
+    return Response(generate(), mimetype='application/json')
+
+@app.route('/signals/ack', methods=['POST'])
+def ack_signals():
+    """Acknowledge a consumer group lease so its signals are not redelivered"""
+    return ack_lease(request.get_json(silent=True))
+
+def ack_lease(body):
+    """(payload, status) for POST /signals/ack with the parsed JSON `body`"""
+    if not isinstance(body, dict) or not isinstance(body.get('lease_id'), str):
+        return {'error': 'Expected JSON body with group and lease_id'}, 400
+    group = _groups.get(body.get('group')) if isinstance(body.get('group'), str) else None
+    if group is None:
+        return {'error': 'Unknown group'}, 404
+    acked = group.ack(body['lease_id'])
+    if acked is None:
+        # Lease expired (signals will be redelivered) or was already acked
+        return {'status': 'expired', 'message': 'Lease expired or unknown'}, 409
+    return {'status': 'success', 'acked': acked}, 200
+
+@app.route('/signals/stream', methods=['GET'])
+def stream_signals():
+    """Push each new signal to the client as a Server-Sent Event (non-destructive)"""
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('last_id')
+    try:
+        last_id = int(last_id) if last_id else None
+    except ValueError:
+        return jsonify({'error': 'Invalid Last-Event-ID'}), 400
+    
+    subscription = _broadcaster.subscribe(last_id)
+    if subscription is None:
+        return jsonify({'error': 'Too many stream subscribers, use /signals?wait= instead'}), 503
+    
+    def generate():
+        try:
+            yield b'retry: 2000\n\n'
+            while True:
+                events, dropped = subscription.get(timeout=STREAM_HEARTBEAT_INTERVAL)
+                if dropped:
+                    # Tell the client it missed events (slow consumer or replay gap)
+                    yield b'event: overflow\ndata: {"dropped": %d}\n\n' % dropped
+                if not events:
+                    # Heartbeat keeps proxies from closing the connection and
+                    # lets us notice clients that went away
+                    yield b': heartbeat\n\n'
+                    continue
+                # Event data is the signal's cached JSON bytes
+                yield b''.join(b'id: %d\nevent: signal\ndata: %s\n\n' % (event_id, data)
+                               for event_id, data in events)
+        finally:
+            _broadcaster.unsubscribe(subscription)
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+@app.route('/destinations', methods=['POST'])
+def register_destination():
+    """Register a URL that every new signal (optionally for one symbol/strategy) is POSTed to"""
+    error = push_authorization_error()
+    if error is not None:
+        return error
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict) or not isinstance(body.get('url'), str):
+        return jsonify({'error': 'Expected JSON body with url (and optional symbol, strategy)'}), 400
+    try:
+        destination = _push.register(body['url'], symbol=body.get('symbol') or None,
+                                     strategy=body.get('strategy') or None)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if destination is None:
+        return jsonify({'error': 'Too many destinations'}), 429
+    return jsonify({'status': 'success', 'destination': destination.info()}), 201
+
+@app.route('/destinations', methods=['GET'])
+def list_destinations():
+    """Registered push destinations and their delivery counters"""
+    error = push_authorization_error()
+    if error is not None:
+        return error
+    return jsonify({'status': 'success', 'destinations': [d.info() for d in _push.destinations()]}), 200
+
+@app.route('/destinations/<destination_id>', methods=['DELETE'])
+def unregister_destination(destination_id):
+    """Stop pushing to a destination (its undelivered signals are discarded)"""
+    error = push_authorization_error()
+    if error is not None:
+        return error
+    if not _push.unregister(destination_id):
+        return jsonify({'error': 'Unknown destination'}), 404
+    return jsonify({'status': 'success'}), 200
+
+@app.route('/destinations/dead-letters', methods=['GET'])
+def dead_letters():
+    """Batches whose delivery was given up on, oldest first"""
+    error = push_authorization_error()
+    if error is not None:
+        return error
+    letters = [dict(letter, signals=[json.loads(data) for data, _ in letter['signals']])
+               for letter in list(_push.dead_letters)]
+    return jsonify({'status': 'success', 'count': len(letters), 'dead_letters': letters}), 200
+
+@app.route('/destinations/dead-letters/retry', methods=['POST'])
+def retry_dead_letters():
+    """Queue every dead-lettered batch again"""
+    error = push_authorization_error()
+    if error is not None:
+        return error
+    return jsonify({'status': 'success', 'requeued': _push.requeue_dead_letters()}), 200
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus metrics for this worker"""
+    return Response(_metrics.render(), content_type=metrics.CONTENT_TYPE)
+
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
+    return health_payload()
+
+def health_payload():
+    """(payload, status) for GET /health"""
     try:
-        signal_count = len(_signals)
-        return jsonify({
+        signal_count = len(_store)
+        return {
             'status': 'healthy',
-            'storage': 'in-memory',
-            'signals_count': signal_count
-        }), 200
+            'storage': _store.name,
+            'signals_count': signal_count,
+            'consumer_groups': len(_groups),
+            'overflow': {
+                'policy': _store.overflow,
+                'dropped': _store.dropped,
+                'rejected': _store.rejected,
+                'spilled': _store.spilled
+            },
+            'expired': _store.expired
+        }, 200
     except Exception as e:
-        return jsonify({
+        return {
             'status': 'unhealthy',
             'message': str(e)
-        }), 503
+        }, 503
 
 if __name__ == '__main__':
     # Run the Flask app (for local development only)
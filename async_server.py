@@ -0,0 +1,394 @@
+"""
+Asyncio serving mode: the signals API on a single event loop
+
+    python async_server.py            (PORT, default 5000)
+
+Under gunicorn every request - including a long poll waiting for a signal and
+every keep-alive connection being read - occupies one of the worker's threads
+(10 per the Procfile). This server speaks the same HTTP contract for
+
+    POST /webhook, GET /signals (including ?wait=, ?group= and the
+    Accept / Accept-Encoding formats), POST /signals/ack, GET /health, GET /metrics
+
+but waits on the event loop instead: an idle keep-alive connection or a
+waiting long poll costs a few kilobytes rather than a thread, so one process
+on one core holds thousands of them.
+
+The store, deduplication, consumer groups, push delivery and metrics are the
+ones app.py sets up, from the same environment variables; requests go through
+the same functions as the Flask views (receive_webhook, pop_signals, ...).
+With the plain memory backend those are quick in-memory operations and run on
+the loop directly. A WAL (fsync), spilling to disk, or the Redis or shm
+backend can block, so then they run in the loop's default thread pool instead
+(see STORE_BLOCKS) rather than stalling every open connection.
+
+A long poll is woken as soon as a webhook received by this server stores a
+signal. Signals can also arrive some other way (another process sharing the
+shm or Redis backend, expiring consumer group leases), so waiting requests
+also look again every ASYNC_RECHECK_INTERVAL seconds.
+
+HTTP/1.1 with keep-alive is implemented with the standard library only; put
+the server behind the platform's proxy for TLS as with gunicorn.
+"""
+import asyncio
+import json
+import logging
+import os
+import signal
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import app
+import wire_formats
+from signal_codec import encode_signal, signals_body
+
+logger = logging.getLogger(__name__)
+
+# Idle keep-alive connections are closed after this many seconds
+ASYNC_KEEPALIVE_TIMEOUT = float(os.environ.get('ASYNC_KEEPALIVE_TIMEOUT', 75))
+# A request's headers and body must arrive within this many seconds
+ASYNC_REQUEST_TIMEOUT = float(os.environ.get('ASYNC_REQUEST_TIMEOUT', 10))
+ASYNC_MAX_BODY_BYTES = int(os.environ.get('ASYNC_MAX_BODY_BYTES', 1024 * 1024))
+# Long polls waiting at once; more return immediately, like LONG_POLL_MAX_WAITERS
+ASYNC_MAX_WAITERS = int(os.environ.get('ASYNC_MAX_WAITERS', 10000))
+ASYNC_RECHECK_INTERVAL = float(os.environ.get('ASYNC_RECHECK_INTERVAL', 1.0))
+
+# True if storing or popping a signal may block on I/O (fsync, disk, network)
+STORE_BLOCKS = (app.SIGNALS_BACKEND != 'memory' or bool(app.SIGNALS_WAL_DIR)
+                or app.SIGNALS_OVERFLOW == 'spill')
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 401: 'Unauthorized', 403: 'Forbidden', 404: 'Not Found',
+            405: 'Method Not Allowed', 409: 'Conflict', 413: 'Payload Too Large', 414: 'URI Too Long',
+            429: 'Too Many Requests', 431: 'Request Header Fields Too Large', 500: 'Internal Server Error',
+            503: 'Service Unavailable'}
+
+
+class HTTPError(Exception):
+    """A request that can't be served; answered with `status` and the connection closed"""
+
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers
+
+
+class Arrivals:
+    """Wakes waiting long polls when this server stores a signal"""
+
+    def __init__(self):
+        self._event = asyncio.Event()
+        self.waiters = 0
+
+    def notify(self):
+        self._event.set()
+        self._event = asyncio.Event()
+
+    async def wait(self, event, timeout):
+        """Wait for `event` (taken before checking for signals) for up to `timeout` seconds"""
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    @property
+    def event(self):
+        return self._event
+
+
+async def _readline(reader, status, message):
+    """One line from `reader`; HTTPError(status, message) if it exceeds the reader's limit (64 KiB)"""
+    try:
+        return await reader.readline()
+    except ValueError:  # readline's LimitOverrunError, with the buffer discarded
+        raise HTTPError(status, message)
+
+
+def _arg(query, name, default=None, type=str):
+    """First value of a query parameter converted with `type`, or `default` (like Flask's args.get)"""
+    values = query.get(name)
+    if not values:
+        return default
+    try:
+        return type(values[0])
+    except ValueError:
+        return default
+
+
+async def call_store(function, *args, **kwargs):
+    """function(*args, **kwargs), in a thread if STORE_BLOCKS so the loop keeps serving meanwhile"""
+    if STORE_BLOCKS:
+        return await asyncio.to_thread(function, *args, **kwargs)
+    return function(*args, **kwargs)
+
+
+def json_response(payload, status=200, headers=None):
+    return status, headers or {}, encode_signal(payload) + b'\n'
+
+
+def signals_response(signals, mimetype, headers):
+    """GET /signals in the negotiated format, like app.signals_response (NDJSON is sent whole here)"""
+    if mimetype == wire_formats.NDJSON:
+        body = b''.join(wire_formats.ndjson_chunks(signals))
+    elif mimetype == wire_formats.MSGPACK:
+        body = wire_formats.msgpack_body(signals)
+    else:
+        body = signals_body(signals)
+    response_headers = {'Content-Type': mimetype, 'Vary': 'Accept, Accept-Encoding'}
+    encoding = wire_formats.choose_encoding(wire_formats.parse_accept_encoding(headers.get('accept-encoding')),
+                                            len(body), app.SIGNALS_COMPRESS_MIN_BYTES)
+    if encoding:
+        body = wire_formats.compress(body, encoding, app.SIGNALS_COMPRESS_LEVEL)
+        response_headers['Content-Encoding'] = encoding
+    return 200, response_headers, body
+
+
+class SignalsServer:
+    """Routes requests to the app's store logic"""
+
+    def __init__(self):
+        self.arrivals = Arrivals()
+        self.connections = 0
+        self._handlers = set()  # Tasks serving open connections
+
+    async def dispatch(self, method, target, headers, body):
+        """(status, headers, body) for one request"""
+        url = urlsplit(target)
+        route = (method, url.path)
+        query = parse_qs(url.query)
+        if route == ('POST', '/webhook'):
+            return await self.webhook(headers, body)
+        if route == ('GET', '/signals'):
+            return await self.signals(query, headers)
+        if route == ('POST', '/signals/ack'):
+            try:
+                parsed = json.loads(body) if body else None
+            except ValueError:
+                parsed = None
+            return json_response(*app.ack_lease(parsed))
+        if route == ('GET', '/health'):
+            return json_response(*await call_store(app.health_payload))  # Asks the store for its size
+        if route == ('GET', '/metrics'):
+            return 200, {'Content-Type': app.metrics.CONTENT_TYPE}, app._metrics.render().encode()
+        if url.path in ('/webhook', '/signals', '/signals/ack', '/health', '/metrics'):
+            return json_response({'error': 'Method not allowed'}, 405)
+        return json_response({'error': 'Not found'}, 404)
+
+    async def webhook(self, headers, body):
+        started = time.perf_counter()
+        payload, status, extra_headers = await call_store(app.receive_webhook, body, headers.get('idempotency-key'))
+        serialize_started = time.perf_counter()
+        response = json_response(payload, status, extra_headers)
+        if payload.get('status') == 'success':
+            finished = time.perf_counter()
+            app._stage_latency['serialize'].observe(finished - serialize_started)
+            app._request_latency['webhook'].observe(finished - started)
+            self.arrivals.notify()
+        return response
+
+    async def signals(self, query, headers):
+        started = time.perf_counter()
+        limit = _arg(query, 'limit', 10, int)
+        wait = _arg(query, 'wait', None, float)
+        symbol = _arg(query, 'symbol') or None
+        strategy = _arg(query, 'strategy') or None
+        group_name = _arg(query, 'group')
+        deadline = time.monotonic() + min(wait, app.LONG_POLL_MAX_WAIT) if wait and wait > 0 else None
+        waiting = False
+        try:
+            if group_name is not None:
+                group, error = app.open_group(group_name, _arg(query, 'start', 'latest'), symbol, strategy)
+                if error is not None:
+                    return json_response(*error)
+                while True:
+                    event = self.arrivals.event
+                    lease, entries, skipped = group.fetch(limit)
+                    if entries or not (waiting := self._may_wait(deadline, waiting)):
+                        return json_response(app.group_payload(group, lease, entries, skipped))
+                    await self.arrivals.wait(event, min(deadline - time.monotonic(), ASYNC_RECHECK_INTERVAL))
+            mimetype = wire_formats.choose_format(wire_formats.parse_accept(headers.get('accept')))
+            while True:
+                event = self.arrivals.event
+                signals = await call_store(app.pop_signals, limit, symbol=symbol, strategy=strategy, encoded=True)
+                if signals or not (waiting := self._may_wait(deadline, waiting)):
+                    break
+                await self.arrivals.wait(event, min(deadline - time.monotonic(), ASYNC_RECHECK_INTERVAL))
+            serialize_started = time.perf_counter()
+            response = signals_response(signals, mimetype, headers)
+            finished = time.perf_counter()
+            app._stage_latency['serialize'].observe(finished - serialize_started)
+            if not wait:
+                app._request_latency['signals'].observe(finished - started)
+            return response
+        finally:
+            if waiting:
+                self.arrivals.waiters -= 1
+
+    def _may_wait(self, deadline, waiting):
+        """True if a poll that found nothing should (keep) wait(ing); takes a waiter slot on first use"""
+        if deadline is None or deadline - time.monotonic() <= 0:
+            return False
+        if not waiting:
+            if self.arrivals.waiters >= ASYNC_MAX_WAITERS:
+                return False  # Like LONG_POLL_MAX_WAITERS: answer now rather than pile up
+            self.arrivals.waiters += 1
+        return True
+
+    async def handle(self, reader, writer):
+        """Serve one connection: requests in turn while it is kept alive"""
+        self.connections += 1
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        peer = writer.get_extra_info('peername')
+        remote_addr = peer[0] if peer else None
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(_readline(reader, 414, 'Request line too long'),
+                                                          ASYNC_KEEPALIVE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                except HTTPError as e:
+                    self._write(writer, *json_response({'error': str(e)}, e.status, e.headers), keep_alive=False)
+                    await writer.drain()
+                    break
+                if not request_line:
+                    break
+                if request_line == b'\r\n':
+                    continue  # Tolerated between requests (RFC 9112)
+                try:
+                    method, target, version, headers, body = await asyncio.wait_for(
+                        self._read_request(request_line, reader, remote_addr), ASYNC_REQUEST_TIMEOUT)
+                except HTTPError as e:
+                    self._write(writer, *json_response({'error': str(e)}, e.status, e.headers), keep_alive=False)
+                    await writer.drain()
+                    break
+                keep_alive = (headers.get('connection', '').lower() != 'close' if version == 'HTTP/1.1'
+                              else headers.get('connection', '').lower() == 'keep-alive')
+                try:
+                    status, response_headers, response_body = await self.dispatch(method, target, headers, body)
+                except Exception as e:
+                    logger.error(f"Unexpected error serving {method} {target}: {e}", exc_info=True)
+                    status, response_headers, response_body = json_response({'error': 'Internal server error'}, 500)
+                self._write(writer, status, response_headers, response_body, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            pass
+        finally:
+            self.connections -= 1
+            self._handlers.discard(task)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, asyncio.CancelledError):
+                pass
+
+    async def close(self):
+        """Drop open connections (idle ones, and long polls mid-wait)"""
+        handlers = list(self._handlers)
+        for handler in handlers:
+            handler.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+
+    async def _read_request(self, request_line, reader, remote_addr=None):
+        try:
+            method, target, version = request_line.decode('latin-1').split()
+        except ValueError:
+            raise HTTPError(400, 'Malformed request line')
+        if not version.startswith('HTTP/1.'):
+            raise HTTPError(400, 'Unsupported HTTP version')
+        headers = {}
+        while True:
+            line = await _readline(reader, 431, 'Header line too long')
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, separator, value = line.decode('latin-1').partition(':')
+            if not separator:
+                raise HTTPError(400, 'Malformed header')
+            headers[name.strip().lower()] = value.strip()
+        if method == 'POST' and target.split('?', 1)[0] == '/webhook':
+            # Admission control runs before the body is read; a refused
+            # sender's connection is closed with the body still unread
+            url = urlsplit(target)
+            refusal = app.admit_webhook(remote_addr, headers.get('x-forwarded-for'),
+                                        headers.get('x-webhook-token') or _arg(parse_qs(url.query), 'token'))
+            if refusal is not None:
+                payload, status, refusal_headers = refusal
+                raise HTTPError(status, payload['error'], refusal_headers)
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            size = 0
+            while True:
+                line = await _readline(reader, 400, 'Chunk size line too long')
+                try:
+                    chunk_size = int(line.split(b';')[0], 16)
+                except ValueError:
+                    raise HTTPError(400, 'Malformed chunk size')
+                if chunk_size < 0:
+                    raise HTTPError(400, 'Malformed chunk size')
+                if chunk_size == 0:
+                    while (await _readline(reader, 431, 'Trailer line too long')) not in (b'\r\n', b'\n', b''):
+                        pass  # Trailers
+                    break
+                size += chunk_size
+                if size > ASYNC_MAX_BODY_BYTES:
+                    raise HTTPError(413, 'Request body too large')
+                chunks.append(await reader.readexactly(chunk_size))
+                if (await _readline(reader, 400, 'Malformed chunk')).strip():
+                    raise HTTPError(400, 'Malformed chunk')
+            body = b''.join(chunks)
+        else:
+            try:
+                length = int(headers.get('content-length', 0))
+            except ValueError:
+                raise HTTPError(400, 'Malformed Content-Length')
+            if length < 0:
+                raise HTTPError(400, 'Malformed Content-Length')
+            if length > ASYNC_MAX_BODY_BYTES:
+                raise HTTPError(413, 'Request body too large')
+            body = await reader.readexactly(length) if length > 0 else b''
+        return method, target, version, headers, body
+
+    def _write(self, writer, status, headers, body, keep_alive):
+        head = [f'HTTP/1.1 {status} {_REASONS.get(status, "Unknown")}',
+                f'Content-Length: {len(body)}']
+        if 'Content-Type' not in headers:
+            head.append('Content-Type: application/json')
+        head.extend(f'{name}: {value}' for name, value in headers.items())
+        if not keep_alive:
+            head.append('Connection: close')
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+
+
+async def serve(host, port, ready=None, stop=None):
+    """
+    Run the server until `stop` (an asyncio.Event) is set, or SIGTERM/SIGINT
+
+    `ready(port)` is called once it listens (port 0 picks a free one).
+    """
+    server = SignalsServer()
+    listener = await asyncio.start_server(server.handle, host, port, backlog=1024)
+    if stop is None:
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            # Stop cleanly so the store's atexit handlers (WAL flush, spill files) run
+            loop.add_signal_handler(signum, stop.set)
+    bound_port = listener.sockets[0].getsockname()[1]
+    logger.info(f"Async signals server listening on {host}:{bound_port}")
+    if ready is not None:
+        ready(bound_port)
+    async with listener:
+        await stop.wait()
+        listener.close()
+        await server.close()
+
+
+def main():
+    port = int(os.environ.get('PORT', 5000))
+    asyncio.run(serve(os.environ.get('HOST', '0.0.0.0'), port))
+
+
+if __name__ == '__main__':
+    main()
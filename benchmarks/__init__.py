@@ -0,0 +1,6 @@
+"""
+Microbenchmarks for the signals service.
+
+Run from the repository root, e.g.:
+    python -m benchmarks.bench_signal_store
+"""
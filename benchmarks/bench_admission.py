@@ -0,0 +1,181 @@
+"""
+Webhook flood: latency of legitimate alerts while junk POSTs arrive at --junk-factor times their rate.
+
+Against a local gunicorn started from the Procfile, twice:
+
+    open        no admission control (the default): junk is read, parsed and stored
+    admission   WEBHOOK_IP_ALLOWLIST=tradingview, WEBHOOK_SECRET and
+                WEBHOOK_TRUSTED_PROXIES=1: junk is refused before its body is read
+
+Legitimate alerts come "from" a TradingView address with the secret in the URL;
+junk comes from random addresses without it, with --junk-bytes of valid JSON
+each (so the open server has to parse it). Both set X-Forwarded-For the way
+Render's proxy would. Latency is measured from each request's scheduled send
+time, as in load_test.py. The flood is sent from a separate process, so its
+client threads don't hold up the legitimate sender's.
+
+Past about 16 --junk-connections, the single gthread worker's scheduling
+becomes the limit and alerts slow down in both modes. That needs more workers
+(or the asyncio server), not cheaper checks.
+
+Usage:
+    python -m benchmarks.bench_admission [--duration 10] [--rate 50] [--junk-factor 10]
+        [--junk-bytes 65536] [--junk-connections 8]
+"""
+import argparse
+import http.client
+import json
+import logging
+import multiprocessing
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+from admission import TRADINGVIEW_IPS
+from benchmarks.load_test import (TRADINGVIEW_DEADLINE, SIGNALS, Recorder, percentile, start_gunicorn,
+                                  stop_gunicorn)
+
+SECRET = 'bench-secret'
+MODES = {
+    'open': {},
+    'admission': {'WEBHOOK_IP_ALLOWLIST': 'tradingview', 'WEBHOOK_TRUSTED_PROXIES': '1', 'WEBHOOK_SECRET': SECRET},
+}
+
+
+class Client:
+    """POSTs over one keep-alive connection, reconnecting after errors and refusals that close it"""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self._host, self._port = parts.hostname, parts.port
+        self._connection = None
+
+    def post(self, path, body, headers):
+        if self._connection is None:
+            self._connection = http.client.HTTPConnection(self._host, self._port, timeout=30)
+        try:
+            self._connection.request('POST', path, body=body, headers={'Content-Type': 'application/json', **headers})
+            response = self._connection.getresponse()
+            response.read()
+            if response.will_close:
+                self.close()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            self.close()
+            raise
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+def paced(url, rate, deadline, send, recorder):
+    """Call send(client) at `rate` per second until `deadline`, recording latency from the scheduled time"""
+    client = Client(url)
+    interval = 1.0 / rate
+    scheduled = time.perf_counter()
+    try:
+        while scheduled < deadline:
+            now = time.perf_counter()
+            if scheduled > now:
+                time.sleep(scheduled - now)
+            try:
+                status = send(client)
+            except Exception:
+                status = None
+            recorder.record(time.perf_counter() - scheduled, status)
+            scheduled += interval
+    finally:
+        client.close()
+
+
+class StatusRecorder(Recorder):
+    """Recorder that also counts response statuses"""
+
+    def __init__(self):
+        super().__init__()
+        self.statuses = {}
+
+    def record(self, latency, status):
+        super().record(latency, status is not None and 200 <= status < 300)
+        with self._lock:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+
+def flood(url, rate, connections, size, duration, results):
+    """Junk POSTs from random addresses at `rate` per second over `connections` connections (child process)"""
+    body = json.dumps({'data': 'x' * 64, 'items': list(range(size // 7))})[:size - 2] + ']}'
+
+    def send(client):
+        source = f'203.0.{random.randrange(256)}.{random.randrange(256)}'
+        return client.post('/webhook', body, {'X-Forwarded-For': source})
+
+    junk = StatusRecorder()
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=paced, args=(url, rate / connections, deadline, send, junk))
+               for _ in range(connections)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put((junk.latencies, junk.statuses))
+
+
+def run(mode, args):
+    os.environ.update(MODES[mode])
+    try:
+        process, url = start_gunicorn()
+    finally:
+        for name in MODES[mode]:
+            del os.environ[name]
+    legit = StatusRecorder()
+    signals = [json.dumps(signal) for signal in SIGNALS]
+
+    def alert(client):
+        return client.post(f'/webhook?token={SECRET}', random.choice(signals),
+                           {'X-Forwarded-For': random.choice(TRADINGVIEW_IPS)})
+
+    try:
+        results = multiprocessing.Queue()
+        flooder = multiprocessing.Process(target=flood, args=(url, args.rate * args.junk_factor, args.junk_connections,
+                                                              args.junk_bytes, args.duration, results))
+        flooder.start()
+        paced(url, args.rate, time.perf_counter() + args.duration, alert, legit)
+        junk_latencies, junk_statuses = results.get()
+        flooder.join()
+    finally:
+        stop_gunicorn(process)
+    return legit, junk_latencies, junk_statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--rate', type=float, default=50, help='Legitimate alerts per second')
+    parser.add_argument('--junk-factor', type=float, default=10)
+    parser.add_argument('--junk-bytes', type=int, default=65536)
+    parser.add_argument('--junk-connections', type=int, default=8)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    print(f"legit {args.rate:g}/s, junk {args.rate * args.junk_factor:g}/s of {args.junk_bytes} bytes, "
+          f"{args.duration:g} s per mode")
+    print(f"{'mode':<10}{'alerts':>8}{'ok':>6}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}{'>3 s':>6}"
+          f"{'junk':>7}{'junk stored':>13}{'junk p50 ms':>13}")
+    for mode in MODES:
+        legit, junk_latencies, junk_statuses = run(mode, args)
+        latencies = sorted(legit.latencies)
+        junk_latencies.sort()
+        ms = lambda seconds: seconds * 1000 if seconds is not None else float('nan')
+        print(f"{mode:<10}{len(latencies):>8}{len(latencies) - legit.errors:>6}"
+              f"{ms(percentile(latencies, 0.5)):>9.1f}{ms(percentile(latencies, 0.99)):>9.1f}"
+              f"{ms(latencies[-1] if latencies else None):>9.1f}"
+              f"{sum(1 for latency in latencies if latency >= TRADINGVIEW_DEADLINE):>6}"
+              f"{len(junk_latencies):>7}{junk_statuses.get(200, 0):>13}{ms(percentile(junk_latencies, 0.5)):>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+"""
+Threaded Flask (gunicorn) vs the asyncio serving mode under many waiting bots.
+
+Starts each server locally - gunicorn from the Procfile, then
+`python async_server.py` - and connects --connections bots to it. Each bot
+behaves like example_bot_client.process_signals: a long poll with wait=20 on
+its own keep-alive connection, and a 1 second pause whenever the server
+answers empty straight away. The bots watch a symbol nobody sends, so every
+answer they get is empty. Meanwhile a producer POSTs --rate webhooks per
+second for --duration seconds.
+
+Reported per server:
+    held       - long polls open at once, on average (gunicorn holds at most
+                 LONG_POLL_MAX_WAITERS and answers the rest empty, to keep
+                 threads free for webhooks)
+    answers/s  - empty /signals responses served to the bots
+    webhook    - p50/p99/max latency of POST /webhook under that load, and
+                 how many failed (no response within 5 seconds)
+    RSS        - growth of the server's resident memory with the bots
+                 connected, in total and per connection
+
+Usage:
+    python -m benchmarks.bench_async_server [--connections 1000] [--duration 10]
+        [--rate 20]
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks.load_test import HTTPClient, free_port, percentile, start_gunicorn, stop_gunicorn
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WEBHOOK_TIMEOUT = 5  # Seconds; slower webhooks count as failed
+POLL = b'GET /signals?limit=1&wait=20&symbol=NOSUCHSYMBOL HTTP/1.1\r\nHost: localhost\r\n\r\n'
+
+
+def start_async_server():
+    """Start `python async_server.py`; returns (process, base URL)"""
+    port = free_port()
+    process = subprocess.Popen([sys.executable, 'async_server.py'], cwd=ROOT, start_new_session=True,
+                               env=dict(os.environ, PORT=str(port), HOST='127.0.0.1'),
+                               stderr=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{port}'
+    probe = HTTPClient(url)
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            if probe.request('GET', '/health') == 200:
+                break
+        except OSError:
+            pass
+        if process.poll() is not None or time.monotonic() > deadline:
+            stop_gunicorn(process)
+            raise RuntimeError('async_server.py did not start')
+        time.sleep(0.1)
+    probe.close()
+    return process, url
+
+
+def group_rss(process):
+    """Resident memory in bytes of every process in `process`'s group (gunicorn's master and workers)"""
+    total = 0
+    for pid in filter(str.isdigit, os.listdir('/proc')):
+        try:
+            if os.getpgid(int(pid)) != process.pid:
+                continue
+            with open(f'/proc/{pid}/status') as f:
+                total += next(int(line.split()[1]) for line in f if line.startswith('VmRSS:')) * 1024
+        except (OSError, StopIteration):
+            continue
+    return total
+
+
+class Bots:
+    """Long-polling bots on one event loop"""
+
+    def __init__(self, port):
+        self.port = port
+        self.held = 0  # Polls sent and not yet answered
+        self.answers = 0
+        self.errors = 0
+
+    async def bot(self):
+        reader = writer = None
+        try:
+            while True:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection('127.0.0.1', self.port)
+                started = time.monotonic()
+                self.held += 1
+                try:
+                    writer.write(POLL)
+                    keep_alive = await self._read_response(reader)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    writer.close()
+                    writer = None
+                    self.errors += 1
+                    await asyncio.sleep(1)
+                    continue
+                finally:
+                    self.held -= 1
+                self.answers += 1
+                if not keep_alive:
+                    writer.close()
+                    writer = None
+                if time.monotonic() - started < 1:
+                    await asyncio.sleep(1)
+        finally:
+            if writer is not None:
+                writer.close()
+
+    async def _read_response(self, reader):
+        """Read one response; returns False if the server closes the connection after it"""
+        if not await reader.readline():
+            raise ConnectionResetError('closed')
+        length = 0
+        keep_alive = True
+        while (line := await reader.readline()) not in (b'\r\n', b''):
+            name, _, value = line.decode('latin-1').partition(':')
+            if name.lower() == 'content-length':
+                length = int(value)
+            elif name.lower() == 'connection' and value.strip().lower() == 'close':
+                keep_alive = False
+        await reader.readexactly(length)
+        return keep_alive
+
+
+def produce(port, rate, duration, latencies):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=WEBHOOK_TIMEOUT)
+    body = json.dumps({'action': 'BUY', 'symbol': 'BTCUSDT', 'price': 45000.5})
+    deadline = time.perf_counter() + duration
+    due = time.perf_counter()
+    while due < deadline and time.perf_counter() < deadline + WEBHOOK_TIMEOUT:
+        time.sleep(max(0.0, due - time.perf_counter()))
+        try:
+            connection.request('POST', '/webhook', body, {'Content-Type': 'application/json'})
+            connection.getresponse().read()
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            latencies.append(float('inf'))
+        else:
+            # From when it was due, so a server that falls behind shows it
+            latencies.append(time.perf_counter() - due)
+        due += 1 / rate
+    connection.close()
+    # Webhooks never sent because the server was stuck on earlier ones
+    latencies.extend([float('inf')] * max(0, round((deadline - due) * rate)))
+
+
+def measure(process, url, connections, duration, rate):
+    port = int(url.rsplit(':', 1)[1])
+    baseline = group_rss(process)
+    bots = Bots(port)
+    latencies = []
+
+    async def run():
+        tasks = [asyncio.create_task(bots.bot()) for _ in range(connections)]
+        await asyncio.sleep(3)  # Connect and settle
+        answered = bots.answers
+        producer = threading.Thread(target=produce, args=(port, rate, duration, latencies))
+        producer.start()
+        held = []
+        rss = 0
+        started = time.monotonic()
+        while producer.is_alive():
+            held.append(bots.held)
+            if not rss and time.monotonic() - started > duration / 2:
+                rss = group_rss(process)
+            await asyncio.sleep(0.1)
+        answers = (bots.answers - answered) / (time.monotonic() - started)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return statistics.mean(held), answers, rss or group_rss(process)
+
+    held, answers, rss = asyncio.run(run())
+    failed = latencies.count(float('inf'))
+    latencies = sorted(latency for latency in latencies if latency != float('inf')) or [float('nan')]
+    return {
+        'failed': failed,
+        'held': held,
+        'answers': answers,
+        'errors': bots.errors,
+        'p50': statistics.median(latencies),
+        'p99': percentile(latencies, 0.99),
+        'max': latencies[-1],
+        'rss': rss - baseline,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--connections', type=int, default=1000, help='long-polling bots')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds of webhooks')
+    parser.add_argument('--rate', type=float, default=20.0, help='webhooks/s')
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    print(f"{args.connections} bots, {args.rate:g} webhooks/s for {args.duration:g}s")
+    print(f"{'server':<9}{'held':>7}{'answers/s':>11}{'errors':>8}{'failed':>8}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>10}"
+          f"{'RSS MiB':>9}{'KiB/conn':>10}")
+    for name, start in (('threaded', start_gunicorn), ('asyncio', start_async_server)):
+        process, url = start()
+        try:
+            result = measure(process, url, args.connections, args.duration, args.rate)
+        finally:
+            stop_gunicorn(process)
+        print(f"{name:<9}{result['held']:>7.0f}{result['answers']:>11.0f}{result['errors']:>8}"
+              f"{result['failed']:>8}"
+              f"{result['p50'] * 1000:>9.2f}{result['p99'] * 1000:>9.2f}{result['max'] * 1000:>10.2f}"
+              f"{result['rss'] / 2 ** 20:>9.1f}{result['rss'] / args.connections / 1024:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Signals per second through POST /webhook (one signal per request) vs.
+POST /webhook/batch (JSON array and NDJSON bodies), in-process via Flask's
+test client so only the service's own cost is measured.
+
+Usage:
+    python -m benchmarks.bench_batch_ingest [--signals 5000] [--batch-sizes 10,100,1000]
+"""
+import argparse
+import json
+import time
+
+import app
+
+SIGNAL = {'action': 'BUY', 'symbol': 'BTCUSDT', 'price': 45000, 'quantity': 0.1,
+          'strategy': 'RSIStrategy'}
+
+
+def rate(fn, signals):
+    app._store.clear()
+    start = time.perf_counter()
+    fn()
+    return signals / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--signals', type=int, default=5000)
+    parser.add_argument('--batch-sizes', default='10,100,1000')
+    args = parser.parse_args()
+    client = app.app.test_client()
+    n = args.signals
+
+    def single():
+        for _ in range(n):
+            client.post('/webhook', json=SIGNAL)
+
+    print(f"{'mode':<22}{'signals/s':>12}")
+    print(f"{'single':<22}{rate(single, n):>12.0f}")
+
+    for size in (int(s) for s in args.batch_sizes.split(',')):
+        array_body = json.dumps([SIGNAL] * size)
+        ndjson_body = '\n'.join(json.dumps(SIGNAL) for _ in range(size))
+        batches = max(1, n // size)
+
+        def post(body, content_type):
+            def run():
+                for _ in range(batches):
+                    client.post('/webhook/batch', data=body, content_type=content_type)
+            return run
+
+        print(f"{f'batch json x{size}':<22}{rate(post(array_body, 'application/json'), batches * size):>12.0f}")
+        print(f"{f'batch ndjson x{size}':<22}{rate(post(ndjson_body, 'application/x-ndjson'), batches * size):>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
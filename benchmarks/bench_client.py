@@ -0,0 +1,188 @@
+"""
+Consumer clients: polls per second, backlog drain time and per-signal latency.
+
+Compares, against a local gunicorn started from the Procfile (or --url):
+
+    example  - example_bot_client.get_latest_signals: requests.get per poll,
+               a new connection each time, a fixed limit
+    pooled   - signals_client.SignalsClient: keep-alive pooled session,
+               adaptive limit
+    async    - signals_client.AsyncSignalsClient
+
+1. Polls per second on an empty queue (no long polling).
+2. Time to drain a backlog of --backlog signals (example with limit=10, its
+   default; the others with their adaptive limit). Keep it within the
+   server's MAX_SIGNALS (default 1000).
+3. Latency from POST /webhook to the consumer receiving the signal, with a
+   producer sending --rate signals per second and each client long-polling
+   (the example as process_signals does: limit=1, wait=20).
+
+Usage:
+    python -m benchmarks.bench_client [--polls 500] [--backlog 1000]
+        [--signals 300] [--rate 100] [--url URL]
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import logging
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+import example_bot_client
+from benchmarks.load_test import start_gunicorn, stop_gunicorn
+from signals_client import AsyncSignalsClient, SignalsClient
+
+CLIENTS = ('example', 'pooled', 'async')
+
+
+class Producer:
+    """Posts signals over one keep-alive connection"""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=10)
+
+    def post(self, signal):
+        self.connection.request('POST', '/webhook', json.dumps(signal), {'Content-Type': 'application/json'})
+        self.connection.getresponse().read()
+
+    def post_many(self, count):
+        for i in range(count):
+            self.post({'action': 'BUY', 'symbol': 'BTCUSDT', 'price': 45000.5, 'n': i})
+
+    def close(self):
+        self.connection.close()
+
+
+def example_fetch(limit, wait=None):
+    result = example_bot_client.get_latest_signals(limit=limit, wait=wait)
+    return result['signals'] if result else []
+
+
+def polls_per_second(name, url, polls):
+    if name == 'example':
+        start = time.perf_counter()
+        for _ in range(polls):
+            example_fetch(10)
+        return polls / (time.perf_counter() - start)
+    if name == 'pooled':
+        with SignalsClient(url) as client:
+            start = time.perf_counter()
+            for _ in range(polls):
+                client.fetch()
+            return polls / (time.perf_counter() - start)
+
+    async def run():
+        async with AsyncSignalsClient(url) as client:
+            start = time.perf_counter()
+            for _ in range(polls):
+                await client.fetch()
+            return polls / (time.perf_counter() - start)
+    return asyncio.run(run())
+
+
+def drain_seconds(name, url, backlog):
+    """Seconds to fetch a backlog of `backlog` signals, and the number of (non-empty) polls it took"""
+    producer = Producer(url)
+    producer.post_many(backlog)
+    producer.close()
+    received = polls = 0
+    start = time.perf_counter()
+    if name == 'example':
+        while count := len(example_fetch(10)):
+            received += count
+            polls += 1
+    elif name == 'pooled':
+        with SignalsClient(url) as client:
+            while count := len(client.fetch()):
+                received += count
+                polls += 1
+    else:
+        async def run():
+            nonlocal received, polls
+            async with AsyncSignalsClient(url) as client:
+                while count := len(await client.fetch()):
+                    received += count
+                    polls += 1
+        asyncio.run(run())
+    if received != backlog:
+        raise RuntimeError(f"Drained {received} of {backlog} signals; is --backlog above MAX_SIGNALS?")
+    return time.perf_counter() - start, polls
+
+
+def delivery_latencies(name, url, count, rate):
+    """Seconds from posting each signal to the consumer receiving it"""
+    latencies = []
+
+    def receive(signal):
+        latencies.append(time.time() - signal['sent_at'])
+
+    def produce():
+        producer = Producer(url)
+        time.sleep(0.2)  # Let the consumer start polling
+        for i in range(count):
+            producer.post({'action': 'BUY', 'symbol': 'BTCUSDT', 'n': i, 'sent_at': time.time()})
+            time.sleep(1 / rate)
+        producer.close()
+
+    thread = threading.Thread(target=produce)
+    thread.start()
+    if name == 'example':
+        while len(latencies) < count:
+            for signal in example_fetch(1, wait=example_bot_client.LONG_POLL_WAIT):
+                receive(signal)
+    elif name == 'pooled':
+        with SignalsClient(url) as client:
+            signals = client.iter_signals()
+            while len(latencies) < count:
+                receive(next(signals))
+    else:
+        async def run():
+            async with AsyncSignalsClient(url) as client:
+                async for signal in client.iter_signals():
+                    receive(signal)
+                    if len(latencies) == count:
+                        break
+        asyncio.run(run())
+    thread.join()
+    return sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--polls', type=int, default=500)
+    parser.add_argument('--backlog', type=int, default=1000)
+    parser.add_argument('--signals', type=int, default=300)
+    parser.add_argument('--rate', type=float, default=100)
+    parser.add_argument('--url', help='An already running server (its queue is drained)')
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    process = None
+    url = args.url
+    if url is None:
+        process, url = start_gunicorn()
+    example_bot_client.SIGNALS_API_URL = url
+    try:
+        with SignalsClient(url, max_limit=10000) as client:
+            while client.fetch():
+                pass  # Start from an empty queue
+
+        print(f"{'client':<9}{'polls/s':>9}{'drain s':>9}{'polls':>7}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+        for name in CLIENTS:
+            rate = polls_per_second(name, url, args.polls)
+            drain, polls = drain_seconds(name, url, args.backlog)
+            latencies = delivery_latencies(name, url, args.signals, args.rate)
+            p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)]
+            print(f"{name:<9}{rate:>9.0f}{drain:>9.2f}{polls:>7}{statistics.median(latencies) * 1000:>9.2f}"
+                  f"{p99 * 1000:>9.2f}{latencies[-1] * 1000:>9.2f}")
+    finally:
+        if process is not None:
+            stop_gunicorn(process)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""
+Deduplication index cost as it fills: time per claim (new key and duplicate)
+and memory per key, at 1k-100k live keys.
+
+Usage:
+    python -m benchmarks.bench_dedup [--sizes 1000,10000,50000,100000] [--ops 100000]
+"""
+import argparse
+import time
+import tracemalloc
+
+from dedup import DedupIndex, digest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,50000,100000')
+    parser.add_argument('--ops', type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f"{'keys':>8}{'new key ns':>12}{'duplicate ns':>14}{'bytes/key':>11}")
+    for size in (int(n) for n in args.sizes.split(',')):
+        tracemalloc.start()
+        index = DedupIndex(window_seconds=3600, max_keys=size)
+        for i in range(size):
+            index.claim(digest(f'alert-{i}'))
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        # New keys at capacity: each claim also evicts the oldest key
+        new_keys = [digest(f'new-{i}') for i in range(args.ops)]
+        start = time.perf_counter()
+        for key in new_keys:
+            index.claim(key)
+        new_ns = (time.perf_counter() - start) / args.ops * 1e9
+
+        duplicates = new_keys[-min(size, args.ops):]
+        start = time.perf_counter()
+        for key in duplicates:
+            index.claim(key)
+        duplicate_ns = (time.perf_counter() - start) / len(duplicates) * 1e9
+        print(f"{size:>8}{new_ns:>12.0f}{duplicate_ns:>14.0f}{memory / size:>11.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Per-request cost of the /metrics instrumentation.
+
+1. The exact operations the instrumentation adds to one POST /webhook (six
+   clock reads, five histogram observations, one counter increment) and to one
+   GET /signals (five clock reads, three observations, one increment), plus
+   the store lock's contention timing wrapper over a bare threading.Lock,
+   timed in a tight loop.
+2. POST /webhook and GET /signals end to end through Flask's test client, with
+   the real metrics vs. no-op stand-ins, for scale. (The difference is within
+   the test client's run-to-run noise.)
+
+Usage:
+    python -m benchmarks.bench_metrics_overhead [--requests 20000]
+"""
+import argparse
+import logging
+import threading
+import time
+
+import app
+from metrics import ContentionTimedLock, Counter, Histogram
+
+SIGNAL = {'action': 'BUY', 'symbol': 'BTCUSDT', 'price': 45000, 'quantity': 0.1,
+          'strategy': 'RSIStrategy'}
+
+
+class _Null:
+    def observe(self, seconds):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+
+def per_call_us(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def instrumentation_only(repeat):
+    histogram = Histogram('h', {})
+    counter = Counter('c', {})
+    clock = time.perf_counter
+
+    def webhook():
+        a = clock(); b = clock(); c = clock(); d = clock(); e = clock(); f = clock()
+        histogram.observe(b - a); histogram.observe(c - b); histogram.observe(d - c)
+        histogram.observe(e - d); histogram.observe(f - a)
+        counter.inc()
+
+    def signals():
+        a = clock(); b = clock(); c = clock(); d = clock(); e = clock()
+        histogram.observe(b - a); histogram.observe(d - c); histogram.observe(e - a)
+        counter.inc(10)
+
+    timed_lock = ContentionTimedLock()
+    bare_lock = threading.Lock()
+
+    def timed():
+        with timed_lock:
+            pass
+
+    def bare():
+        with bare_lock:
+            pass
+
+    lock_cost = per_call_us(timed, repeat) - per_call_us(bare, repeat)
+    return per_call_us(webhook, repeat) + lock_cost, per_call_us(signals, repeat) + lock_cost
+
+
+def end_to_end(repeat):
+    client = app.app.test_client()
+    app._store.clear()
+
+    def webhook():
+        client.post('/webhook', json=SIGNAL)
+
+    def signals():
+        client.get('/signals?limit=10')
+
+    return per_call_us(webhook, repeat), per_call_us(signals, repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=20000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    webhook_cost, signals_cost = instrumentation_only(args.requests * 10)
+    print("Instrumentation added per request:")
+    print(f"  POST /webhook  {webhook_cost:6.2f} us")
+    print(f"  GET /signals   {signals_cost:6.2f} us")
+
+    print("\nEnd to end (test client), us per request:")
+    print(f"{'':<16}{'metrics on':>12}{'metrics off':>13}")
+    real = (dict(app._stage_latency), dict(app._request_latency), app._signals_received, app._signals_served)
+    results = {}
+    for mode in ('on', 'off', 'on', 'off'):  # Interleaved to even out warm-up and drift
+        if mode == 'off':
+            for histograms in (app._stage_latency, app._request_latency):
+                for key in histograms:
+                    histograms[key] = _Null()
+            app._signals_received = app._signals_served = _Null()
+        else:
+            app._stage_latency.update(real[0])
+            app._request_latency.update(real[1])
+            app._signals_received, app._signals_served = real[2], real[3]
+        results[mode] = end_to_end(args.requests)
+    for i, name in enumerate(('POST /webhook', 'GET /signals')):
+        print(f"{name:<16}{results['on'][i]:>12.1f}{results['off'][i]:>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
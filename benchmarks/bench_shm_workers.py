@@ -0,0 +1,77 @@
+"""
+Throughput of the shared-memory backend with 1, 2, 4 and 8 worker processes,
+each standing in for a gunicorn worker: it imports app with
+SIGNALS_BACKEND=shm and drives POST /webhook (plus a GET /signals?limit=10
+every 10 webhooks) through Flask's test client, all against one shared queue.
+
+Scaling is bounded by the number of CPU cores (reported first) and by the
+single cross-process lock around each queue operation.
+
+Usage:
+    python -m benchmarks.bench_shm_workers [--workers 1,2,4,8] [--requests 5000]
+"""
+import argparse
+import multiprocessing
+import os
+import time
+import uuid
+
+SIGNAL = {'action': 'BUY', 'symbol': 'BTCUSDT', 'price': 45000, 'quantity': 0.1,
+          'strategy': 'RSIStrategy'}
+
+
+def worker(requests, ready, start):
+    import logging
+    logging.disable(logging.INFO)
+    import app
+    client = app.app.test_client()
+    ready.wait()
+    start.wait()
+    for i in range(requests):
+        client.post('/webhook', json=SIGNAL)
+        if i % 10 == 9:
+            client.get('/signals?limit=10')
+
+
+def run(workers, requests):
+    """Requests per second across `workers` processes sharing one queue"""
+    context = multiprocessing.get_context('spawn')
+    ready = context.Barrier(workers + 1)
+    start = context.Barrier(workers + 1)
+    per_worker = requests // workers
+    processes = [context.Process(target=worker, args=(per_worker, ready, start)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    ready.wait()  # Every worker has imported app and attached to the segment
+    began = time.perf_counter()
+    start.wait()
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - began
+    return (per_worker + per_worker // 10) * workers / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', default='1,2,4,8')
+    parser.add_argument('--requests', type=int, default=5000, help='webhooks per run, split across workers')
+    args = parser.parse_args()
+
+    os.environ['SIGNALS_BACKEND'] = 'shm'
+    os.environ['SIGNALS_SHM_NAME'] = f'bench_signals_{uuid.uuid4().hex[:12]}'
+    from shm_backend import SharedMemoryBackend
+    backend = SharedMemoryBackend(capacity=int(os.environ.get('MAX_SIGNALS', 1000)))
+    try:
+        print(f"CPU cores: {os.cpu_count()}")
+        print(f"{'workers':>8}{'requests/s':>14}")
+        for workers in (int(n) for n in args.workers.split(',')):
+            backend.clear()
+            print(f"{workers:>8}{run(workers, args.requests):>14.0f}")
+    finally:
+        backend.unlink()
+        backend.close()
+        os.remove(backend.lock_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Memory per queued signal: plain dicts vs. compact SignalRecords.
+
+Fills a SignalStore the way webhook() does (parse the JSON body, add the
+timestamps, encode once, push) and reports the memory traced per signal,
+with the store keeping each signal as the received dict ("dict", the
+representation before signal_record.py) and as a SignalRecord ("record").
+Both include the cached JSON bytes served by GET /signals. The newest
+signals are checked to come back the same in both modes.
+
+"app" is what the service holds per signal once it has gone through
+app.save_signal, as /webhook stores it: the store, plus the consumer-group
+feed and the /signals/stream replay buffer, each retaining the same number of
+signals (MAX_SIGNALS).
+
+Usage:
+    python -m benchmarks.bench_signal_memory [--sizes 10000,100000,1000000]
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from datetime import datetime
+
+import app
+import signal_record
+import signal_store
+from consumer_groups import SignalFeed
+from latest_signals import LatestSignals
+from signal_codec import encode_signal, signals_body
+from signal_store import SignalStore
+from signal_stream import SignalBroadcaster
+
+SYMBOLS = ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'BNBUSDT', 'XRPUSDT', 'ADAUSDT', 'DOGEUSDT', 'AVAXUSDT']
+STRATEGIES = ['RSIStrategy', 'MACDCross', 'Breakout']
+
+
+def body(i):
+    return json.dumps({
+        'action': 'BUY' if i % 2 else 'SELL',
+        'symbol': SYMBOLS[i % len(SYMBOLS)],
+        'price': round(45000 + (i % 10000) * 0.25, 2),
+        'quantity': 0.1,
+        'strategy': STRATEGIES[i % len(STRATEGIES)],
+    })
+
+
+def received(i):
+    """Signal i as webhook() stores it: parsed, then timestamped"""
+    signal = json.loads(body(i))
+    now = datetime.now()
+    signal['timestamp'] = now.isoformat()
+    signal['received_at'] = now.strftime('%Y-%m-%d %H:%M:%S')
+    return signal
+
+
+def fill(size, packer):
+    signal_store.pack = packer
+    store = SignalStore(capacity=size)
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    for i in range(size):
+        signal = received(i)
+        store.push(signal, encode_signal(signal))
+    elapsed = time.perf_counter() - started
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    newest = [(s['symbol'], s['price']) for s in store.snapshot()[:100]]
+    served = signals_body(store.pop_encoded(100))
+    store.clear()
+    signal_store.pack = signal_record.pack
+    return memory / size, elapsed / size * 1e6, newest, served
+
+
+def fill_app(size):
+    """Bytes per signal held after `size` signals went through app.save_signal with MAX_SIGNALS=size"""
+    saved = app._store, app._feed, app._broadcaster, app._latest
+    gc.collect()
+    tracemalloc.start()
+    app._store = SignalStore(capacity=size)
+    app._feed = SignalFeed(retention=size)
+    app._broadcaster = SignalBroadcaster(replay_size=size)
+    app._latest = LatestSignals()
+    for i in range(size):
+        app.save_signal(received(i))
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    app._store, app._feed, app._broadcaster, app._latest = saved
+    return memory / size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    args = parser.parse_args()
+
+    print("(ingest time is under tracemalloc, so only comparable within a row)")
+    print(f"{'signals':>9}{'dict B':>9}{'record B':>10}{'saved':>8}{'dict us':>10}{'record us':>11}{'app B':>8}")
+    for size in (int(n) for n in args.sizes.split(',')):
+        as_dict = fill(size, lambda signal: signal)
+        as_record = fill(size, signal_record.pack)
+        # Timestamps differ between runs; the fields and the layout must not
+        assert as_dict[2] == as_record[2] and len(as_dict[3]) == len(as_record[3])
+        saved = 1 - as_record[0] / as_dict[0]
+        print(f"{size:>9}{as_dict[0]:>9.0f}{as_record[0]:>10.0f}{saved:>8.0%}{as_dict[1]:>10.1f}{as_record[1]:>11.1f}"
+              f"{fill_app(size):>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
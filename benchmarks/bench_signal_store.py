@@ -0,0 +1,90 @@
+"""
+Per-operation latency of SignalStore vs. the original list-backed store.
+
+Each depth is filled to capacity, then we time single pushes (which evict the
+oldest signal) and push/pop(1) pairs so the queue depth stays constant.
+
+Usage:
+    python -m benchmarks.bench_signal_store [--depths 1000,10000,100000,1000000]
+"""
+import argparse
+import threading
+import time
+
+from signal_store import SignalStore
+
+
+class ListStore:
+    """The pre-SignalStore implementation from app.py, kept for comparison"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._signals = []
+        self._lock = threading.Lock()
+
+    def push(self, signal):
+        with self._lock:
+            self._signals.insert(0, signal)
+            if len(self._signals) > self.capacity:
+                self._signals[:] = self._signals[:self.capacity]
+
+    def pop(self, count):
+        with self._lock:
+            if not self._signals:
+                return []
+            result = self._signals[:count]
+            self._signals[:] = self._signals[count:]
+            return result
+
+
+SIGNAL = {'action': 'BUY', 'symbol': 'BTCUSDT', 'price': 45000, 'quantity': 0.1}
+
+
+def fill(store, depth):
+    for _ in range(depth):
+        store.push(SIGNAL)
+
+
+def time_per_op(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def bench(factory, depth, iterations):
+    store = factory(depth)
+    fill(store, depth)
+    push_us = time_per_op(lambda: store.push(SIGNAL), iterations)
+
+    def push_pop():
+        store.push(SIGNAL)
+        store.pop(1)
+
+    cycle_us = time_per_op(push_pop, iterations)
+    return push_us, cycle_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--depths', default='1000,10000,100000,1000000')
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--skip-list', action='store_true',
+                        help='only benchmark SignalStore (the list store is slow at 1M)')
+    args = parser.parse_args()
+    depths = [int(d) for d in args.depths.split(',')]
+
+    print(f"{'store':<12}{'depth':>10}{'push us/op':>14}{'push+pop us/op':>18}")
+    for depth in depths:
+        impls = [('SignalStore', SignalStore)]
+        if not args.skip_list:
+            impls.append(('list', ListStore))
+        for name, factory in impls:
+            # The list store is O(n) per op; keep its wall time bounded
+            iterations = args.iterations if name == 'SignalStore' else max(20, args.iterations * 1000 // depth)
+            push_us, cycle_us = bench(factory, depth, iterations)
+            print(f"{name:<12}{depth:>10}{push_us:>14.2f}{cycle_us:>18.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Cost of building a GET /signals body: jsonify over popped signal dicts (the
+previous path) vs. joining the bytes each signal was encoded to at ingest.
+
+Usage:
+    python -m benchmarks.bench_signals_response [--limits 1,100,1000] [--repeat 2000]
+"""
+import argparse
+import time
+
+from flask import jsonify
+
+import app
+from signal_codec import encode_signal, signals_body
+
+SIGNAL = {'action': 'BUY', 'symbol': 'BTCUSDT', 'price': 45000.5, 'quantity': 0.1,
+          'strategy': 'RSIStrategy', 'timestamp': '2024-01-01T00:00:00.000000'}
+
+
+def per_call(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--limits', default='1,100,1000')
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'limit':>6}{'jsonify us':>14}{'cached us':>12}{'speedup':>10}")
+    with app.app.app_context():
+        for limit in (int(n) for n in args.limits.split(',')):
+            signals = [dict(SIGNAL, seq=i) for i in range(limit)]
+            fragments = [encode_signal(signal) for signal in signals]
+            repeat = max(10, args.repeat // max(1, limit // 10))
+            old = per_call(lambda: jsonify({'status': 'success', 'count': len(signals),
+                                            'signals': signals}).get_data(), repeat)
+            new = per_call(lambda: app.Response(signals_body(fragments),
+                                                mimetype='application/json').get_data(), repeat)
+            print(f"{limit:>6}{old:>14.1f}{new:>12.1f}{old / new:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Plain-text alert parsing: template matching cost and mixed JSON/text throughput.
+
+1. Time to parse one alert with 3 (the defaults) and 39 templates, with the
+   matching templates last, so every other template is tried first.
+2. POST /webhook throughput through Flask's test client for traffic that is
+   0%, 50% and 100% plain text, with and without templates.
+
+Usage:
+    python -m benchmarks.bench_text_alerts [--messages 20000] [--requests 5000]
+"""
+import argparse
+import logging
+import time
+
+import app
+from alert_templates import DEFAULT_TEMPLATES, AlertTemplates
+
+SYMBOLS = ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'BNBUSDT']
+
+
+def extra_templates(count):
+    """Templates that never match the benchmark's alerts, like other alerts' formats"""
+    return [f'Alert {i}: {{symbol}} crossed {{price}} on {{interval}}' for i in range(count)]
+
+
+def messages(count):
+    return [f"{'BUY' if i % 2 else 'SELL'} {SYMBOLS[i % len(SYMBOLS)]} at {45000 + i % 1000}.5"
+            for i in range(count)]
+
+
+def per_message_us(parse, texts):
+    start = time.perf_counter()
+    for text in texts:
+        parse(text)
+    return (time.perf_counter() - start) / len(texts) * 1e6
+
+
+def matching(texts):
+    print(f"{'templates':>10}{'us':>8}")
+    for extra in (0, 36):
+        templates = extra_templates(extra) + list(DEFAULT_TEMPLATES)
+        print(f"{len(templates):>10}{per_message_us(AlertTemplates(templates).parse, texts):>8.2f}")
+
+
+def throughput(requests):
+    client = app.app.test_client()
+    texts = messages(requests)
+    print(f"\n{'text share':>10}{'templates req/s':>17}{'no templates req/s':>20}")
+    for share in (0, 50, 100):
+        row = []
+        for templates in (AlertTemplates(DEFAULT_TEMPLATES), AlertTemplates([])):
+            app._alert_templates = templates
+            app._store.clear()
+            start = time.perf_counter()
+            for i, text in enumerate(texts):
+                if i % 100 < share:
+                    client.post('/webhook', data=text, content_type='text/plain')
+                else:
+                    client.post('/webhook', json={'action': 'BUY', 'symbol': SYMBOLS[i % 4], 'price': 45000.5})
+            row.append(requests / (time.perf_counter() - start))
+        print(f"{share:>9}%{row[0]:>17.0f}{row[1]:>20.0f}")
+    app._store.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--requests', type=int, default=5000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    matching(messages(args.messages))
+    throughput(args.requests)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+GET /signals wire formats: bytes on the wire and time to first byte per format.
+
+Against a local gunicorn started from the Procfile (with MAX_SIGNALS and
+MAX_BATCH_SIZE raised to fit the largest limit), for each --limits value:
+queue that many signals through POST /webhook/batch, then drain them with one
+GET /signals?limit=N per format:
+
+    json           the default (Accept: application/json)
+    json+gzip      the same with Accept-Encoding: gzip (and deflate)
+    ndjson         Accept: application/x-ndjson, streamed
+    ndjson+gzip
+    msgpack        Accept: application/msgpack
+    msgpack+gzip
+
+Bytes are everything the server sent (status line, headers, chunk framing
+and body). Time to first byte is from sending the request to the first byte
+of the response; total is to the last byte. Each figure is the median of
+--repeat drains.
+
+Usage:
+    python -m benchmarks.bench_wire_formats [--limits 10,1000,10000] [--repeat 5]
+"""
+import argparse
+import json
+import logging
+import os
+import socket
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from benchmarks.load_test import start_gunicorn, stop_gunicorn
+
+SIGNAL = {'action': 'BUY', 'symbol': 'BTCUSDT', 'price': 45000.5, 'quantity': 0.1,
+          'strategy': 'RSIStrategy', 'message': 'RSI crossed below 30 on the 15m chart'}
+
+FORMATS = {
+    'json': {},
+    'json+gzip': {'Accept-Encoding': 'gzip'},
+    'json+deflate': {'Accept-Encoding': 'deflate'},
+    'ndjson': {'Accept': 'application/x-ndjson'},
+    'ndjson+gzip': {'Accept': 'application/x-ndjson', 'Accept-Encoding': 'gzip'},
+    'msgpack': {'Accept': 'application/msgpack'},
+    'msgpack+gzip': {'Accept': 'application/msgpack', 'Accept-Encoding': 'gzip'},
+}
+BATCH = 1000
+SYMBOLS = ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'XRPUSDT', 'BNBUSDT']
+
+
+def exchange(host, port, method, path, headers=None, body=b''):
+    """Send one request on a new connection; returns (response bytes, seconds to first byte, seconds to last)"""
+    head = [f'{method} {path} HTTP/1.1', f'Host: {host}', 'Connection: close', f'Content-Length: {len(body)}']
+    head.extend(f'{name}: {value}' for name, value in (headers or {}).items())
+    request = ('\r\n'.join(head) + '\r\n\r\n').encode() + body
+    with socket.create_connection((host, port)) as sock:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        started = time.perf_counter()
+        sock.sendall(request)
+        chunks = [sock.recv(65536)]
+        first = time.perf_counter() - started
+        while chunk := sock.recv(65536):
+            chunks.append(chunk)
+        return b''.join(chunks), first, time.perf_counter() - started
+
+
+def fill(host, port, count):
+    for start in range(0, count, BATCH):
+        batch = [dict(SIGNAL, n=i, symbol=SYMBOLS[i % len(SYMBOLS)], price=round(45000 + i * 0.37, 2))
+                 for i in range(start, min(count, start + BATCH))]
+        response, _, _ = exchange(host, port, 'POST', '/webhook/batch', {'Content-Type': 'application/json'},
+                                  json.dumps(batch).encode())
+        if not response.startswith(b'HTTP/1.1 200'):
+            raise RuntimeError(f"Filling the queue failed: {response[:200]!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--limits', default='10,1000,10000')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    limits = [int(n) for n in args.limits.split(',')]
+
+    os.environ['MAX_SIGNALS'] = str(max(limits))
+    os.environ['MAX_BATCH_SIZE'] = str(BATCH)
+    process, url = start_gunicorn()
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port
+    try:
+        print(f"{'limit':>6} {'format':<14}{'bytes':>11}{'vs json':>9}{'TTFB ms':>9}{'total ms':>10}")
+        for limit in limits:
+            baseline = None
+            for name, headers in FORMATS.items():
+                sizes, firsts, totals = [], [], []
+                for _ in range(args.repeat):
+                    fill(host, port, limit)
+                    response, first, total = exchange(host, port, 'GET', f'/signals?limit={limit}', headers)
+                    if not response.startswith(b'HTTP/1.1 200'):
+                        raise RuntimeError(f"GET /signals failed: {response[:200]!r}")
+                    sizes.append(len(response))
+                    firsts.append(first)
+                    totals.append(total)
+                size = statistics.median(sizes)
+                baseline = baseline or size
+                print(f"{limit:>6} {name:<14}{size:>11,.0f}{size / baseline:>9.2f}"
+                      f"{statistics.median(firsts) * 1000:>9.2f}{statistics.median(totals) * 1000:>10.2f}")
+    finally:
+        stop_gunicorn(process)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,343 @@
+"""
+Load test: concurrent webhook producers and /signals consumers, with latency
+percentiles, throughput and a check against TradingView's 3 second deadline.
+
+Two targets:
+    inprocess  - app driven through Flask's test client in this process
+                 (micro-benchmark: the service's own cost, no network/server)
+    gunicorn   - a local gunicorn started with the web command from the
+                 Procfile (macro-benchmark: real server, sockets, workers)
+    --url URL  - an already running server instead of either of the above
+
+Producers and consumers each run in their own thread at a fixed rate. Latency
+is measured from when a request was *scheduled* to be sent, not from when it
+actually went out, so a server that falls behind shows up as growing latency
+rather than as a quietly lower request rate (coordinated omission). A rate of
+0 sends back to back.
+
+Any webhook slower than --sla-warn (default 2.4 s, 80% of the 3 s deadline)
+is flagged and the exit status is 1. Results can be saved with --output and
+compared against an earlier run with --compare.
+
+Usage:
+    python -m benchmarks.load_test [--target inprocess|gunicorn] [--duration 10]
+        [--producers 4] [--producer-rate 50] [--consumers 2] [--consumer-rate 5]
+        [--limit 10] [--wait 0] [--output results.json] [--compare baseline.json]
+"""
+import argparse
+import http.client
+import itertools
+import json
+import logging
+import math
+import os
+import platform
+import re
+import shlex
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+TRADINGVIEW_DEADLINE = 3.0
+PROCFILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Procfile')
+
+SIGNALS = [
+    {'action': 'BUY', 'symbol': 'BTCUSDT', 'price': 45000.5, 'quantity': 0.1, 'strategy': 'MomentumStrategy'},
+    {'action': 'SELL', 'symbol': 'ETHUSDT', 'price': 2800.75, 'quantity': 1.5, 'strategy': 'RSIStrategy'},
+    {'action': 'BUY', 'symbol': 'SOLUSDT', 'price': 95.8, 'quantity': 10.0, 'strategy': 'MeanReversion'},
+]
+
+
+class InProcessClient:
+    """Sends requests through Flask's test client"""
+
+    def __init__(self):
+        import app
+        self._client = app.app.test_client()
+
+    def request(self, method, path, body=None):
+        if method == 'POST':
+            return self._client.post(path, data=body, content_type='application/json').status_code
+        return self._client.get(path).status_code
+
+    def close(self):
+        pass
+
+
+class HTTPClient:
+    """Sends requests over one keep-alive connection"""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self._host, self._port = parts.hostname, parts.port or 80
+        self._connection = None
+
+    def request(self, method, path, body=None):
+        if self._connection is None:
+            self._connection = http.client.HTTPConnection(self._host, self._port, timeout=30)
+        try:
+            headers = {'Content-Type': 'application/json'} if body is not None else {}
+            self._connection.request(method, path, body=body, headers=headers)
+            response = self._connection.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            self.close()  # Reconnect on the next request
+            raise
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class Recorder:
+    """Latencies and failures of one kind of request, collected across threads"""
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency, ok):
+        with self._lock:
+            self.latencies.append(latency)
+            if not ok:
+                self.errors += 1
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def summarize(recorder, elapsed, sla_warn):
+    latencies = sorted(recorder.latencies)
+    ms = lambda seconds: None if seconds is None else round(seconds * 1000, 3)
+    return {
+        'requests': len(latencies),
+        'errors': recorder.errors,
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': ms(percentile(latencies, 0.50)),
+        'p99_ms': ms(percentile(latencies, 0.99)),
+        'p999_ms': ms(percentile(latencies, 0.999)),
+        'max_ms': ms(latencies[-1] if latencies else None),
+        'near_deadline': sum(1 for latency in latencies if latency >= sla_warn),
+    }
+
+
+def run_paced(client_factory, rate, deadline, send, recorder):
+    """Call send(client) at `rate` per second (0 = back to back) until `deadline`"""
+    client = client_factory()
+    interval = 1.0 / rate if rate else 0.0
+    scheduled = time.perf_counter()
+    try:
+        while scheduled < deadline:
+            now = time.perf_counter()
+            if scheduled > now:
+                time.sleep(scheduled - now)
+            try:
+                ok = 200 <= send(client) < 300
+            except Exception:
+                ok = False
+            finished = time.perf_counter()
+            # Measured from the scheduled send time (see module docstring)
+            recorder.record(finished - (scheduled if interval else now), ok)
+            scheduled = scheduled + interval if interval else finished
+    finally:
+        client.close()
+
+
+def run_load(client_factory, args):
+    webhooks, polls = Recorder(), Recorder()
+    payloads = [json.dumps(signal) for signal in SIGNALS]
+    poll_path = f'/signals?limit={args.limit}' + (f'&wait={args.wait}' if args.wait else '')
+    counter = itertools.count()
+
+    def post(client):
+        return client.request('POST', '/webhook', payloads[next(counter) % len(payloads)])
+
+    def poll(client):
+        return client.request('GET', poll_path)
+
+    start = time.perf_counter()
+    deadline = start + args.duration
+    threads = [threading.Thread(target=run_paced, args=(client_factory, args.producer_rate, deadline, post, webhooks))
+               for _ in range(args.producers)]
+    threads += [threading.Thread(target=run_paced, args=(client_factory, args.consumer_rate, deadline, poll, polls))
+                for _ in range(args.consumers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {
+        'webhook': summarize(webhooks, elapsed, args.sla_warn),
+        'signals': summarize(polls, elapsed, args.sla_warn),
+    }
+
+
+def procfile_command(port):
+    """The Procfile's web command, with $PORT and ${VAR:-default} expanded"""
+    with open(PROCFILE) as f:
+        command = next(line.split(':', 1)[1].strip() for line in f if line.startswith('web:'))
+    env = dict(os.environ, PORT=str(port))
+
+    def expand(match):
+        name, default = match.group(1) or match.group(3), match.group(2)
+        return env.get(name) or default or ''
+
+    command = re.sub(r'\$\{(\w+):-([^}]*)\}|\$\{?(\w+)\}?', expand, command)
+    # Keep the benchmark's output readable
+    command = command.replace('--access-logfile -', '').replace('--log-level info', '--log-level warning')
+    return shlex.split(command)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_gunicorn():
+    """Start gunicorn as the Procfile would; returns (process, base URL)"""
+    port = free_port()
+    command = procfile_command(port)
+    command = [arg.replace('0.0.0.0', '127.0.0.1') for arg in command]
+    process = subprocess.Popen(command, cwd=os.path.dirname(PROCFILE), start_new_session=True,
+                               env=dict(os.environ, PORT=str(port)))
+    url = f'http://127.0.0.1:{port}'
+    probe = HTTPClient(url)
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            if probe.request('GET', '/health') == 200:
+                break
+        except OSError:
+            pass
+        if process.poll() is not None or time.monotonic() > deadline:
+            stop_gunicorn(process)
+            raise RuntimeError(f"gunicorn did not start: {' '.join(command)}")
+        time.sleep(0.1)
+    probe.close()
+    return process, url
+
+
+def stop_gunicorn(process):
+    if process.poll() is None:
+        os.killpg(process.pid, signal.SIGTERM)
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.wait()
+
+
+def compare(current, baseline, threshold):
+    """Print how `current` differs from `baseline`; returns the regressed metrics"""
+    regressions = []
+    print(f"\nCompared with {baseline.get('started_at')} ({baseline.get('target')}):")
+    if baseline.get('target') != current['target'] or baseline.get('config') != current['config']:
+        print("  (different target or settings; differences are not only regressions)")
+    for kind in ('webhook', 'signals'):
+        for metric, higher_is_worse in (('p50_ms', True), ('p99_ms', True), ('p999_ms', True),
+                                        ('throughput_rps', False)):
+            old, new = baseline['results'][kind].get(metric), current['results'][kind].get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            regressed = change > threshold if higher_is_worse else change < -threshold
+            if regressed:
+                regressions.append(f'{kind}.{metric}')
+            print(f"  {kind:<8}{metric:<16}{old:>12.3f} -> {new:>12.3f}  {change:+7.1%}"
+                  f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def print_results(results, sla_warn):
+    print(f"{'':<10}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}"
+          f"{'p999 ms':>10}{'max ms':>10}")
+    for kind, r in results.items():
+        values = [r[key] if r[key] is not None else float('nan')
+                  for key in ('p50_ms', 'p99_ms', 'p999_ms', 'max_ms')]
+        print(f"{kind:<10}{r['requests']:>10}{r['errors']:>8}{r['throughput_rps']:>10.1f}"
+              + ''.join(f'{value:>10.2f}' for value in values))
+    near = results['webhook']['near_deadline']
+    if near:
+        print(f"\nSLA WARNING: {near} webhook(s) took >= {sla_warn:.2f} s "
+              f"(TradingView gives up after {TRADINGVIEW_DEADLINE:.0f} s)")
+    else:
+        print(f"\nSLA OK: no webhook took >= {sla_warn:.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--target', choices=('inprocess', 'gunicorn'), default='inprocess')
+    parser.add_argument('--url', help='load an already running server instead of --target')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds')
+    parser.add_argument('--producers', type=int, default=4, help='webhook sender threads')
+    parser.add_argument('--producer-rate', type=float, default=50.0, help='webhooks/s per producer, 0 = max')
+    parser.add_argument('--consumers', type=int, default=2, help='/signals poller threads')
+    parser.add_argument('--consumer-rate', type=float, default=5.0, help='polls/s per consumer, 0 = max')
+    parser.add_argument('--limit', type=int, default=10, help='/signals?limit=')
+    parser.add_argument('--wait', type=float, default=0.0, help='/signals?wait= (long poll)')
+    parser.add_argument('--sla-warn', type=float, default=0.8 * TRADINGVIEW_DEADLINE,
+                        help='flag webhooks at least this slow (seconds)')
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--regression-threshold', type=float, default=0.2,
+                        help='relative change counted as a regression (default 20%%)')
+    args = parser.parse_args()
+
+    target = 'url' if args.url else args.target
+    process = None
+    if args.url:
+        client_factory = lambda: HTTPClient(args.url)
+    elif args.target == 'gunicorn':
+        process, url = start_gunicorn()
+        client_factory = lambda: HTTPClient(url)
+    else:
+        logging.disable(logging.INFO)
+        client_factory = InProcessClient
+
+    started_at = datetime.now().isoformat(timespec='seconds')
+    try:
+        results = run_load(client_factory, args)
+    finally:
+        if process is not None:
+            stop_gunicorn(process)
+
+    report = {
+        'started_at': started_at,
+        'target': args.url or target,
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'environment': {'python': platform.python_version(), 'cpus': os.cpu_count(),
+                        'storage': os.environ.get('SIGNALS_BACKEND', 'memory')},
+        'results': results,
+    }
+    print(f"{target}: {args.producers} producer(s) at {args.producer_rate or 'max'}/s, "
+          f"{args.consumers} consumer(s) at {args.consumer_rate or 'max'}/s for {args.duration:.0f} s\n")
+    print_results(results, args.sla_warn)
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.regression_threshold)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    if results['webhook']['near_deadline'] or regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
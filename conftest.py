@@ -0,0 +1,3 @@
+# test_webhook.py and test_send_signals.py are manual scripts that talk to a
+# running server (python app.py); keep them out of automated pytest runs.
+collect_ignore = ['test_webhook.py', 'test_send_signals.py']
@@ -0,0 +1,335 @@
+"""
+Consumer groups with lease/ack delivery (GET /signals?group=<name>)
+
+Every stored signal is appended to a SignalFeed under a monotonically
+increasing sequence number. A ConsumerGroup keeps its own offset into the feed,
+so each named group sees every signal, independently of other groups and of
+the destructive GET /signals queue.
+
+Signals handed to a group are covered by a lease. The consumer acks the lease
+once it has acted on the signals; if it doesn't within the lease time (bot
+crashed, response lost), the signals are delivered again on the group's next
+fetch. Leases all last the same time, so a FIFO deque is enough to find
+expired ones: fetch, ack and expiry are O(1) per signal, and each group has its
+own lock so groups never contend with each other or with ingest.
+
+The feed also indexes signals by their `timestamp`, which only grows with the
+sequence number, so GET /signals/history finds a time range by bisection
+instead of scanning.
+
+With a `ttl` (signal_expiry.SignalTTL) the feed also records when each signal
+expires, and groups skip expired signals instead of delivering them.
+
+Like SignalStore, the feed keeps signals as compact SignalRecords
+(signal_record.py) rather than the received dicts; get() unpacks them. With
+`max_bytes` (MAX_SIGNALS_BYTES) it also ages out its oldest signals once the
+ones it retains take about that much memory, as the store does.
+
+Group state lives in process memory; it is not part of the write-ahead log.
+"""
+import itertools
+import threading
+import time
+from array import array
+from collections import deque
+from datetime import datetime
+
+from signal_codec import encode_signal
+from signal_record import pack, unpack
+from signal_store import ENTRY_OVERHEAD
+
+DEFAULT_LEASE_SECONDS = 30
+DEFAULT_MAX_GROUPS = 100
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def feed_entry_size(encoded):
+    """Approximate memory held by a signal in the feed: SignalStore's entry_size() less the cached JSON"""
+    return ENTRY_OVERHEAD + len(encoded) * 3 // 2
+
+
+def timestamp_seconds(moment):
+    """Seconds since 1970-01-01 for a naive datetime, as the feed's time index stores them"""
+    return (moment - _EPOCH).total_seconds()
+
+
+class SignalFeed:
+    """Retained window of recent signals, addressed by sequence number"""
+
+    def __init__(self, retention, ttl=None, max_bytes=None):
+        if retention < 1:
+            raise ValueError(f"retention must be at least 1, got {retention}")
+        self.retention = retention
+        self.ttl = ttl or None
+        self.max_bytes = max_bytes or None
+        self._slots = [None] * retention  # seq % retention -> (seq, signal_record.pack(signal))
+        self._times = array('d', bytes(8 * retention))  # seq % retention -> timestamp_seconds
+        # seq % retention -> epoch seconds the signal expires at (0 = never), with a ttl
+        self._deadlines = array('d', bytes(8 * retention)) if self.ttl else None
+        # seq % retention -> feed_entry_size, and their total, with max_bytes
+        self._sizes = array('q', bytes(8 * retention)) if self.max_bytes else None
+        self._bytes = 0
+        self._first_seq = 1  # Oldest seq not aged out by max_bytes
+        self._last_seq = 0
+        self._last_time = 0.0
+        self._last_timestamp = None
+        self._lock = threading.Lock()
+        self._arrival = threading.Condition(threading.Lock())
+        self._waiters = 0
+
+    @property
+    def last_seq(self):
+        return self._last_seq
+
+    @property
+    def first_seq(self):
+        """Oldest sequence number still retained"""
+        return max(self._first_seq, self._last_seq - self.retention + 1)
+
+    def _time(self, signal):
+        """Index time of a signal: its timestamp, kept non-decreasing (lock held)"""
+        timestamp = signal.get('timestamp') if type(signal) is dict else None
+        if timestamp != self._last_timestamp:
+            try:
+                seconds = timestamp_seconds(datetime.fromisoformat(timestamp))
+            except (TypeError, ValueError):
+                seconds = self._last_time  # No usable timestamp: file it with the previous signal
+            else:
+                # A clock stepping back must not unsort the index
+                self._last_time = max(seconds, self._last_time)
+            self._last_timestamp = timestamp
+        return self._last_time
+
+    def append(self, signal, encoded=None):
+        """
+        Add a signal and return its sequence number
+
+        Pass `encoded` (signal_codec bytes) to size the signal for max_bytes
+        without encoding it again.
+        """
+        deadline = self.ttl.deadline(signal, time.time()) if self.ttl else None
+        record = pack(signal)
+        size = feed_entry_size(encoded or encode_signal(signal)) if self.max_bytes else 0
+        with self._lock:
+            seq = self._last_seq + 1
+            self._slots[seq % self.retention] = (seq, record)
+            self._times[seq % self.retention] = self._time(signal)
+            if self._deadlines is not None:
+                self._deadlines[seq % self.retention] = deadline or 0
+            self._last_seq = seq
+            if size:
+                self._account(seq, size)
+        if self._waiters:
+            with self._arrival:
+                self._arrival.notify_all()
+        return seq
+
+    def append_many(self, signals, encoded=None):
+        """Add several signals under one lock acquisition; returns the first sequence number"""
+        now = time.time()
+        deadlines = [self.ttl.deadline(signal, now) or 0 for signal in signals] if self.ttl else None
+        records = [pack(signal) for signal in signals]
+        if self.max_bytes:
+            sizes = [feed_entry_size(data) for data in (encoded or [encode_signal(signal) for signal in signals])]
+        with self._lock:
+            first = seq = self._last_seq + 1
+            for i, signal in enumerate(signals):
+                self._slots[seq % self.retention] = (seq, records[i])
+                self._times[seq % self.retention] = self._time(signal)
+                if deadlines is not None:
+                    self._deadlines[seq % self.retention] = deadlines[i]
+                self._last_seq = seq
+                if self.max_bytes:
+                    self._account(seq, sizes[i])
+                seq += 1
+        if self._waiters:
+            with self._arrival:
+                self._arrival.notify_all()
+        return first
+
+    def _account(self, seq, size):
+        """Record the size of the signal just stored at `seq`, aging out the oldest over max_bytes (lock held)"""
+        sizes, retention = self._sizes, self.retention
+        # The slot's previous signal was overwritten (or aged out already, size 0)
+        self._bytes += size - sizes[seq % retention]
+        sizes[seq % retention] = size
+        first = self.first_seq
+        while self._bytes > self.max_bytes and first < seq:
+            self._bytes -= sizes[first % retention]
+            sizes[first % retention] = 0
+            self._slots[first % retention] = None
+            first += 1
+        self._first_seq = first
+
+    def get(self, seq, now=None):
+        """
+        Return the signal with this sequence number (a new dict), or None if
+        it has aged out (or, given `now` in epoch seconds, expired)
+        """
+        item = self._slots[seq % self.retention]
+        if item is None or item[0] != seq:
+            return None
+        if now is not None and self._deadlines is not None and 0 < self._deadlines[seq % self.retention] <= now:
+            return None
+        return unpack(item[1])
+
+    def seq_range(self, since=None, until=None):
+        """
+        Sequence numbers of the retained signals with since <= time < until
+
+        Times are timestamp_seconds values; None leaves that end open. Returns
+        (first, last), empty when first > last. The lock is held only for the
+        two bisections.
+        """
+        with self._lock:
+            first, last = self.first_seq, self._last_seq
+            if since is not None:
+                first = self._bisect(first, last + 1, since)
+            if until is not None:
+                last = self._bisect(first, last + 1, until) - 1
+        return first, last
+
+    def _bisect(self, low, high, moment):
+        """First seq in [low, high) whose time is >= moment, or high (lock held)"""
+        times, retention = self._times, self.retention
+        while low < high:
+            middle = (low + high) // 2
+            if times[middle % retention] < moment:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def wait(self, after_seq, timeout):
+        """Wait up to `timeout` seconds for a signal newer than `after_seq`"""
+        with self._arrival:
+            self._waiters += 1
+            try:
+                return self._arrival.wait_for(lambda: self._last_seq > after_seq, timeout)
+            finally:
+                self._waiters -= 1
+
+
+class Lease:
+    __slots__ = ('id', 'seqs', 'deadline')
+
+    def __init__(self, lease_id, seqs, deadline):
+        self.id = lease_id
+        self.seqs = seqs
+        self.deadline = deadline
+
+
+class ConsumerGroup:
+    """Offset and outstanding leases of one named group of consumers"""
+
+    def __init__(self, name, feed, lease_seconds, start_seq):
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.offset = start_seq  # Next sequence number never delivered to this group
+        self._feed = feed
+        self._lock = threading.Lock()
+        self._leases = {}  # lease id -> Lease
+        self._expiry = deque()  # Leases in deadline order (all leases last lease_seconds)
+        self._redeliver = deque()  # Sequence numbers whose lease expired
+        self._lease_ids = itertools.count(1)
+
+    def fetch(self, count):
+        """
+        Lease up to `count` signals, oldest first
+
+        Returns (lease, [(seq, signal)], skipped). lease is None when nothing
+        was available; skipped counts signals that aged out of the feed (or
+        expired) before this group read them.
+        """
+        if count <= 0:
+            return None, [], 0
+        now = time.monotonic()
+        wall = time.time()
+        feed = self._feed
+        entries = []
+        skipped = 0
+        with self._lock:
+            self._expire(now)
+            redeliver = self._redeliver
+            while redeliver and len(entries) < count:
+                seq = redeliver.popleft()
+                signal = feed.get(seq, wall)
+                if signal is None:
+                    skipped += 1
+                else:
+                    entries.append((seq, signal))
+
+            if self.offset < feed.first_seq:
+                skipped += feed.first_seq - self.offset
+                self.offset = feed.first_seq
+            last_seq = feed.last_seq
+            while self.offset <= last_seq and len(entries) < count:
+                signal = feed.get(self.offset, wall)
+                if signal is None:
+                    skipped += 1
+                else:
+                    entries.append((self.offset, signal))
+                self.offset += 1
+
+            if not entries:
+                return None, entries, skipped
+            lease = Lease(f'{self.name}-{next(self._lease_ids)}', [seq for seq, _ in entries],
+                          now + self.lease_seconds)
+            self._leases[lease.id] = lease
+            self._expiry.append(lease)
+        return lease, entries, skipped
+
+    def ack(self, lease_id):
+        """Confirm a lease; returns the number of signals acked, or None if the lease expired or is unknown"""
+        with self._lock:
+            self._expire(time.monotonic())
+            lease = self._leases.pop(lease_id, None)
+        return None if lease is None else len(lease.seqs)
+
+    def pending(self):
+        """Signals waiting for this group: undelivered, plus expired leases awaiting redelivery"""
+        with self._lock:
+            return max(0, self._feed.last_seq - max(self.offset, self._feed.first_seq) + 1) + len(self._redeliver)
+
+    def _expire(self, now):
+        """Move signals of expired leases to the redelivery queue (lock held)"""
+        expiry = self._expiry
+        while expiry and expiry[0].deadline <= now:
+            lease = expiry.popleft()
+            # Acked leases are only removed from _leases; skip them here
+            if self._leases.pop(lease.id, None) is not None:
+                self._redeliver.extend(lease.seqs)
+
+
+class ConsumerGroups:
+    """Registry of consumer groups reading from one SignalFeed"""
+
+    def __init__(self, feed, lease_seconds=DEFAULT_LEASE_SECONDS, max_groups=DEFAULT_MAX_GROUPS):
+        self.feed = feed
+        self.lease_seconds = lease_seconds
+        self.max_groups = max_groups
+        self._groups = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._groups)
+
+    def get(self, name, create=False, start='latest'):
+        """
+        Return the group called `name`
+
+        With `create`, a missing group is created, starting at the next new
+        signal ('latest') or at the oldest retained one ('earliest'). Returns
+        None if the group doesn't exist and can't be created.
+        """
+        group = self._groups.get(name)
+        if group is not None or not create:
+            return group
+        with self._lock:
+            group = self._groups.get(name)
+            if group is None and len(self._groups) < self.max_groups:
+                start_seq = self.feed.first_seq if start == 'earliest' else self.feed.last_seq + 1
+                group = ConsumerGroup(name, self.feed, self.lease_seconds, start_seq)
+                self._groups[name] = group
+            return group
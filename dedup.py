@@ -0,0 +1,80 @@
+"""
+Webhook deduplication (idempotency keys)
+
+TradingView retries alerts it thinks failed, and an alert can fire twice. A
+DedupIndex remembers the keys of recently stored signals for a time window so
+copies can be acknowledged without being stored again.
+
+The index is an OrderedDict in insertion order. Every key lives for the same
+window, so insertion order is also expiry order: expired keys are always at the
+front and eviction pops from there. Lookups, inserts and evictions are O(1)
+(amortized), and the number of keys is capped at max_keys, dropping the oldest
+first. Keys are stored as 16-byte digests, so a long idempotency key costs no
+more memory than a short one.
+
+The index is per process (like consumer groups): with several gunicorn workers,
+a retry that reaches a different worker is not caught.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_WINDOW_SECONDS = 60
+DEFAULT_MAX_KEYS = 100000
+
+
+def digest(data):
+    """Fixed-size key for a str or bytes value"""
+    if isinstance(data, str):
+        data = data.encode('utf-8', 'surrogatepass')
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class DedupIndex:
+    """Bounded set of recently seen keys with time-based eviction"""
+
+    def __init__(self, window_seconds=DEFAULT_WINDOW_SECONDS, max_keys=DEFAULT_MAX_KEYS):
+        if window_seconds <= 0:
+            raise ValueError(f"window_seconds must be positive, got {window_seconds}")
+        if max_keys < 1:
+            raise ValueError(f"max_keys must be at least 1, got {max_keys}")
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._entries = OrderedDict()  # key -> (expires at, value), oldest first
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def claim(self, key, value=True):
+        """
+        Record `key` unless it was seen within the window
+
+        Returns None if the key is new (the caller should store the signal), or
+        the `value` recorded with the first copy (anything but None).
+        """
+        now = time.monotonic()
+        entries = self._entries
+        with self._lock:
+            while entries:
+                oldest = next(iter(entries.values()))
+                if oldest[0] > now:
+                    break
+                entries.popitem(last=False)
+            existing = entries.get(key)
+            if existing is not None:
+                return existing[1]
+            entries[key] = (now + self.window_seconds, value)
+            if len(entries) > self.max_keys:
+                entries.popitem(last=False)
+        return None
+
+    def release(self, key):
+        """Forget `key`, e.g. because storing its signal failed and a retry should go through"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -1,29 +1,40 @@
 """
 Example: How to call the signals endpoint from your trading bot
+
+A minimal sketch: each poll opens a new connection. For a real bot use
+signals_client.SignalsClient (connection pooling, retries with backoff,
+adaptive batch size) or its asyncio variant AsyncSignalsClient.
 """
 import requests
 import json
+import time
 from typing import List, Dict, Optional
 
 # Configuration
 SIGNALS_API_URL = "http://localhost:5000"  # Change to your server URL
+LONG_POLL_WAIT = 20  # Seconds the server may hold a /signals request open
 
 
-def get_latest_signals(limit: int = 10) -> Optional[Dict]:
+def get_latest_signals(limit: int = 10, wait: Optional[float] = None) -> Optional[Dict]:
     """
     Get the latest trading signals from the API
     
     Args:
         limit: Number of recent signals to retrieve (default: 10)
+        wait: If set, long-poll: the server holds the request for up to this
+              many seconds until a signal arrives (default: return immediately)
     
     Returns:
         Dictionary with status, count, and signals list, or None on error
     """
+    params = {"limit": limit}
+    if wait:
+        params["wait"] = wait
     try:
         response = requests.get(
             f"{SIGNALS_API_URL}/signals",
-            params={"limit": limit},
-            timeout=5
+            params=params,
+            timeout=5 + (wait or 0)
         )
         response.raise_for_status()  # Raise exception for bad status codes
         return response.json()
@@ -47,13 +58,19 @@ def get_latest_signal() -> Optional[Dict]:
 
 def process_signals():
     """
-    Example: Continuously poll for new signals and process them
+    Example: Continuously long-poll for new signals and process them
     """
     last_signal_timestamp = None
     
     while True:
-        # Get latest signals
-        result = get_latest_signals(limit=1)
+        # Get latest signals; the server answers as soon as one arrives
+        started = time.monotonic()
+        result = get_latest_signals(limit=1, wait=LONG_POLL_WAIT)
+        
+        if result is None:
+            # Request failed - back off briefly instead of hammering the server
+            time.sleep(1)
+            continue
         
         if result and result.get("status") == "success":
             signals = result.get("signals", [])
@@ -70,10 +87,9 @@ def process_signals():
                     process_single_signal(latest_signal)
                     
                     last_signal_timestamp = current_timestamp
-        
-        # Wait before checking again
-        import time
-        time.sleep(1)  # Check every second
+            elif time.monotonic() - started < 1:
+                # Server was too busy to hold the request; fall back to a 1s poll
+                time.sleep(1)
 
 
 def process_single_signal(signal: Dict):
@@ -0,0 +1,132 @@
+"""
+Example: Receive signals as they arrive via the /signals/stream push endpoint
+
+Uses only asyncio from the standard library. The connection is re-opened
+automatically and resumes from the last received event ID, so signals
+published while reconnecting are not missed (as long as they are still in the
+server's replay buffer).
+"""
+import asyncio
+import json
+import ssl
+from typing import AsyncIterator, Dict, Optional
+from urllib.parse import urlsplit
+
+# Configuration
+SIGNALS_API_URL = "http://localhost:5000"  # Change to your server URL
+RECONNECT_DELAY = 2  # Seconds to wait before reconnecting
+
+
+async def stream_signals(base_url: str = SIGNALS_API_URL,
+                         last_event_id: Optional[int] = None,
+                         reconnect: bool = True) -> AsyncIterator[Dict]:
+    """
+    Yield signals from /signals/stream as soon as the server stores them
+    
+    Args:
+        base_url: Signals service URL
+        last_event_id: Resume after this event ID (default: only new signals)
+        reconnect: Reconnect automatically when the connection drops
+    
+    Yields:
+        Signal dictionaries; the event ID is available as signal["_event_id"]
+    """
+    url = urlsplit(base_url)
+    secure = url.scheme == "https"
+    port = url.port or (443 if secure else 80)
+    
+    while True:
+        writer = None
+        try:
+            reader, writer = await asyncio.open_connection(
+                url.hostname, port, ssl=ssl.create_default_context() if secure else None)
+            headers = [
+                f"GET {url.path.rstrip('/')}/signals/stream HTTP/1.1",
+                f"Host: {url.netloc}",
+                "Accept: text/event-stream",
+                "Cache-Control: no-cache",
+            ]
+            if last_event_id is not None:
+                headers.append(f"Last-Event-ID: {last_event_id}")
+            writer.write(("\r\n".join(headers) + "\r\n\r\n").encode())
+            await writer.drain()
+            
+            status_line = await reader.readline()
+            if b" 200 " not in status_line:
+                raise ConnectionError(f"Stream rejected: {status_line.decode().strip()}")
+            chunked = False
+            while (line := await reader.readline()) not in (b"\r\n", b""):
+                if line.lower().startswith(b"transfer-encoding:") and b"chunked" in line.lower():
+                    chunked = True
+            
+            async for event, data, event_id in _read_events(reader, chunked):
+                if event_id is not None:
+                    last_event_id = event_id
+                if event == "signal":
+                    signal = json.loads(data)
+                    signal["_event_id"] = event_id
+                    yield signal
+                elif event == "overflow":
+                    print(f"Warning: missed {json.loads(data)['dropped']} signals")
+        except (OSError, ConnectionError, asyncio.IncompleteReadError) as e:
+            print(f"Stream connection error: {e}")
+        finally:
+            if writer is not None:
+                writer.close()
+        
+        if not reconnect:
+            return
+        await asyncio.sleep(RECONNECT_DELAY)
+
+
+async def _read_lines(reader: asyncio.StreamReader, chunked: bool) -> AsyncIterator[str]:
+    """Yield decoded lines of the response body, undoing chunked transfer encoding"""
+    if not chunked:
+        while line := await reader.readline():
+            yield line.decode().rstrip("\r\n")
+        return
+    
+    pending = b""
+    while True:
+        size = int((await reader.readline()).strip() or b"0", 16)
+        if size == 0:
+            return
+        pending += await reader.readexactly(size)
+        await reader.readexactly(2)  # CRLF after each chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line.decode().rstrip("\r")
+
+
+async def _read_events(reader: asyncio.StreamReader, chunked: bool):
+    """Parse the SSE wire format into (event, data, id) tuples"""
+    event, data, event_id = "message", [], None
+    async for line in _read_lines(reader, chunked):
+        if not line:
+            if data:
+                yield event, "\n".join(data), event_id
+            event, data = "message", []
+        elif line.startswith(":"):
+            continue  # Heartbeat / comment
+        else:
+            field, _, value = line.partition(":")
+            value = value[1:] if value.startswith(" ") else value
+            if field == "event":
+                event = value
+            elif field == "data":
+                data.append(value)
+            elif field == "id":
+                event_id = int(value)
+
+
+async def main():
+    print("=" * 60)
+    print("Trading Bot - Signals Stream Client Example")
+    print("=" * 60)
+    async for signal in stream_signals():
+        print(f"New signal #{signal['_event_id']}: "
+              f"{signal.get('action')} {signal.get('symbol')} @ {signal.get('price')}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
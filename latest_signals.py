@@ -0,0 +1,166 @@
+"""
+Latest signal per symbol, and per symbol and strategy
+
+LatestSignals keeps the most recent signal stored for each symbol (and for
+each symbol/strategy pair) and updates it in O(1) as signals arrive. GET
+/signals/latest serves it without consuming anything, so bots that only need
+the current stance per symbol don't have to drain /signals and reduce the
+results themselves.
+
+Each update bumps a version counter and stamps it on the entries it replaces.
+A view's version is the newest stamp among its entries, so its ETag changes
+only when the view does. A conditional request for an unchanged view is
+answered 304 from the version alone, before anything is serialized. Bodies
+are joined from the signals' cached JSON bytes, and the unfiltered views are
+cached until the next update.
+
+Alerts can carry any symbol and strategy strings, so at most `max_symbols`
+symbols, and `max_strategies` strategies per symbol, are kept. Past that the
+least recently updated one is forgotten.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_SYMBOLS = 10000
+DEFAULT_MAX_STRATEGIES = 100  # Per symbol
+
+
+def _key(text):
+    """A JSON object key, encoded as jsonify would"""
+    return json.dumps(text, ensure_ascii=True).encode()
+
+
+class LatestSignals:
+    """Latest signal per symbol and per (symbol, strategy); versioned for ETags"""
+
+    def __init__(self, max_symbols=DEFAULT_MAX_SYMBOLS, max_strategies=DEFAULT_MAX_STRATEGIES):
+        self.max_symbols = max_symbols
+        self.max_strategies = max_strategies
+        self._lock = threading.Lock()
+        self._symbols = OrderedDict()  # symbol -> (version, encoded key, encoded signal), least recent first
+        self._pairs = {}  # symbol -> OrderedDict(strategy -> (version, encoded key, encoded signal))
+        self._strategies = {}  # strategy -> [version of its latest change, number of symbols with it]
+        self._bodies = {}  # by_strategy -> (version, body) of the unfiltered views
+        self.version = 0
+        self._new_instance()
+        # Workers forked from one preloaded app must not share ETags
+        os.register_at_fork(after_in_child=self._new_instance)
+
+    def _new_instance(self):
+        self.instance = os.urandom(4).hex()
+
+    def __len__(self):
+        return len(self._symbols)
+
+    def clear(self):
+        with self._lock:
+            self._symbols.clear()
+            self._pairs.clear()
+            self._strategies.clear()
+            self._bodies.clear()
+            self.version += 1
+
+    def update(self, signal, encoded):
+        """Record `signal` (with its encoded JSON) as the latest for its symbol and strategy"""
+        symbol = signal.get('symbol')
+        if not isinstance(symbol, str) or not symbol:
+            return  # Unparsed text alerts and the like have no stance to track
+        strategy = signal.get('strategy')
+        with self._lock:
+            self.version += 1
+            known = self._symbols.get(symbol)
+            self._symbols[symbol] = (self.version, known[1] if known else _key(symbol), encoded)
+            if known:
+                self._symbols.move_to_end(symbol)
+            if isinstance(strategy, str) and strategy:
+                strategies = self._pairs.get(symbol)
+                if strategies is None:
+                    strategies = self._pairs[symbol] = OrderedDict()
+                previous = strategies.get(strategy)
+                strategies[strategy] = (self.version, previous[1] if previous else _key(strategy), encoded)
+                stamp = self._strategies.get(strategy)
+                if previous:
+                    strategies.move_to_end(strategy)
+                    stamp[0] = self.version
+                else:
+                    if stamp is None:
+                        self._strategies[strategy] = [self.version, 1]
+                    else:
+                        stamp[0] = self.version
+                        stamp[1] += 1
+                    if len(strategies) > self.max_strategies:
+                        self._forget(strategies.popitem(last=False)[0])
+            if not known and len(self._symbols) > self.max_symbols:
+                evicted = self._symbols.popitem(last=False)[0]
+                for name in self._pairs.pop(evicted, ()):
+                    self._forget(name)
+
+    def _forget(self, strategy):
+        """A symbol's entry for `strategy` was evicted; the strategy's view changed (lock held)"""
+        stamp = self._strategies[strategy]
+        stamp[1] -= 1
+        if stamp[1]:
+            stamp[0] = self.version
+        else:
+            del self._strategies[strategy]
+
+    def view_version(self, by_strategy=False, symbol=None, strategy=None):
+        """Version of a view (arguments as for view()): changes whenever its content does"""
+        if symbol is None:
+            if strategy is None:
+                return self.version
+            stamp = self._strategies.get(strategy)
+            return stamp[0] if stamp else 0
+        if strategy is None:
+            entry = self._symbols.get(symbol)
+        else:
+            entry = self._pairs.get(symbol, {}).get(strategy)
+        return entry[0] if entry else 0
+
+    def etag(self, version):
+        """ETag (unquoted) for a view version; unique per process"""
+        return f'{self.instance}-{version}'
+
+    def view(self, by_strategy=False, symbol=None, strategy=None):
+        """
+        (version, JSON body) of the latest signals
+
+        The body is {"count", "signals", "status", "version"} with `signals`
+        keyed by symbol, or by symbol then strategy with `by_strategy`
+        (signals without a strategy only appear in the per-symbol view).
+        `symbol` and `strategy` narrow it down; `strategy` implies
+        `by_strategy`.
+        """
+        by_strategy = by_strategy or strategy is not None
+        with self._lock:
+            version = self.view_version(by_strategy, symbol, strategy)
+            unfiltered = symbol is None and strategy is None
+            if unfiltered:
+                cached = self._bodies.get(by_strategy)
+                if cached is not None and cached[0] == version:
+                    return cached
+            symbols = [symbol] if symbol is not None else sorted(self._symbols)
+            count = 0
+            parts = []
+            for name in symbols:
+                if not by_strategy:
+                    entry = self._symbols.get(name)
+                    if entry is not None:
+                        parts.append(b'%s:%s' % (entry[1], entry[2]))
+                        count += 1
+                    continue
+                strategies = self._pairs.get(name)
+                if not strategies:
+                    continue
+                names = [strategy] if strategy is not None else sorted(strategies)
+                inner = [b'%s:%s' % (strategies[s][1], strategies[s][2]) for s in names if s in strategies]
+                if inner:
+                    parts.append(b'%s:{%s}' % (self._symbols[name][1], b','.join(inner)))
+                    count += len(inner)
+            body = b'{"count":%d,"signals":{%s},"status":"success","version":%d}\n' % (
+                count, b','.join(parts), version)
+            if unfiltered:
+                self._bodies[by_strategy] = (version, body)
+            return version, body
@@ -0,0 +1,202 @@
+"""
+In-process metrics exposed by GET /metrics in Prometheus text format
+
+Kept deliberately small: counters, callback gauges and fixed-bucket
+histograms. Counters and histograms are sharded per thread: each gunicorn
+thread only ever updates its own shard, so recording a value takes no lock,
+and a scrape sums the shards. Queue depth, drops and the age of the oldest
+signal are read from the storage backend when /metrics is scraped, so they
+cost nothing on the request path.
+
+Every gunicorn worker keeps its own metrics; Prometheus aggregates them by
+instance when each worker is scraped, or use a single worker.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+# Seconds; 3 is TradingView's webhook deadline
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 3.0, 5.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels.items())
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Sharded:
+    """Per-thread lists of numbers, summed on read"""
+
+    __slots__ = ('_size', '_local', '_shards', '_lock')
+
+    def __init__(self, size):
+        self._size = size
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()  # Only taken to add a shard
+
+    def get(self):
+        """The calling thread's shard"""
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = [0] * self._size
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def totals(self):
+        with self._lock:
+            shards = list(self._shards)
+        return [sum(values) for values in zip(*shards)] if shards else [0] * self._size
+
+
+class Counter:
+    __slots__ = ('name', 'labels', '_values', '_fn')
+
+    type = 'counter'
+
+    def __init__(self, name, labels, fn=None):
+        self.name = name
+        self.labels = labels
+        self._values = _Sharded(1)
+        self._fn = fn
+
+    @property
+    def value(self):
+        return self._values.totals()[0]
+
+    def inc(self, amount=1):
+        self._values.get()[0] += amount
+
+    def samples(self):
+        value = self.value if self._fn is None else self._fn()
+        yield self.name + '_total', self.labels, None, value
+
+
+class Gauge:
+    __slots__ = ('name', 'labels', '_fn')
+
+    type = 'gauge'
+
+    def __init__(self, name, labels, fn):
+        self.name = name
+        self.labels = labels
+        self._fn = fn
+
+    def samples(self):
+        value = self._fn()
+        if value is not None:
+            yield self.name, self.labels, None, value
+
+
+class Histogram:
+    __slots__ = ('name', 'labels', 'buckets', '_values')
+
+    type = 'histogram'
+
+    def __init__(self, name, labels, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.labels = labels
+        self.buckets = buckets
+        # One count per bucket, then +Inf, then the sum of observed values
+        self._values = _Sharded(len(buckets) + 2)
+
+    def observe(self, seconds):
+        values = self._values.get()
+        values[bisect_left(self.buckets, seconds)] += 1
+        values[-1] += seconds
+
+    def samples(self):
+        values = self._values.totals()
+        counts, total = values[:-1], values[-1]
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            yield self.name + '_bucket', self.labels, ('le', _format_value(bound)), cumulative
+        yield self.name + '_sum', self.labels, None, total
+        yield self.name + '_count', self.labels, None, cumulative
+
+
+class Registry:
+    """Every metric of the process, rendered together by /metrics"""
+
+    def __init__(self):
+        self._families = {}  # name -> (type, help, [metric])
+
+    def _register(self, metric, help_text):
+        family = self._families.setdefault(metric.name, (metric.type, help_text, []))
+        if family[0] != metric.type:
+            raise ValueError(f"{metric.name} is already registered as a {family[0]}")
+        family[2].append(metric)
+        return metric
+
+    def counter(self, name, help_text, fn=None, **labels):
+        """A counter incremented with inc(), or read from `fn` at scrape time"""
+        return self._register(Counter(name, labels, fn), help_text)
+
+    def gauge(self, name, help_text, fn, **labels):
+        """A gauge read from `fn` at scrape time (None omits the sample)"""
+        return self._register(Gauge(name, labels, fn), help_text)
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS, **labels):
+        return self._register(Histogram(name, labels, buckets), help_text)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for name, (metric_type, help_text, metrics) in self._families.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for metric in metrics:
+                for sample, labels, extra, value in metric.samples():
+                    lines.append(f'{sample}{_format_labels(labels, extra)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+class ContentionTimedLock:
+    """
+    A lock that reports how long callers waited whenever it was already held
+
+    The uncontended path is a single non-blocking acquire, so the clock is only
+    read when there actually was contention. Set `on_wait` to a callable taking
+    the wait in seconds (e.g. Histogram.observe).
+    """
+
+    __slots__ = ('_lock', 'on_wait')
+
+    def __init__(self, lock=None):
+        self._lock = lock or threading.Lock()
+        self.on_wait = None
+
+    def __enter__(self):
+        lock = self._lock
+        if not lock.acquire(False):
+            start = time.perf_counter()
+            lock.acquire()
+            on_wait = self.on_wait
+            if on_wait is not None:
+                on_wait(time.perf_counter() - start)
+        return self
+
+    def __exit__(self, *exc):
+        self._lock.release()
+
+    def acquire(self, blocking=True, timeout=-1):
+        return self._lock.acquire(blocking, timeout)
+
+    def release(self):
+        self._lock.release()
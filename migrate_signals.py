@@ -0,0 +1,563 @@
+"""
+Bulk migration and export of signals between storage formats
+
+    python migrate_signals.py SOURCE DESTINATION [--chunk-size 1000]
+        [--if-exists fail|replace] [--checkpoint PATH] [--restart]
+        [--redis-key signals:list] [--progress 5]
+
+SOURCE and DESTINATION are any of
+
+    signals.json          JSON array, most recent first (the old signals.json)
+    signals.ndjson        one signal per line, most recent first (.ndjson, .jsonl)
+    json:PATH, ndjson:PATH  the same, whatever the file is called
+    redis                 the list SIGNALS_BACKEND=redis serves, using the same
+                          REDIS_URL / REDIS_HOST / ... settings as app.py
+    redis://host:port/db  a Redis server given by URL (also rediss://)
+    store:DIR             the durable in-memory store's write-ahead log
+                          (SIGNALS_WAL_DIR); its snapshot, oldest first
+
+e.g. `python migrate_signals.py signals.json redis --if-exists replace` in a
+deploy hook, or `python migrate_signals.py redis backup.ndjson` for a backup.
+
+Everything streams: JSON arrays and NDJSON are parsed incrementally, and
+signals are written in chunks of --chunk-size (one pipelined round trip per
+chunk for Redis), so memory stays flat however large the input. When the two
+sides list signals in opposite orders (a file to or from store:DIR) the
+stream is reversed through a temporary spool file, one chunk at a time.
+
+Nothing asks for confirmation. A destination that already holds signals is
+an error unless --if-exists replace. The new contents are written aside (a
+.partial file, a temporary Redis key, a snapshot not yet named as one) and
+swapped in when the migration completes, so a reader never sees half of it.
+
+After every chunk the progress is saved to --checkpoint. If the run is
+interrupted, the same command resumes where it stopped; --restart starts
+over. Progress and throughput are printed every --progress seconds. Exits
+with status 1 on an error, leaving the checkpoint in place.
+
+Records that aren't JSON objects are skipped and counted. Stop the service
+(or point it elsewhere) while exporting from it: signals it pops meanwhile
+shift a Redis source under the tool.
+"""
+import argparse
+import codecs
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+from signal_codec import encode_signal
+from signal_log import LOG_SUFFIX, SEGMENT_PREFIX, SNAPSHOT_PREFIX, SignalLog
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_CHECKPOINT = 'migrate_signals.checkpoint'
+READ_SIZE = 1024 * 1024
+MAX_RECORD_CHARS = 16 * 1024 * 1024  # A JSON array element larger than this is an error
+
+# The order a stream lists signals in
+NEWEST_FIRST = 'newest-first'
+OLDEST_FIRST = 'oldest-first'
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class MigrationError(Exception):
+    """A migration that can't proceed; the message says why"""
+
+
+class Stats:
+    """Counts shared by a source and the progress report"""
+
+    def __init__(self):
+        self.skipped = 0
+
+
+def _encode_record(signal, stats):
+    """A parsed JSON value as a stored signal, or None (counted) if it isn't an object"""
+    if isinstance(signal, dict):
+        return encode_signal(signal)
+    stats.skipped += 1
+    return None
+
+
+class NDJSONFile:
+    """One JSON object per line, most recent first"""
+
+    orders = (NEWEST_FIRST,)
+
+    def __init__(self, path):
+        self.path = path
+        self.partial = path + '.partial'
+        self.position = 0
+        self._file = None
+
+    def __str__(self):
+        return f'ndjson:{self.path}'
+
+    # Source
+
+    def records(self, order, stats, position=None):
+        """Yield encoded signals; self.position is the byte offset after the last one yielded"""
+        self.position = position or 0
+        with open(self.path, 'rb') as f:
+            f.seek(self.position)
+            for line in f:
+                self.position += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    encoded = _encode_record(json.loads(line), stats)
+                except ValueError:
+                    stats.skipped += 1
+                    continue
+                if encoded is not None:
+                    yield encoded
+
+    # Destination
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def open(self, state=None):
+        """Start writing (state None) or continue from a checkpointed state; returns signals already written"""
+        self._file = open(self.partial, 'r+b' if state else 'wb')
+        if state:
+            self._file.truncate(state['offset'])
+            self._file.seek(state['offset'])
+            return state['written']
+        return 0
+
+    def write(self, chunk, order, written):
+        self._file.write(b'\n'.join(chunk) + b'\n')
+        self._file.flush()
+
+    def state(self, written):
+        return {'offset': self._file.tell(), 'written': written}
+
+    def finish(self, written):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self.partial, self.path)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+class JSONFile(NDJSONFile):
+    """A JSON array of objects, most recent first; parsed incrementally"""
+
+    def __str__(self):
+        return f'json:{self.path}'
+
+    def records(self, order, stats, position=None, read_size=READ_SIZE):
+        """
+        Yield encoded signals from the array, `read_size` bytes at a time
+
+        self.position is the byte offset just after the last element read;
+        resuming from it continues with the ',' or ']' that follows.
+        """
+        decoder = json.JSONDecoder()
+        text = codecs.getincrementaldecoder('utf-8')()
+        self.position = position or 0
+        expect = ',' if position else '['  # Then 'first' element or ']', 'value', ',' or ']', 'end'
+        buffer = ''
+        index = 0
+        eof = False
+        with open(self.path, 'rb') as f:
+            f.seek(self.position)
+            while True:
+                start = index
+                index = _WHITESPACE.match(buffer, index).end()
+                self.position += index - start  # Whitespace is ASCII: a byte per character
+                if index == len(buffer) or expect in ('first', 'value'):
+                    value = end = None
+                    if index < len(buffer) and buffer[index] != ']':
+                        try:
+                            value, end = decoder.raw_decode(buffer, index)
+                        except ValueError:
+                            pass
+                    # Read more if the buffer ran out - including mid-element, or
+                    # right after a number that might continue
+                    if not eof and (index == len(buffer) or (buffer[index] != ']' and
+                                                             (end is None or end == len(buffer)))):
+                        if len(buffer) - index > MAX_RECORD_CHARS:
+                            raise MigrationError(f"{self.path}: invalid JSON, or an element over "
+                                                 f"{MAX_RECORD_CHARS:,} characters, at byte {self.position}")
+                        data = f.read(read_size)
+                        eof = not data
+                        buffer = buffer[index:] + text.decode(data, final=eof)
+                        index = 0
+                        continue
+                    if index == len(buffer):
+                        if expect != 'end':
+                            raise MigrationError(f"{self.path}: ends before the JSON array does")
+                        return
+                    if end is not None:
+                        element = buffer[index:end]
+                        self.position += len(element) if element.isascii() else len(element.encode())
+                        index = end
+                        expect = ','
+                        encoded = _encode_record(value, stats)
+                        if encoded is not None:
+                            yield encoded
+                        continue
+                char = buffer[index]
+                if expect == '[' and char == '[':
+                    expect = 'first'
+                elif expect == ',' and char == ',':
+                    expect = 'value'
+                elif expect in (',', 'first') and char == ']':
+                    expect = 'end'
+                else:
+                    raise MigrationError(f"{self.path}: invalid JSON array at byte {self.position}")
+                index += 1
+                self.position += 1
+
+    def open(self, state=None):
+        written = super().open(state)
+        if not state:
+            self._file.write(b'[')
+        return written
+
+    def write(self, chunk, order, written):
+        self._file.write((b',\n' if written else b'\n') + b',\n'.join(chunk))
+        self._file.flush()
+
+    def finish(self, written):
+        self._file.write(b'\n]\n')
+        super().finish(written)
+
+
+class RedisList:
+    """The Redis list the app serves from, most recent first (the head)"""
+
+    orders = (NEWEST_FIRST, OLDEST_FIRST)
+
+    def __init__(self, client, key):
+        self.client = client
+        self.key = key
+        self.temporary = f'{key}:migrating'
+        self.progress = f'{key}:migrating:count'  # Signals in the temporary list, kept in step with it
+        self.position = 0
+
+    def __str__(self):
+        options = self.client.connection_pool.connection_kwargs
+        return f"redis://{options.get('host', '')}:{options.get('port', '')}/{options.get('db', 0)} {self.key}"
+
+    # Source
+
+    def records(self, order, stats, position=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Yield stored signals from the head (newest first) or the tail; self.position counts them"""
+        self.position = position or 0
+        while True:
+            start = self.position
+            if order == NEWEST_FIRST:
+                chunk = self.client.lrange(self.key, start, start + chunk_size - 1)
+            else:
+                chunk = self.client.lrange(self.key, -start - chunk_size, -start - 1)[::-1]
+            for encoded in chunk:
+                self.position += 1
+                yield encoded
+            if len(chunk) < chunk_size:
+                return
+
+    # Destination
+
+    def exists(self):
+        return bool(self.client.exists(self.key))
+
+    def open(self, state=None):
+        if state is None:
+            self.client.delete(self.temporary, self.progress)
+            return 0
+        # The count is updated in the same transaction as the list, so it is
+        # exact even if the run stopped before saving its checkpoint
+        return int(self.client.get(self.progress) or 0)
+
+    def write(self, chunk, order, written):
+        pipe = self.client.pipeline(transaction=True)
+        if order == NEWEST_FIRST:
+            pipe.rpush(self.temporary, *chunk)  # Each chunk is older than the last
+        else:
+            pipe.lpush(self.temporary, *chunk)
+        pipe.incrby(self.progress, len(chunk))
+        pipe.execute()
+
+    def state(self, written):
+        return {'written': written}
+
+    def finish(self, written):
+        pipe = self.client.pipeline(transaction=True)
+        if written:
+            pipe.rename(self.temporary, self.key)
+        else:
+            pipe.delete(self.key)
+        pipe.delete(self.progress)
+        pipe.execute()
+
+    def close(self):
+        pass
+
+
+class StoreLog:
+    """The durable in-memory store's write-ahead log directory, oldest first"""
+
+    orders = (OLDEST_FIRST,)
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.snapshot = os.path.join(directory, f'{SNAPSHOT_PREFIX}{0:08d}{LOG_SUFFIX}')
+        self.partial = self.snapshot + '.partial'
+        self.position = 0
+        self._file = None
+
+    def __str__(self):
+        return f'store:{self.directory}'
+
+    # Source
+
+    def records(self, order, stats, position=None):
+        if not os.path.isdir(self.directory):
+            raise MigrationError(f"{self.directory}: no such directory")
+        self.position = 0
+        for _, encoded in SignalLog(self.directory).live_records():
+            self.position += 1
+            if self.position > (position or 0):
+                yield encoded
+
+    # Destination
+
+    def _log_files(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return [name for name in os.listdir(self.directory)
+                if name.startswith((SEGMENT_PREFIX, SNAPSHOT_PREFIX)) and name.endswith(LOG_SUFFIX)]
+
+    def exists(self):
+        return bool(self._log_files())
+
+    def open(self, state=None):
+        os.makedirs(self.directory, exist_ok=True)
+        self._file = open(self.partial, 'r+b' if state else 'wb')
+        if state:
+            self._file.truncate(state['offset'])
+            self._file.seek(state['offset'])
+            return state['written']
+        return 0
+
+    def write(self, chunk, order, written):
+        # Sequence numbers from 1, as if these had been pushed in this order
+        self._file.write(b''.join(b'S\t%d\t%s\n' % (written + i, encoded) for i, encoded in enumerate(chunk, 1)))
+        self._file.flush()
+
+    def state(self, written):
+        return {'offset': self._file.tell(), 'written': written}
+
+    def finish(self, written):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        # Replay reads the newest snapshot and the segments after it, so drop the old log first
+        for name in self._log_files():
+            os.remove(os.path.join(self.directory, name))
+        os.replace(self.partial, self.snapshot)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def open_endpoint(spec, redis_key=None):
+    """The source or destination a command-line argument names"""
+    if spec == 'redis' or spec.startswith(('redis://', 'rediss://', 'unix://')):
+        import redis
+        import redis_backend
+        if spec == 'redis':
+            client = redis.Redis(connection_pool=redis_backend.create_connection_pool())
+        else:
+            client = redis.Redis.from_url(spec, socket_connect_timeout=5, socket_timeout=30)
+        return RedisList(client, redis_key or redis_backend.REDIS_SIGNALS_KEY)
+    kind, separator, path = spec.partition(':')
+    if separator and kind in ('json', 'ndjson', 'store'):
+        return {'json': JSONFile, 'ndjson': NDJSONFile, 'store': StoreLog}[kind](path)
+    if spec.endswith(('.ndjson', '.jsonl')):
+        return NDJSONFile(spec)
+    if spec.endswith('.json'):
+        return JSONFile(spec)
+    raise MigrationError(f"Don't know what {spec!r} is: use a .json/.ndjson path, json:PATH, ndjson:PATH, "
+                         f"redis, a redis:// URL or store:DIR")
+
+
+def reverse_records(records, chunk_size):
+    """Yield `records` last first, spooling them to a temporary file a chunk at a time"""
+    with tempfile.TemporaryFile(prefix='migrate-signals-') as spool:
+        chunks = []  # (start, end) offsets in the spool
+        chunk = []
+
+        def flush():
+            start = spool.tell()
+            spool.write(b'\n'.join(chunk) + b'\n')
+            chunks.append((start, spool.tell()))
+            chunk.clear()
+
+        for encoded in records:
+            chunk.append(encoded)
+            if len(chunk) >= chunk_size:
+                flush()
+        if chunk:
+            flush()
+        for start, end in reversed(chunks):
+            spool.seek(start)
+            yield from reversed(spool.read(end - start).split(b'\n')[:-1])
+
+
+class Progress:
+    """Prints how far a migration has got, at most every `interval` seconds"""
+
+    def __init__(self, interval, stats, out=None):
+        self.interval = interval
+        self.stats = stats
+        self.out = out or sys.stderr
+        self.count = 0
+        self.bytes = 0
+        self.started = time.monotonic()
+        self._reported = self.started
+
+    def update(self, chunk):
+        self.count += len(chunk)
+        self.bytes += sum(len(encoded) for encoded in chunk)
+        now = time.monotonic()
+        if self.interval is not None and now - self._reported >= self.interval:
+            self._reported = now
+            self.report()
+
+    def report(self, prefix='Migrated'):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        skipped = f", skipped {self.stats.skipped:,} invalid" if self.stats.skipped else ''
+        print(f"{prefix} {self.count:,} signals ({self.bytes / 1e6:.1f} MB) in {elapsed:.1f}s, "
+              f"{self.count / elapsed:,.0f} signals/s{skipped}", file=self.out, flush=True)
+
+
+def _load_checkpoint(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        raise MigrationError(f"{path} is not a checkpoint; remove it or pass --restart")
+
+
+def _save_checkpoint(path, checkpoint):
+    with open(path + '.tmp', 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(path + '.tmp', path)
+
+
+def migrate(source, destination, chunk_size=DEFAULT_CHUNK_SIZE, if_exists='fail',
+            checkpoint_path=DEFAULT_CHECKPOINT, restart=False, progress_interval=5.0):
+    """
+    Copy every signal from `source` to `destination`, resuming from a checkpoint if there is one
+
+    Returns the number of signals written in total (including any written by
+    the run being resumed).
+    """
+    if chunk_size < 1:
+        raise MigrationError(f"--chunk-size must be at least 1, got {chunk_size}")
+    checkpoint = None if restart else _load_checkpoint(checkpoint_path)
+    if checkpoint is not None and (checkpoint['source'], checkpoint['destination']) != (str(source),
+                                                                                         str(destination)):
+        raise MigrationError(f"{checkpoint_path} is from migrating {checkpoint['source']} to "
+                             f"{checkpoint['destination']}; pass --checkpoint to use another file, or --restart")
+    if checkpoint is None and if_exists == 'fail' and destination.exists():
+        raise MigrationError(f"{destination} already holds signals; pass --if-exists replace to overwrite it")
+
+    shared = [order for order in destination.orders if order in source.orders]
+    order = shared[0] if shared else destination.orders[0]
+    stats = Stats()
+    progress = Progress(progress_interval, stats)
+    try:
+        written = destination.open(checkpoint['destination_state'] if checkpoint else None)
+        if checkpoint and shared:
+            # Pick the source up where the checkpoint left it, then skip anything
+            # the destination took after the checkpoint was saved
+            records = source.records(order, stats, position=checkpoint['source_position'])
+            skip = written - checkpoint['written']
+        else:
+            records = source.records(order, stats)
+            if not shared:
+                records = reverse_records(records, chunk_size)
+            skip = written
+        if written:
+            print(f"Resuming after {written:,} signals", file=sys.stderr, flush=True)
+
+        chunk = []
+        for encoded in records:
+            if skip:
+                skip -= 1
+                continue
+            chunk.append(encoded)
+            if len(chunk) >= chunk_size:
+                written = _write_chunk(source, destination, chunk, order, written, shared, checkpoint_path)
+                progress.update(chunk)
+                chunk = []
+        if chunk:
+            written = _write_chunk(source, destination, chunk, order, written, shared, checkpoint_path)
+            progress.update(chunk)
+        destination.finish(written)
+    finally:
+        destination.close()
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    progress.report()
+    return written
+
+
+def _write_chunk(source, destination, chunk, order, written, shared, checkpoint_path):
+    destination.write(chunk, order, written)
+    written += len(chunk)
+    _save_checkpoint(checkpoint_path, {
+        'source': str(source),
+        'destination': str(destination),
+        'written': written,
+        # Without a shared order the source went through the spool; resume by counting instead
+        'source_position': source.position if shared else None,
+        'destination_state': destination.state(written),
+    })
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('source')
+    parser.add_argument('destination')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='signals per write')
+    parser.add_argument('--if-exists', choices=('fail', 'replace'), default='fail',
+                        help='when the destination already holds signals')
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT, help='progress file for resuming')
+    parser.add_argument('--restart', action='store_true', help='ignore an existing checkpoint')
+    parser.add_argument('--redis-key', help='Redis list (default: the one the app uses)')
+    parser.add_argument('--progress', type=float, default=5.0, help='seconds between progress lines')
+    args = parser.parse_args(argv)
+
+    try:
+        source = open_endpoint(args.source, args.redis_key)
+        destination = open_endpoint(args.destination, args.redis_key)
+        migrate(source, destination, chunk_size=args.chunk_size, if_exists=args.if_exists,
+                checkpoint_path=args.checkpoint, restart=args.restart, progress_interval=args.progress)
+    except (MigrationError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    except Exception as e:
+        # e.g. redis.exceptions.RedisError; the checkpoint is kept for a retry
+        print(f"Error: {type(e).__name__}: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
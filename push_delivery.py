@@ -0,0 +1,375 @@
+"""
+Outbound push delivery of signals to bots' own HTTP endpoints
+
+Bots that would rather be called than poll register a destination URL (see
+POST /destinations). Every signal stored is appended to the pending queue of
+each matching destination - a few deque appends, so /webhook never waits for
+delivery - and a pool of background worker threads POSTs it on.
+
+- Micro-batching: a destination's first pending signal waits `batch_delay`
+  seconds for company, then up to `batch_size` signals go out as one JSON
+  array, the format POST /webhook/batch accepts.
+- Connections: each destination keeps its own keep-alive connections, so a
+  steady stream costs one TCP (and TLS) handshake rather than one per batch.
+- Ordering: a destination has at most one batch in flight, so it receives
+  signals in the order they were stored.
+- Retries: connection errors, timeouts, 429 and 5xx are retried with
+  exponential backoff and full jitter. A retried batch keeps its
+  Idempotency-Key header, so a receiver can drop a batch it already has.
+  Keys start with a random prefix drawn per process (and again after fork),
+  so workers and restarts never reuse one for a different batch. A
+  batch that fails `max_retries` times, or that gets another 4xx, goes to
+  the dead-letter queue instead. Dead letters can be inspected and requeued.
+- Backpressure: each destination queues at most `queue_size` signals; past
+  that its oldest pending signals are dropped (and counted), so one dead bot
+  can't exhaust memory.
+- Expiry: with a SignalTTL, each signal keeps the deadline it would have in
+  the store. Expired signals are dropped (and counted) before every attempt,
+  including retries, and when dead letters are requeued.
+
+Destinations are scheduled on a single heap ordered by when they are next
+due, whether that is after the batching delay or after a retry backoff, so a
+destination in backoff never occupies a worker.
+
+Destinations and their queues live in process memory, per worker process.
+"""
+import heapq
+import http.client
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+from signal_expiry import signal_time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 4
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_BATCH_DELAY = 0.005
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_DEAD_LETTERS = 1000
+DEFAULT_MAX_DESTINATIONS = 100
+RETRY_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class Destination:
+    """A registered endpoint and its pending signals"""
+
+    def __init__(self, destination_id, url, symbol=None, strategy=None, queue_size=DEFAULT_QUEUE_SIZE):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError(f"Destination URL must be http(s)://host/..., got {url!r}")
+        self.id = destination_id
+        self.url = url
+        self.symbol = symbol
+        self.strategy = strategy
+        self._connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self._address = (parts.hostname, parts.port)
+        self._path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+        self._idle = []  # Keep-alive connections to this destination
+        self.pending = deque(maxlen=queue_size)  # (encoded, expires) not yet handed to a worker
+        self.retry_batch = None  # (idempotency key, [(encoded, expires)]) awaiting another attempt
+        self.attempts = 0
+        self.scheduled = False  # On the dispatcher's heap, or being delivered
+        self.removed = False
+        self.batches = itertools.count(1)
+        self.delivered = 0
+        self.dropped = 0
+        self.expired = 0
+        self.dead_lettered = 0
+        self.last_error = None
+
+    def matches(self, signal):
+        return ((self.symbol is None or signal.get('symbol') == self.symbol)
+                and (self.strategy is None or signal.get('strategy') == self.strategy))
+
+    def info(self):
+        return {
+            'id': self.id,
+            'url': self.url,
+            'symbol': self.symbol,
+            'strategy': self.strategy,
+            'pending': len(self.pending) + (len(self.retry_batch[1]) if self.retry_batch else 0),
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'expired': self.expired,
+            'dead_lettered': self.dead_lettered,
+            'last_error': self.last_error,
+        }
+
+    def post(self, body, idempotency_key, timeout):
+        """POST `body` over a pooled connection; returns the response status"""
+        headers = {'Content-Type': 'application/json', 'Idempotency-Key': idempotency_key}
+        connection = self._idle.pop() if self._idle else None
+        if connection is not None:
+            try:
+                return self._exchange(connection, body, headers)
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                pass  # The receiver closed the idle connection; retry once on a new one
+        connection = self._connection_class(*self._address, timeout=timeout)
+        return self._exchange(connection, body, headers)
+
+    def _exchange(self, connection, body, headers):
+        try:
+            connection.request('POST', self._path, body, headers)
+            response = connection.getresponse()
+            response.read()
+        except BaseException:
+            connection.close()
+            raise
+        if response.will_close:
+            connection.close()
+        else:
+            self._idle.append(connection)
+        return response.status
+
+    def close(self):
+        idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+
+class PushDispatcher:
+    """Fans stored signals out to registered destinations on a worker pool"""
+
+    def __init__(self, workers=DEFAULT_WORKERS, batch_size=DEFAULT_BATCH_SIZE, batch_delay=DEFAULT_BATCH_DELAY,
+                 max_retries=5, backoff=0.5, max_backoff=30.0, timeout=5.0, queue_size=DEFAULT_QUEUE_SIZE,
+                 dead_letters=DEFAULT_DEAD_LETTERS, max_destinations=DEFAULT_MAX_DESTINATIONS, ttl=None):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.queue_size = queue_size
+        self.max_destinations = max_destinations
+        self.ttl = ttl  # SignalTTL, or None if signals never expire
+        self._destinations = {}  # id -> Destination
+        self._ids = itertools.count(1)
+        self._due = []  # Heap of (due time, tiebreak, Destination)
+        self._tiebreak = itertools.count()
+        self._ready = threading.Condition(threading.Lock())
+        self._threads = []
+        self._pid = None
+        self._closed = False
+        self._new_instance()
+        # Workers forked from one preloaded app must not send the same Idempotency-Keys
+        os.register_at_fork(after_in_child=self._new_instance)
+        self.dead_letters = deque(maxlen=dead_letters)  # Batches given up on, oldest first
+        self.delivered = 0
+        self.retries = 0
+        self.expired = 0
+
+    def _new_instance(self):
+        self.instance = os.urandom(8).hex()
+
+    def __len__(self):
+        return len(self._destinations)
+
+    def register(self, url, symbol=None, strategy=None):
+        """Add a destination; returns it, or None if max_destinations are registered"""
+        with self._ready:
+            if len(self._destinations) >= self.max_destinations:
+                return None
+            destination = Destination(f'd{next(self._ids)}', url, symbol, strategy, self.queue_size)
+            self._destinations[destination.id] = destination
+            return destination
+
+    def unregister(self, destination_id):
+        """Remove a destination and discard its pending signals; returns False if unknown"""
+        with self._ready:
+            destination = self._destinations.pop(destination_id, None)
+            if destination is None:
+                return False
+            destination.removed = True
+            destination.pending.clear()
+            destination.retry_batch = None
+        return True
+
+    def get(self, destination_id):
+        return self._destinations.get(destination_id)
+
+    def destinations(self):
+        return list(self._destinations.values())
+
+    def pending(self):
+        return sum(len(destination.pending) for destination in self._destinations.values())
+
+    def publish(self, signals):
+        """Queue (signal, encoded) pairs for every matching destination; never blocks on delivery"""
+        if not self._destinations:
+            return
+        if self._pid != os.getpid():
+            self._start()
+        ttl, arrived = self.ttl, time.time()
+        deadlines = [ttl.deadline(signal, signal_time(signal) or arrived) if ttl else None for signal, _ in signals]
+        with self._ready:
+            now = time.monotonic()
+            for destination in self._destinations.values():
+                queued = False
+                for (signal, encoded), expires in zip(signals, deadlines):
+                    if destination.matches(signal):
+                        if len(destination.pending) == destination.pending.maxlen:
+                            destination.dropped += 1
+                        destination.pending.append((encoded, expires))
+                        queued = True
+                if queued and not destination.scheduled:
+                    self._schedule(destination, now + self.batch_delay)
+
+    def requeue_dead_letters(self):
+        """Queue every dead-lettered batch again for its destination; returns the number of signals requeued"""
+        requeued = 0
+        with self._ready:
+            letters, self.dead_letters = list(self.dead_letters), deque(maxlen=self.dead_letters.maxlen)
+            now = time.monotonic()
+            for letter in letters:
+                destination = self._destinations.get(letter['destination'])
+                if destination is None:
+                    continue
+                signals = self._unexpired(destination, letter['signals'])
+                for item in signals:
+                    if len(destination.pending) == destination.pending.maxlen:
+                        destination.dropped += 1
+                    destination.pending.append(item)
+                requeued += len(signals)
+                if signals and not destination.scheduled:
+                    self._schedule(destination, now)
+        return requeued
+
+    def close(self, timeout=5.0):
+        """Stop the workers (undelivered signals are discarded) and close connections"""
+        with self._ready:
+            self._closed = True
+            self._ready.notify_all()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        for destination in self.destinations():
+            destination.close()
+
+    def _start(self):
+        with self._ready:
+            if self._pid == os.getpid():
+                return
+            # Threads don't survive fork: a worker forked from a preloaded app starts its own
+            self._pid = os.getpid()
+            self._threads = [threading.Thread(target=self._work, name=f'push-{i}', daemon=True)
+                             for i in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def _schedule(self, destination, due):
+        """Put a destination on the heap (lock held)"""
+        destination.scheduled = True
+        heapq.heappush(self._due, (due, next(self._tiebreak), destination))
+        self._ready.notify()
+
+    def _unexpired(self, destination, signals):
+        """The (encoded, expires) items whose TTL hasn't passed, counting the rest (lock held)"""
+        if self.ttl is None:
+            return signals
+        now = time.time()
+        live = [item for item in signals if item[1] is None or item[1] > now]
+        if len(live) < len(signals):
+            destination.expired += len(signals) - len(live)
+            self.expired += len(signals) - len(live)
+        return live
+
+    def _batch_key(self, destination):
+        """Idempotency-Key for a new batch to `destination`"""
+        return f'{self.instance}-{destination.id}-{next(destination.batches)}'
+
+    def _take(self, destination):
+        """Pop the next batch of unexpired pending signals (lock held)"""
+        pending = destination.pending
+        if self.ttl is None:
+            return [pending.popleft() for _ in range(min(self.batch_size, len(pending)))]
+        signals = []
+        now = time.time()
+        while pending and len(signals) < self.batch_size:
+            item = pending.popleft()
+            if item[1] is None or item[1] > now:
+                signals.append(item)
+            else:
+                destination.expired += 1
+                self.expired += 1
+        return signals
+
+    def _next(self):
+        """Wait for the next due destination; returns (destination, batch), or None once closed"""
+        with self._ready:
+            while not self._closed:
+                if self._due:
+                    delay = self._due[0][0] - time.monotonic()
+                    if delay <= 0:
+                        destination = heapq.heappop(self._due)[2]
+                        if destination.removed:
+                            continue
+                        if destination.retry_batch is not None:
+                            # Retry what is still live under the same key, or give up on the batch
+                            key, signals = destination.retry_batch
+                            signals = self._unexpired(destination, signals)
+                            if signals:
+                                destination.retry_batch = (key, signals)
+                            else:
+                                destination.retry_batch = None
+                                destination.attempts = 0
+                        if destination.retry_batch is None:
+                            signals = self._take(destination)
+                            if not signals:
+                                destination.scheduled = False
+                                continue
+                            destination.retry_batch = (self._batch_key(destination), signals)
+                        return destination, destination.retry_batch
+                    self._ready.wait(delay)
+                else:
+                    self._ready.wait()
+            return None
+
+    def _work(self):
+        while True:
+            taken = self._next()
+            if taken is None:
+                return
+            destination, (key, signals) = taken
+            try:
+                status = destination.post(b'[%s]' % b','.join(encoded for encoded, _ in signals), key, self.timeout)
+                error = None if 200 <= status < 300 else f'HTTP {status}'
+                retry = status in RETRY_STATUSES
+            except (OSError, http.client.HTTPException) as e:
+                error = f'{type(e).__name__}: {e}'
+                retry = True
+            self._finish(destination, signals, error, retry)
+
+    def _finish(self, destination, signals, error, retry):
+        with self._ready:
+            now = time.monotonic()
+            if error is None:
+                destination.delivered += len(signals)
+                self.delivered += len(signals)
+            else:
+                destination.last_error = error
+            if error is not None and retry and destination.attempts < self.max_retries:
+                # Same batch again after a jittered, capped exponential backoff
+                delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** destination.attempts))
+                destination.attempts += 1
+                self.retries += 1
+                self._schedule(destination, now + delay)
+                return
+            if error is not None:
+                logger.warning(f"Push to {destination.url} failed ({error}); {len(signals)} signals dead-lettered")
+                destination.dead_lettered += len(signals)
+                self.dead_letters.append({'destination': destination.id, 'url': destination.url, 'error': error,
+                                          'failed_at': time.time(), 'signals': signals})
+            destination.retry_batch = None
+            destination.attempts = 0
+            if destination.pending and not destination.removed:
+                self._schedule(destination, now)
+            else:
+                destination.scheduled = False
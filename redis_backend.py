@@ -0,0 +1,161 @@
+"""
+Redis storage backend (SIGNALS_BACKEND=redis)
+
+Signals are stored as JSON strings in one Redis list, most recent first, under
+the same `signals:list` key migrate_json_to_redis.py writes to. Because the
+queue lives in Redis, gunicorn can run several workers and signals survive
+application restarts.
+
+- All threads share one blocking connection pool.
+- push is LPUSH + LTRIM sent as one pipelined MULTI/EXEC (one round trip);
+  push_many sends a whole batch in a single multi-value LPUSH.
+- pop is a single `LPOP key count` (Redis >= 6.2), which removes a batch
+  atomically.
+- Filtered pops (symbol/strategy) run as a Lua script so matching and removal
+  are atomic. Unlike the in-memory store this scans the list server-side.
+- Signals are stored in signal_codec's encoding, so pop_encoded hands the
+  stored bytes straight to the response without decoding them.
+"""
+import os
+import threading
+import time
+from datetime import datetime
+
+import redis
+
+from signal_codec import decode, encode_signal
+from storage_backends import StorageBackend
+
+# Redis configuration (migrate_json_to_redis.py reads the same variables)
+REDIS_URL = os.getenv('REDIS_URL')
+REDIS_HOST = os.getenv('REDIS_HOST', 'localhost')
+REDIS_PORT = int(os.getenv('REDIS_PORT', 6379))
+REDIS_DB = int(os.getenv('REDIS_DB', 0))
+REDIS_PASSWORD = os.getenv('REDIS_PASSWORD', None)
+REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', 20))
+
+REDIS_SIGNALS_KEY = 'signals:list'
+
+# Long polls block in slices no longer than this so they stay well inside the
+# connection's socket timeout; filtered long polls re-check at FILTERED_POLL_INTERVAL
+BLOCKING_SLICE = 1.0
+FILTERED_POLL_INTERVAL = 0.1
+
+# KEYS[1] = list, ARGV = count, symbol ('' = any), strategy ('' = any)
+POP_MATCHING_SCRIPT = """
+local count = tonumber(ARGV[1])
+local matched = {}
+for _, raw in ipairs(redis.call('LRANGE', KEYS[1], 0, -1)) do
+    local ok, signal = pcall(cjson.decode, raw)
+    if ok and type(signal) == 'table'
+            and (ARGV[2] == '' or tostring(signal['symbol']) == ARGV[2])
+            and (ARGV[3] == '' or tostring(signal['strategy']) == ARGV[3]) then
+        matched[#matched + 1] = raw
+        if #matched >= count then break end
+    end
+end
+for _, raw in ipairs(matched) do
+    redis.call('LREM', KEYS[1], 1, raw)
+end
+return matched
+"""
+
+
+def create_connection_pool():
+    """Connection pool shared by every thread in this process"""
+    options = {
+        'max_connections': REDIS_MAX_CONNECTIONS,
+        'socket_connect_timeout': 5,
+        'socket_timeout': 5,
+    }
+    if REDIS_URL:
+        return redis.BlockingConnectionPool.from_url(REDIS_URL, **options)
+    return redis.BlockingConnectionPool(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB,
+                                        password=REDIS_PASSWORD, **options)
+
+
+class RedisBackend(StorageBackend):
+    """Signals kept in a capped Redis list, most recent first"""
+
+    name = 'redis'
+
+    def __init__(self, capacity, client=None, key=REDIS_SIGNALS_KEY):
+        if capacity < 1:
+            raise ValueError(f"capacity must be at least 1, got {capacity}")
+        self.capacity = capacity
+        self.key = key
+        self._client = client or redis.Redis(connection_pool=create_connection_pool())
+        self._pop_matching_script = self._client.register_script(POP_MATCHING_SCRIPT)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def __len__(self):
+        return self._client.llen(self.key)
+
+    def push(self, signal, encoded=None):
+        pipe = self._client.pipeline(transaction=True)
+        pipe.lpush(self.key, encoded or encode_signal(signal))
+        pipe.ltrim(self.key, 0, self.capacity - 1)
+        length, _ = pipe.execute()
+        self._count_dropped(length)
+
+    def push_many(self, signals, encoded=None):
+        if not signals:
+            return []
+        if encoded is None:
+            encoded = [encode_signal(signal) for signal in signals]
+        pipe = self._client.pipeline(transaction=True)
+        pipe.lpush(self.key, *encoded)
+        pipe.ltrim(self.key, 0, self.capacity - 1)
+        length, _ = pipe.execute()
+        self._count_dropped(length)
+        return [None] * len(signals)
+
+    def pop(self, count, timeout=None, symbol=None, strategy=None):
+        return [decode(raw) for raw in self.pop_encoded(count, timeout, symbol, strategy)]
+
+    def pop_encoded(self, count, timeout=None, symbol=None, strategy=None):
+        if count <= 0:
+            return []
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            if symbol is None and strategy is None:
+                raw = self._client.lpop(self.key, count) or []
+            else:
+                raw = self._pop_matching_script(
+                    keys=[self.key], args=[count, symbol or '', strategy or ''])
+            if raw or deadline is None:
+                return raw
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return []
+            if symbol is None and strategy is None:
+                # Block server-side until something is pushed, then take the rest of the batch
+                item = self._client.blpop([self.key], timeout=min(remaining, BLOCKING_SLICE))
+                if item is not None:
+                    rest = self._client.lpop(self.key, count - 1) if count > 1 else None
+                    return [item[1]] + (rest or [])
+            else:
+                time.sleep(min(remaining, FILTERED_POLL_INTERVAL))
+
+    def _count_dropped(self, length):
+        """Count signals LTRIM discarded, given the list length LPUSH returned (this process only)"""
+        if length > self.capacity:
+            with self._dropped_lock:
+                self.dropped += length - self.capacity
+
+    def oldest_age(self):
+        """Age of the oldest signal, from the `timestamp` /webhook stamped on it"""
+        raw = self._client.lindex(self.key, -1)
+        if raw is None:
+            return None
+        try:
+            return time.time() - datetime.fromisoformat(decode(raw)['timestamp']).timestamp()
+        except (ValueError, TypeError, KeyError):
+            return None
+
+    def snapshot(self):
+        return [decode(item) for item in self._client.lrange(self.key, 0, -1)]
+
+    def clear(self):
+        self._client.delete(self.key)
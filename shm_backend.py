@@ -0,0 +1,320 @@
+"""
+Shared-memory storage backend (SIGNALS_BACKEND=shm)
+
+The queue lives in a POSIX shared memory segment instead of one process's
+heap, so gunicorn can run several workers (`--workers N`) on one machine and
+any worker can ingest a webhook or serve /signals from the same queue, with the
+same semantics as the in-memory SignalStore: bounded, oldest signal discarded
+once full, most recent served first, optional symbol/strategy filters.
+
+Layout: a fixed header followed by `capacity` fixed-size slots used as a ring.
+Slots between `start` (oldest) and `start + span` hold entries in arrival
+order; each slot carries the signal's sequence number and arrival time,
+64-bit hashes of its symbol and strategy (so filtered pops never decode JSON),
+a live flag and the signal's encoded JSON bytes (signal_codec). Unfiltered
+pops take live slots from the newest end; filtered pops clear the live flag of
+matching slots, and the ring is compacted when those holes would otherwise
+cost a live signal.
+
+Every operation holds a threading.Lock (threads of one worker) plus an flock
+on a lock file (other workers). Long polls can't wait on a condition variable
+across processes, so they re-check the segment's push counter every
+POLL_INTERVAL seconds without taking the lock.
+
+The segment outlives the workers (signals survive a worker restart, not a
+reboot). If MAX_SIGNALS or SIGNALS_SHM_SLOT_SIZE change, the old segment must
+be removed first (it is at /dev/shm/<SIGNALS_SHM_NAME> on Linux).
+"""
+import fcntl
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+from signal_codec import decode, encode_signal
+from signal_store import partition_key
+from storage_backends import StorageBackend, StoreFullError
+
+SIGNALS_SHM_NAME = os.getenv('SIGNALS_SHM_NAME', 'bot_signals')
+SIGNALS_SHM_SLOT_SIZE = int(os.getenv('SIGNALS_SHM_SLOT_SIZE', 4096))  # Per signal, header included
+
+POLL_INTERVAL = 0.01
+
+_MAGIC = b'SIGSHM02'
+# magic, capacity, slot size, last seq, start, span, live
+_HEADER = struct.Struct('<8sIIQQQQ')
+_HEADER_SIZE = 64
+_LAST_SEQ_OFFSET = struct.calcsize('<8sII')
+_DROPPED_OFFSET = _HEADER.size  # Signals evicted because the ring was full
+# seq, symbol hash, strategy hash, arrival time (epoch seconds), length, live
+_SLOT = struct.Struct('<QQQdIB')
+_SLOT_HEADER_SIZE = 48
+_COUNTER = struct.Struct('<Q')
+
+
+def key_hash(value):
+    """Stable (cross-process) 64-bit hash of a symbol or strategy; 0 means None"""
+    if value is None:
+        return 0
+    digest = hashlib.blake2b(value.encode('utf-8', 'surrogatepass'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') or 1
+
+
+class SharedMemoryBackend(StorageBackend):
+    """Signals kept in a shared memory ring buffer, shared by every worker process on the host"""
+
+    name = 'shared-memory'
+
+    def __init__(self, capacity, shm_name=SIGNALS_SHM_NAME, slot_size=SIGNALS_SHM_SLOT_SIZE, lock_path=None,
+                 overflow='drop-oldest'):
+        if capacity < 1:
+            raise ValueError(f"capacity must be at least 1, got {capacity}")
+        if overflow not in ('drop-oldest', 'reject'):
+            raise ValueError(f"overflow must be 'drop-oldest' or 'reject', got {overflow!r}")
+        if slot_size <= _SLOT_HEADER_SIZE:
+            raise ValueError(f"slot_size must be larger than {_SLOT_HEADER_SIZE}, got {slot_size}")
+        self.capacity = capacity
+        self.overflow = overflow
+        self.rejected = 0  # Per process, unlike dropped
+        self.slot_size = slot_size
+        self.shm_name = shm_name
+        self.lock_path = lock_path or os.path.join(tempfile.gettempdir(), f'{shm_name}.lock')
+        self._thread_lock = threading.Lock()
+        self._lock_file = None
+        self._lock_pid = None
+        self._on_lock_wait = None
+        try:
+            with self._locked():
+                self._shm = self._open_segment()
+        except BaseException:
+            if self._lock_file is not None:
+                self._lock_file.close()
+            raise
+        self._buf = self._shm.buf
+
+    def _open_segment(self):
+        """Create the segment, or attach to the one another worker created (lock held)"""
+        size = _HEADER_SIZE + self.capacity * self.slot_size
+        try:
+            shm = shared_memory.SharedMemory(name=self.shm_name, create=True, size=size)
+            _HEADER.pack_into(shm.buf, 0, _MAGIC, self.capacity, self.slot_size, 0, 0, 0, 0)
+            _COUNTER.pack_into(shm.buf, _DROPPED_OFFSET, 0)
+        except FileExistsError:
+            shm = shared_memory.SharedMemory(name=self.shm_name)
+            magic, capacity, slot_size = _HEADER.unpack_from(shm.buf, 0)[:3]
+            if (magic, capacity, slot_size) != (_MAGIC, self.capacity, self.slot_size):
+                shm.close()
+                raise ValueError(
+                    f"Shared memory segment {self.shm_name!r} has capacity {capacity} and slot size "
+                    f"{slot_size}, expected {self.capacity} and {self.slot_size}; remove it and restart")
+        # Workers come and go; the segment must not be unlinked when one exits
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+    def _locked(self):
+        """Context manager holding both the thread lock and the cross-process flock"""
+        return _ProcessLock(self)
+
+    def _header(self):
+        return _HEADER.unpack_from(self._buf, 0)[3:]
+
+    def _set_header(self, last_seq, start, span, live):
+        _HEADER.pack_into(self._buf, 0, _MAGIC, self.capacity, self.slot_size, last_seq, start, span, live)
+
+    def _offset(self, index):
+        return _HEADER_SIZE + (index % self.capacity) * self.slot_size
+
+    def __len__(self):
+        with self._locked():
+            return self._header()[3]
+
+    @property
+    def dropped(self):
+        return _COUNTER.unpack_from(self._buf, _DROPPED_OFFSET)[0]
+
+    def oldest_age(self):
+        with self._locked():
+            _, start, span, _ = self._header()
+            if not span:
+                return None
+            # Both ends of the span are always live slots
+            return time.time() - _SLOT.unpack_from(self._buf, self._offset(start))[3]
+
+    def set_lock_wait_observer(self, observer):
+        self._on_lock_wait = observer
+
+    def push(self, signal, encoded=None):
+        return self.push_many([signal], None if encoded is None else [encoded])[0]
+
+    def push_many(self, signals, encoded=None):
+        if encoded is None:
+            encoded = [encode_signal(signal) for signal in signals]
+        limit = self.slot_size - _SLOT_HEADER_SIZE
+        for data in encoded:
+            if len(data) > limit:
+                raise ValueError(f"Signal is {len(data)} bytes encoded, larger than the "
+                                 f"{limit} bytes a shared memory slot holds (SIGNALS_SHM_SLOT_SIZE)")
+        keys = [partition_key(signal) for signal in signals]
+        seqs = []
+        buf = self._buf
+        now = time.time()
+        with self._locked():
+            last_seq, start, span, live = self._header()
+            if self.overflow == 'reject' and live + len(encoded) > self.capacity:
+                self.rejected += len(encoded)
+                raise StoreFullError(f"Shared memory store is full ({live} of {self.capacity} signals)")
+            for data, (symbol, strategy) in zip(encoded, keys):
+                if span == self.capacity:
+                    start, span, live = self._make_room(start, span, live)
+                last_seq += 1
+                offset = self._offset(start + span)
+                _SLOT.pack_into(buf, offset, last_seq, key_hash(symbol), key_hash(strategy), now, len(data), 1)
+                buf[offset + _SLOT_HEADER_SIZE:offset + _SLOT_HEADER_SIZE + len(data)] = data
+                span += 1
+                live += 1
+                seqs.append(last_seq)
+            self._set_header(last_seq, start % self.capacity, span, live)
+        return seqs
+
+    def _make_room(self, start, span, live):
+        """Free one slot in a full ring: compact away holes, else evict the oldest signal (lock held)"""
+        if live < span:
+            return self._compact(start, span, live)
+        _COUNTER.pack_into(self._buf, _DROPPED_OFFSET, self.dropped + 1)
+        return start + 1, span - 1, live - 1
+
+    def _compact(self, start, span, live):
+        """Move live slots toward the newest end, squeezing out removed ones (lock held)"""
+        buf = self._buf
+        write = start + span - 1
+        for read in range(start + span - 1, start - 1, -1):
+            offset = self._offset(read)
+            if not buf[offset + _SLOT.size - 1]:
+                continue
+            if read != write:
+                target = self._offset(write)
+                length = _SLOT.unpack_from(buf, offset)[4]
+                buf[target:target + _SLOT_HEADER_SIZE + length] = buf[offset:offset + _SLOT_HEADER_SIZE + length]
+            write -= 1
+        return (write + 1) % self.capacity, live, live
+
+    def pop(self, count, timeout=None, symbol=None, strategy=None):
+        return [decode(data) for data in self.pop_encoded(count, timeout, symbol, strategy)]
+
+    def pop_encoded(self, count, timeout=None, symbol=None, strategy=None):
+        if count <= 0:
+            return []
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            seen = self._last_seq()
+            result = self._take(count, symbol, strategy)
+            if result or deadline is None:
+                return result
+            # Nothing matched; sleep until another worker pushes or the wait expires
+            while self._last_seq() == seen:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                time.sleep(min(remaining, POLL_INTERVAL))
+
+    def _last_seq(self):
+        """Push counter, read without the lock (only used to detect new signals)"""
+        return _COUNTER.unpack_from(self._buf, _LAST_SEQ_OFFSET)[0]
+
+    def _take(self, count, symbol, strategy):
+        """Remove up to `count` matching signals, newest first, returning their bytes"""
+        symbol_hash = None if symbol is None else key_hash(symbol)
+        strategy_hash = None if strategy is None else key_hash(strategy)
+        filtered = symbol is not None or strategy is not None
+        buf = self._buf
+        result = []
+        with self._locked():
+            last_seq, start, span, live = self._header()
+            index = start + span - 1
+            while index >= start and len(result) < count:
+                offset = self._offset(index)
+                _, slot_symbol, slot_strategy, _, length, slot_live = _SLOT.unpack_from(buf, offset)
+                if slot_live and (symbol_hash is None or slot_symbol == symbol_hash) \
+                        and (strategy_hash is None or slot_strategy == strategy_hash):
+                    result.append(bytes(buf[offset + _SLOT_HEADER_SIZE:offset + _SLOT_HEADER_SIZE + length]))
+                    buf[offset + _SLOT.size - 1] = 0
+                    live -= 1
+                index -= 1
+            if not filtered:
+                span = index - start + 1  # Everything newer than `index` is gone
+            # Drop removed slots from both ends so the span only covers holes in the middle
+            while span and not buf[self._offset(start + span - 1) + _SLOT.size - 1]:
+                span -= 1
+            while span and not buf[self._offset(start) + _SLOT.size - 1]:
+                start += 1
+                span -= 1
+            self._set_header(last_seq, start % self.capacity, span, live)
+        return result
+
+    def snapshot(self):
+        buf = self._buf
+        with self._locked():
+            _, start, span, _ = self._header()
+            raw = []
+            for index in range(start + span - 1, start - 1, -1):
+                offset = self._offset(index)
+                length, slot_live = _SLOT.unpack_from(buf, offset)[4:]
+                if slot_live:
+                    raw.append(bytes(buf[offset + _SLOT_HEADER_SIZE:offset + _SLOT_HEADER_SIZE + length]))
+        return [decode(data) for data in raw]
+
+    def clear(self):
+        with self._locked():
+            self._set_header(self._header()[0], 0, 0, 0)
+
+    def close(self):
+        self._buf = None
+        self._shm.close()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def unlink(self):
+        """Remove the shared memory segment (the next worker to start creates a fresh one)"""
+        shared_memory.SharedMemory(name=self.shm_name).unlink()
+
+
+class _ProcessLock:
+    """Thread lock + flock; the lock file is reopened after a fork so workers don't share it"""
+
+    __slots__ = ('backend',)
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def __enter__(self):
+        backend = self.backend
+        waited_since = None
+        if not backend._thread_lock.acquire(False):
+            waited_since = time.perf_counter()
+            backend._thread_lock.acquire()
+        try:
+            if backend._lock_pid != os.getpid():
+                # An flock belongs to the open file; a descriptor inherited
+                # across fork would be shared with the parent
+                backend._lock_file = open(backend.lock_path, 'a+b')
+                backend._lock_pid = os.getpid()
+            try:
+                fcntl.flock(backend._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                if waited_since is None:
+                    waited_since = time.perf_counter()
+                fcntl.flock(backend._lock_file, fcntl.LOCK_EX)
+        except BaseException:
+            backend._thread_lock.release()
+            raise
+        if waited_since is not None and backend._on_lock_wait is not None:
+            backend._on_lock_wait(time.perf_counter() - waited_since)
+
+    def __exit__(self, *exc):
+        backend = self.backend
+        fcntl.flock(backend._lock_file, fcntl.LOCK_UN)
+        backend._thread_lock.release()
@@ -0,0 +1,67 @@
+"""
+Encode signals once, at ingest
+
+encode_signal() produces exactly the bytes Flask's jsonify writes for a signal
+inside a response (sorted keys, compact separators, ASCII-only), so GET
+/signals can build its body by joining cached fragments instead of
+re-serializing every dict on every poll.
+
+If orjson is installed it is used whenever its output is guaranteed to be
+identical: it differs from the json module for non-ASCII text, NaN/Infinity
+and floats that json writes in exponent notation, so those signals fall back
+to json.dumps.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:  # Optional speedup
+    orjson = None
+
+# Python writes floats outside this range (and non-finite ones) in a form orjson doesn't match
+_PLAIN_FLOAT_MIN = 1e-4
+_PLAIN_FLOAT_MAX = 1e16
+
+
+def _json_encode(signal):
+    return json.dumps(signal, sort_keys=True, separators=(',', ':'), ensure_ascii=True).encode()
+
+
+def _orjson_safe(value):
+    """True if orjson encodes every number in `value` the way json does"""
+    if isinstance(value, float):
+        magnitude = abs(value)
+        return magnitude == 0.0 or _PLAIN_FLOAT_MIN <= magnitude < _PLAIN_FLOAT_MAX
+    if isinstance(value, dict):
+        return all(_orjson_safe(v) for v in value.values())
+    if isinstance(value, list):
+        return all(_orjson_safe(v) for v in value)
+    return True
+
+
+def encode_signal(signal):
+    """Serialize a signal to the bytes jsonify would produce for it"""
+    if orjson is not None and _orjson_safe(signal):
+        try:
+            data = orjson.dumps(signal, option=orjson.OPT_SORT_KEYS)
+        except (TypeError, orjson.JSONEncodeError):
+            pass  # e.g. integers beyond 64 bits or non-str keys
+        else:
+            # json escapes non-ASCII characters and DEL; orjson writes them raw
+            if data.isascii() and b'\x7f' not in data:
+                # orjson's bytes keep the 1 KB buffer it wrote into; a right-sized
+                # copy matters because encoded signals stay queued
+                return bytes(memoryview(data))
+    return _json_encode(signal)
+
+
+def decode(data):
+    """Parse JSON bytes or text"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def signals_body(fragments):
+    """Body of a GET /signals response built from encoded signals, as jsonify would write it"""
+    return b'{"count":%d,"signals":[%s],"status":"success"}\n' % (len(fragments), b','.join(fragments))
@@ -0,0 +1,186 @@
+"""
+Signal time-to-live (SIGNAL_TTL_SECONDS, SIGNAL_TTL_BY_STRATEGY, SIGNAL_TTL_FIELD)
+
+A signal that has waited too long in the queue is dangerous to act on, so the
+store can expire signals a fixed time after they arrive. A SignalTTL decides
+how long each signal lives: the alert's own TTL field if it has one, else its
+strategy's TTL, else the default (no TTL at all unless configured).
+
+Expiry is driven by a TimerWheel, a hierarchical timing wheel: `levels` wheels
+of `slots` slots each, where a slot of level L covers slots**L ticks of
+`resolution` seconds. A timer goes into the lowest level whose span covers its
+deadline and is moved down a level each time the wheel above turns past it, so
+adding a timer is O(1) and each one is moved at most `levels` times before it
+fires. Nothing ever scans the store for expired signals.
+
+The wheel fires a timer on the first tick at or after its deadline, up to one
+resolution late; the store also checks each signal's deadline as it pops it,
+so an expired signal is never served.
+"""
+import math
+import time
+from datetime import datetime
+
+DEFAULT_RESOLUTION = 1.0  # Seconds per tick
+DEFAULT_SLOTS = 64
+DEFAULT_LEVELS = 4  # 64**4 one-second ticks: about 194 days before the overflow list
+
+
+def parse_strategy_ttls(value):
+    """{strategy: seconds} from a SIGNAL_TTL_BY_STRATEGY value such as 'RSIStrategy=300,MACD=60'"""
+    ttls = {}
+    for item in (value or '').split(','):
+        if not item.strip():
+            continue
+        strategy, sep, seconds = item.rpartition('=')
+        ttl = positive_seconds(seconds.strip()) if sep else None
+        if not strategy.strip() or ttl is None:
+            raise ValueError(f"Invalid SIGNAL_TTL_BY_STRATEGY entry {item.strip()!r} (expected strategy=seconds)")
+        ttls[strategy.strip()] = ttl
+    return ttls
+
+
+def positive_seconds(value):
+    """`value` as a positive, finite number of seconds, or None"""
+    if isinstance(value, bool):
+        return None
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        return None
+    return seconds if 0 < seconds < math.inf else None
+
+
+def signal_time(signal):
+    """Epoch seconds of the `timestamp` /webhook stamped on a signal, or None"""
+    try:
+        return datetime.fromisoformat(signal['timestamp']).timestamp()
+    except (TypeError, ValueError, KeyError):
+        return None
+
+
+class SignalTTL:
+    """How long a signal may wait: its own TTL field, else its strategy's TTL, else the default"""
+
+    def __init__(self, default=None, by_strategy=None, field=None):
+        self.default = positive_seconds(default)
+        self.by_strategy = dict(by_strategy or {})
+        self.field = field or None
+
+    def __bool__(self):
+        """False when no signal can ever get a TTL"""
+        return bool(self.default or self.by_strategy or self.field)
+
+    def seconds(self, signal):
+        """TTL of a signal in seconds, or None if it never expires"""
+        if isinstance(signal, dict):
+            value = signal.get(self.field) if self.field is not None else None
+            if value is not None:
+                ttl = positive_seconds(value)
+                if ttl is not None:
+                    return ttl
+            if self.by_strategy:
+                strategy = signal.get('strategy')
+                if strategy is not None:
+                    ttl = self.by_strategy.get(str(strategy))
+                    if ttl is not None:
+                        return ttl
+        return self.default
+
+    def deadline(self, signal, arrived):
+        """Epoch seconds at which a signal that arrived at `arrived` expires, or None"""
+        ttl = self.seconds(signal)
+        return None if ttl is None else arrived + ttl
+
+
+class TimerWheel:
+    """
+    Hierarchical timing wheel of (deadline, item) timers
+
+    Not thread-safe; SignalStore only uses it under its global lock. Cancelled
+    timers aren't removed: the owner ignores items it has already dealt with
+    when they fire, and compact()s the wheel when they pile up.
+    """
+
+    def __init__(self, resolution=DEFAULT_RESOLUTION, slots=DEFAULT_SLOTS, levels=DEFAULT_LEVELS, now=None):
+        if resolution <= 0 or slots < 2 or levels < 1:
+            raise ValueError("resolution must be positive, slots at least 2 and levels at least 1")
+        self.resolution = resolution
+        self.slots = slots
+        self.levels = levels
+        self._spans = [slots ** level for level in range(levels + 1)]  # Ticks covered by one slot of each level
+        self._wheels = [[[] for _ in range(slots)] for _ in range(levels)]
+        self._overflow = []  # Timers beyond the top wheel, re-placed each time it wraps
+        self._tick = int((time.time() if now is None else now) // resolution)  # Next tick to run
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def due(self, now):
+        """True if advance(now) could fire anything (cheap enough to call on every operation)"""
+        return self._size > 0 and now >= self._tick * self.resolution
+
+    def add(self, deadline, item):
+        """Fire `item` at the first tick at or after `deadline` (epoch seconds)"""
+        self._place(max(math.ceil(deadline / self.resolution), self._tick), item)
+        self._size += 1
+
+    def advance(self, now):
+        """Run every tick up to `now`; returns the items whose timers fired, earliest first"""
+        target = int(now // self.resolution)
+        fired = []
+        while self._tick <= target:
+            if self._size == len(fired):
+                self._tick = target + 1  # Nothing left to fire: skip the idle ticks
+                break
+            self._run(fired)
+            self._tick += 1
+        self._size -= len(fired)
+        return fired
+
+    def compact(self, keep):
+        """Drop the timers of items for which keep(item) is false"""
+        size = 0
+        for wheel in self._wheels:
+            for slot in wheel:
+                slot[:] = [timer for timer in slot if keep(timer[1])]
+                size += len(slot)
+        self._overflow = [timer for timer in self._overflow if keep(timer[1])]
+        self._size = size + len(self._overflow)
+
+    def clear(self):
+        for wheel in self._wheels:
+            for slot in wheel:
+                slot.clear()
+        self._overflow.clear()
+        self._size = 0
+
+    def _place(self, tick, item):
+        """File a timer in the lowest level whose current turn includes `tick`"""
+        spans, current = self._spans, self._tick
+        for level, wheel in enumerate(self._wheels):
+            if tick // spans[level + 1] == current // spans[level + 1]:
+                wheel[tick // spans[level] % self.slots].append((tick, item))
+                return
+        self._overflow.append((tick, item))
+
+    def _run(self, fired):
+        """Run tick self._tick: cascade the slots that start at it, then fire level 0's"""
+        tick, spans, slots = self._tick, self._spans, self.slots
+        if tick % spans[self.levels] == 0 and self._overflow:
+            overflow, self._overflow = self._overflow, []
+            for timer in overflow:
+                self._place(*timer)
+        for level in range(self.levels - 1, 0, -1):
+            if tick % spans[level] == 0:
+                slot = self._wheels[level][tick // spans[level] % slots]
+                if slot:
+                    timers = slot[:]
+                    slot.clear()
+                    for timer in timers:
+                        self._place(*timer)
+        slot = self._wheels[0][tick % slots]
+        if slot:
+            fired.extend(item for _, item in slot)
+            slot.clear()
@@ -0,0 +1,416 @@
+"""
+Append-only write-ahead log for the in-memory signal store (durable mode)
+
+Every stored signal is appended to the current log segment as an `S` record,
+and every pop as a `P` record listing the sequence numbers removed. On startup
+the store is rebuilt from the latest snapshot plus the segments written after
+it, so a restart (e.g. a Render deploy) no longer loses queued signals.
+
+fsync policies (SIGNALS_WAL_FSYNC):
+
+    always    - write + fsync every record before returning (one flush per request)
+    group     - group commit: concurrent appenders wait for a shared fsync, so a
+                burst of webhooks costs one disk flush instead of one each (default)
+    interval  - write immediately, fsync from a background thread every
+                fsync_interval seconds (may lose that window on power loss)
+    never     - leave flushing to the OS
+
+When a segment reaches segment_size bytes a new one is started and a background
+compaction writes a snapshot of the signals still queued, then deletes the
+older segments. Startup therefore reads at most one snapshot (bounded by
+MAX_SIGNALS) and the segments written since it, however long the service has
+been running.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+from signal_codec import encode_signal
+from signal_store import SignalStore
+
+logger = logging.getLogger(__name__)
+
+FSYNC_POLICIES = ('always', 'group', 'interval', 'never')
+DEFAULT_SEGMENT_SIZE = 64 * 1024 * 1024
+DEFAULT_FSYNC_INTERVAL = 0.05
+
+SEGMENT_PREFIX = 'segment-'
+SNAPSHOT_PREFIX = 'snapshot-'
+LOG_SUFFIX = '.log'
+
+
+class SignalLog:
+    """Segmented append-only log of pushes and pops"""
+
+    def __init__(self, directory, fsync_policy='group', segment_size=DEFAULT_SEGMENT_SIZE,
+                 fsync_interval=DEFAULT_FSYNC_INTERVAL):
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy {fsync_policy!r} (expected one of {FSYNC_POLICIES})")
+        self.directory = directory
+        self.fsync_policy = fsync_policy
+        self.segment_size = segment_size
+        self.fsync_interval = fsync_interval
+        # Called during compaction; returns ([(seq, signal)] oldest first, last_seq)
+        self.snapshot_source = None
+
+        self._lock = threading.Lock()
+        self._flushed = threading.Condition(self._lock)
+        self._pending = []  # Encoded records not yet written (group commit)
+        self._appended = 0  # Records handed to _append
+        self._durable = 0  # Records known to be fsynced
+        self._flushing = False  # A group-commit leader is writing outside the lock
+        self._file = None
+        self._segment = 0
+        self._segment_bytes = 0
+        self._compacting = False
+        self._compact_again = False
+        self._closed = False
+        os.makedirs(directory, exist_ok=True)
+
+    def replay(self, limit=None):
+        """
+        Rebuild the queue from disk and open a new segment for appends
+
+        Returns ([(seq, signal)] oldest first, last_seq) where last_seq is the
+        highest sequence number that appears anywhere in the log. With
+        `limit`, only the newest `limit` signals are returned (and decoded).
+        """
+        segments = self._numbers(SEGMENT_PREFIX)
+        snapshots = self._numbers(SNAPSHOT_PREFIX)
+        live = {}
+        popped = set()
+        base_seq = 0
+        first_segment = 0
+        if snapshots:
+            first_segment = snapshots[-1]
+            base_seq = self._read(self._path(SNAPSHOT_PREFIX, first_segment), live, popped, 0)
+        last_seq = base_seq
+        for number in segments:
+            if number >= first_segment:
+                last_seq = max(last_seq, self._read(self._path(SEGMENT_PREFIX, number), live, popped, base_seq))
+        for seq in popped:
+            live.pop(seq, None)
+        seqs = sorted(live)
+        if limit is not None:
+            seqs = seqs[-limit:] if limit > 0 else []
+        signals = self._decode([live[seq] for seq in seqs])
+        entries = [(seq, signal) for seq, signal in zip(seqs, signals) if signal is not None]
+
+        self._open_segment(max(segments + [first_segment]) + 1)
+        if self.fsync_policy == 'interval':
+            threading.Thread(target=self._fsync_periodically, name='signal-log-fsync', daemon=True).start()
+        return entries, last_seq
+
+    def live_records(self):
+        """
+        Yield (seq, encoded) for every signal still queued, in log order, without decoding
+
+        Reads the files replay() would, twice - first for the pops, then for
+        the pushes that survive them - so memory holds only the popped
+        sequence numbers, not the signals. For exporting a log nothing is
+        writing to; unlike replay() it doesn't open a segment.
+        """
+        segments = self._numbers(SEGMENT_PREFIX)
+        snapshots = self._numbers(SNAPSHOT_PREFIX)
+        files = []
+        first_segment = 0
+        if snapshots:
+            first_segment = snapshots[-1]
+            files.append(self._path(SNAPSHOT_PREFIX, first_segment))
+        files.extend(self._path(SEGMENT_PREFIX, number) for number in segments if number >= first_segment)
+
+        popped = set()
+        base_seq = 0
+        for index, path in enumerate(files):
+            for kind, rest in self._records(path):
+                if kind == b'P':
+                    popped.update(int(s) for s in rest.split(b','))
+                elif index == 0 and snapshots:
+                    # Segment pushes at or below the snapshot's last seq are already in it
+                    base_seq = max(base_seq, int(rest.partition(b'\t')[0]))
+        for index, path in enumerate(files):
+            floor = 0 if index == 0 and snapshots else base_seq
+            for kind, rest in self._records(path):
+                if kind == b'S':
+                    seq, _, data = rest.partition(b'\t')
+                    seq = int(seq)
+                    if seq > floor and seq not in popped:
+                        yield seq, data
+
+    @staticmethod
+    def _records(path):
+        """(kind, rest) for each complete record in a log file, read line by line"""
+        with open(path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    logger.warning(f"Ignoring truncated record at the end of {path}")
+                    return
+                kind, _, rest = line[:-1].partition(b'\t')
+                yield kind, rest
+
+    def append_push(self, seq, encoded):
+        """Log a push; `encoded` is the signal's JSON bytes"""
+        self._append(b'S\t%d\t%s\n' % (seq, encoded))
+
+    def append_pushes(self, entries):
+        """Log several (seq, encoded) pushes as one append (one fsync under group commit)"""
+        self._append(b''.join(b'S\t%d\t%s\n' % (seq, encoded) for seq, encoded in entries))
+
+    def append_pop(self, seqs):
+        self._append(('P\t' + ','.join(map(str, seqs)) + '\n').encode())
+
+    def close(self):
+        """Flush and fsync everything appended so far"""
+        with self._lock:
+            while self._flushing:
+                self._flushed.wait()
+            if self._file is not None:
+                self._write_pending()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+            self._closed = True
+
+    def _append(self, data):
+        with self._lock:
+            if self._closed:
+                raise ValueError("signal log is closed")
+            self._pending.append(data)
+            self._appended += 1
+            lsn = self._appended
+            if self.fsync_policy != 'group':
+                self._write_pending()
+                if self.fsync_policy == 'always':
+                    os.fsync(self._file.fileno())
+                    self._durable = lsn
+                self._maybe_roll()
+                return
+
+            # Group commit: the first thread to find no flush in progress becomes
+            # the leader and writes + fsyncs everything pending; the others wait
+            # for it and find their record already durable.
+            while self._durable < lsn:
+                if self._flushing:
+                    self._flushed.wait()
+                    continue
+                self._flushing = True
+                batch, self._pending = self._pending, []
+                target = self._appended
+                file = self._file
+                self._lock.release()
+                try:
+                    data = b''.join(batch)
+                    file.write(data)
+                    file.flush()
+                    os.fsync(file.fileno())
+                except BaseException:
+                    self._lock.acquire()
+                    self._pending[:0] = batch  # Let the next leader retry
+                    self._flushing = False
+                    self._flushed.notify_all()
+                    raise
+                self._lock.acquire()
+                self._segment_bytes += len(data)
+                self._durable = target
+                self._maybe_roll()
+                self._flushing = False
+                self._flushed.notify_all()
+
+    def _write_pending(self):
+        """Write pending records to the OS (lock held)"""
+        if self._pending:
+            data = b''.join(self._pending)
+            self._pending = []
+            self._file.write(data)
+            self._file.flush()
+            self._segment_bytes += len(data)
+
+    def _maybe_roll(self):
+        """Start a new segment and compact once the current one is full (lock held)"""
+        if self._segment_bytes < self.segment_size:
+            return
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._open_segment(self._segment + 1)
+        if self.snapshot_source is None:
+            return
+        if self._compacting:
+            self._compact_again = True  # Picked up when the running compaction ends
+            return
+        self._compacting = True
+        threading.Thread(target=self._compact_until_current, name='signal-log-compaction',
+                         daemon=True).start()
+
+    def _open_segment(self, number):
+        self._segment = number
+        self._file = open(self._path(SEGMENT_PREFIX, number), 'ab')
+        self._segment_bytes = self._file.tell()
+
+    def _compact_until_current(self):
+        """Compaction thread: compact, then again if segments rolled meanwhile"""
+        while True:
+            with self._lock:
+                segment = self._segment
+                self._compact_again = False
+            self._compact(segment)
+            with self._lock:
+                if not self._compact_again or self._closed:
+                    self._compacting = False
+                    return
+
+    def _compact(self, segment):
+        """
+        Snapshot the live queue and delete everything before `segment`
+
+        The snapshot is taken after `segment` was opened, so it reflects every
+        record in the older segments. Records in `segment` and later with a
+        sequence number <= the snapshot's last_seq are only used for their
+        pops during replay.
+        """
+        try:
+            entries, last_seq = self.snapshot_source()
+            path = self._path(SNAPSHOT_PREFIX, segment)
+            with open(path + '.tmp', 'wb') as f:
+                f.write(f'C\t{last_seq}\n'.encode())
+                f.writelines(b'S\t%d\t%s\n' % (seq, encode_signal(signal)) for seq, signal in entries)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + '.tmp', path)
+            self._fsync_directory()
+            for prefix in (SEGMENT_PREFIX, SNAPSHOT_PREFIX):
+                for number in self._numbers(prefix):
+                    if number < segment:
+                        os.remove(self._path(prefix, number))
+        except Exception as e:
+            logger.error(f"Signal log compaction failed: {e}", exc_info=True)
+
+    def _fsync_periodically(self):
+        while True:
+            time.sleep(self.fsync_interval)
+            with self._lock:
+                if self._closed:
+                    return
+                # dup() so a concurrent segment roll can close the file safely
+                fd = os.dup(self._file.fileno())
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def _fsync_directory(self):
+        fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _read(path, live, popped, base_seq):
+        """
+        Apply one snapshot or segment file to `live` / `popped`; returns the highest seq seen
+
+        Signal payloads are kept as raw JSON bytes here and only decoded for
+        the entries that survive replay.
+        """
+        last_seq = base_seq
+        with open(path, 'rb') as f:
+            lines = f.read().split(b'\n')
+        if lines[-1]:
+            # Every record ends with a newline, so this is a torn write from a crash
+            logger.warning(f"Ignoring truncated record at the end of {path}")
+        for line in lines[:-1]:
+            kind, _, rest = line.partition(b'\t')
+            if kind == b'S':
+                seq, _, data = rest.partition(b'\t')
+                seq = int(seq)
+                if seq > base_seq:
+                    live[seq] = data
+                if seq > last_seq:
+                    last_seq = seq
+            elif kind == b'P':
+                seqs = [int(s) for s in rest.split(b',')]
+                popped.update(seqs)
+                last_seq = max(last_seq, *seqs)
+            elif kind == b'C':
+                last_seq = max(last_seq, int(rest))
+        return last_seq
+
+    @staticmethod
+    def _decode(raw_signals):
+        """Decode a list of JSON documents in one json.loads call"""
+        try:
+            return json.loads(b'[' + b','.join(raw_signals) + b']')
+        except ValueError:
+            # A corrupt record somewhere: fall back to one at a time and skip it
+            signals = []
+            for raw in raw_signals:
+                try:
+                    signals.append(json.loads(raw))
+                except ValueError:
+                    logger.warning(f"Skipping corrupt signal record {raw[:80]!r}")
+                    signals.append(None)
+            return signals
+
+    def _numbers(self, prefix):
+        numbers = []
+        for name in os.listdir(self.directory):
+            if name.startswith(prefix) and name.endswith(LOG_SUFFIX):
+                numbers.append(int(name[len(prefix):-len(LOG_SUFFIX)]))
+        return sorted(numbers)
+
+    def _path(self, prefix, number):
+        return os.path.join(self.directory, f'{prefix}{number:08d}{LOG_SUFFIX}')
+
+
+class DurableSignalStore(SignalStore):
+    """SignalStore that logs every push and pop and replays the log on startup"""
+
+    name = 'in-memory (durable)'
+
+    def __init__(self, capacity, directory, fsync_policy='group', segment_size=DEFAULT_SEGMENT_SIZE, **options):
+        super().__init__(capacity=capacity, **options)
+        self.log = SignalLog(directory, fsync_policy=fsync_policy, segment_size=segment_size)
+        # Under the spill policy nothing is discarded, so replay every signal
+        entries, last_seq = self.log.replay(limit=None if self.overflow == 'spill' else capacity)
+        self.restore(entries)
+        self.reserve_seq(last_seq)
+        self.log.snapshot_source = self.snapshot_entries
+        logger.info(f"Replayed {len(self)} signals from {directory}")
+
+    def push(self, signal, encoded=None):
+        if encoded is None:
+            encoded = encode_signal(signal)
+        seq = super().push(signal, encoded)
+        self.log.append_push(seq, encoded)
+        return seq
+
+    def push_many(self, signals, encoded=None):
+        if encoded is None:
+            encoded = [encode_signal(signal) for signal in signals]
+        seqs = super().push_many(signals, encoded)
+        if seqs:
+            self.log.append_pushes(zip(seqs, encoded))
+        return seqs
+
+    def _take(self, count, timeout, symbol, strategy):
+        entries = super()._take(count, timeout, symbol, strategy)
+        if entries:
+            try:
+                self.log.append_pop([entry.seq for entry in entries])
+            except Exception as e:
+                # The signals are already out of memory; hand them to the
+                # consumer rather than lose them (they may be redelivered after a restart)
+                logger.error(f"Error logging popped signals: {e}", exc_info=True)
+        return entries
+
+    def clear(self):
+        entries, _ = self.snapshot_entries()
+        super().clear()
+        if entries:
+            self.log.append_pop([seq for seq, _ in entries])
+
+    def close(self):
+        self.log.close()
+        super().close()
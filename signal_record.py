@@ -0,0 +1,102 @@
+"""
+Compact in-memory representation of a stored signal
+
+A webhook signal is a dict with a handful of standard fields plus the two
+timestamp strings webhook() adds. As a dict that is several hundred bytes per
+signal before counting the encoded copy served by GET /signals. SignalRecord
+keeps the same information in __slots__:
+
+- action, symbol and strategy, interned, so every BTCUSDT signal shares one
+  string
+- price and quantity, as received
+- timestamp/received_at as one float: seconds since 1970-01-01 in the same
+  naive local time webhook() formats, converted back to both strings only
+  when the signal is served as a dict (the cached JSON bytes already contain
+  them)
+- every other field in an `extra` dict, or None when there are none
+
+pack() only compacts what it can restore exactly; anything else (an unusual
+timestamp format, a signal that isn't a dict) is kept as is, so unpack(pack(s))
+always equals s.
+"""
+from datetime import datetime, timedelta
+from sys import intern
+
+_MISSING = object()  # A standard field the signal doesn't have
+_EPOCH = datetime(1970, 1, 1)
+_STRING_FIELDS = ('action', 'symbol', 'strategy')
+_VALUE_FIELDS = ('price', 'quantity')
+_FIELDS = _STRING_FIELDS + _VALUE_FIELDS
+_FIELD_NAMES = frozenset(_FIELDS)
+_FIELD_AND_TIMESTAMP_NAMES = _FIELD_NAMES | {'timestamp', 'received_at'}
+
+
+class SignalRecord:
+    __slots__ = ('action', 'symbol', 'strategy', 'price', 'quantity', 'epoch', 'extra')
+
+    def to_dict(self):
+        """The signal as the dict that was packed (keys may be in a different order)"""
+        signal = {field: value for field, value in zip(_FIELDS, (self.action, self.symbol, self.strategy,
+                                                                 self.price, self.quantity))
+                  if value is not _MISSING}
+        if self.extra:
+            signal.update(self.extra)
+        if self.epoch is not None:
+            timestamp = (_EPOCH + timedelta(seconds=self.epoch)).isoformat()
+            signal['timestamp'] = timestamp
+            signal['received_at'] = f'{timestamp[:10]} {timestamp[11:19]}'
+        return signal
+
+
+def _epoch(timestamp, received_at):
+    """The packed form of webhook()'s timestamp strings, or None if they can't be restored exactly"""
+    if type(timestamp) is not str or type(received_at) is not str:
+        return None
+    # Exactly what datetime.isoformat() and strftime('%Y-%m-%d %H:%M:%S') write
+    # for a naive datetime: YYYY-MM-DDTHH:MM:SS[.ffffff] and the same second
+    length = len(timestamp)
+    if ((length != 19 and (length != 26 or timestamp[19] != '.'))
+            or timestamp[10] != 'T' or timestamp[4] != '-' or timestamp[7] != '-'
+            or timestamp[13] != ':' or timestamp[16] != ':' or not timestamp.isascii()
+            or received_at != f'{timestamp[:10]} {timestamp[11:19]}'):
+        return None
+    try:
+        moment = datetime.fromisoformat(timestamp)
+    except ValueError:
+        return None
+    if length == 26 and not moment.microsecond:
+        return None  # isoformat() would leave out ".000000"
+    # Exact: timedelta rounds the float back to the same microsecond
+    return (moment - _EPOCH).total_seconds()
+
+
+def pack(signal):
+    """A SignalRecord holding `signal`, or `signal` itself if it isn't a dict"""
+    if type(signal) is not dict:
+        return signal
+    get = signal.get
+    action = get('action', _MISSING)
+    symbol = get('symbol', _MISSING)
+    strategy = get('strategy', _MISSING)
+    price = get('price', _MISSING)
+    quantity = get('quantity', _MISSING)
+    record = SignalRecord()
+    record.action = intern(action) if type(action) is str else action
+    record.symbol = intern(symbol) if type(symbol) is str else symbol
+    record.strategy = intern(strategy) if type(strategy) is str else strategy
+    record.price = price
+    record.quantity = quantity
+    record.epoch = epoch = _epoch(get('timestamp'), get('received_at'))
+    packed = ((action is not _MISSING) + (symbol is not _MISSING) + (strategy is not _MISSING)
+              + (price is not _MISSING) + (quantity is not _MISSING) + (0 if epoch is None else 2))
+    if len(signal) == packed:
+        record.extra = None
+    else:
+        skip = _FIELD_NAMES if epoch is None else _FIELD_AND_TIMESTAMP_NAMES
+        record.extra = {key: value for key, value in signal.items() if key not in skip}
+    return record
+
+
+def unpack(stored):
+    """The signal dict for something returned by pack()"""
+    return stored.to_dict() if type(stored) is SignalRecord else stored
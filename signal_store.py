@@ -0,0 +1,665 @@
+"""
+In-memory signal queue used by app.py
+
+SignalStore is a bounded queue: pushing a signal is O(1) and, once the store is
+full, the oldest signal is discarded by default (the same "keep the last
+MAX_SIGNALS" behavior the list-backed store had). Popping k signals is O(k) and
+returns the most recent signals first, so queue depth no longer affects the
+cost of a webhook or a poll.
+
+Signals are partitioned by (symbol, strategy). Each partition has its own lock
+and deque, so a consumer that only wants BTCUSDT signals pops them from the
+BTCUSDT partitions without scanning or locking anyone else's signals. A global
+deque keeps every entry in arrival order for unfiltered pops and for evicting
+the oldest signal. An entry is "claimed" (marked dead) by whichever path
+removes it first; the other structure drops dead entries lazily when it next
+reaches them.
+
+Lock order is always global lock -> partition lock. Filtered pops only take
+partition locks (in a fixed order when several partitions match), so the
+entries they claim are only taken off the global size once they get the global
+lock afterwards. Until then those entries are counted as "unsettled", and the
+capacity checks leave them out, so a push in between doesn't evict or reject
+for signals that are already gone.
+
+pop() can optionally block until a (matching) signal arrives, which is what
+backs the long-polling mode of GET /signals.
+
+Signals are kept as compact SignalRecords (signal_record.py) next to their
+encoded JSON, and turned back into dicts only by pop() and snapshot().
+
+The store is full when it holds `capacity` signals or, with `max_bytes`, when
+the approximate memory held by its signals exceeds that budget. What happens
+then is the overflow policy: 'drop-oldest' discards the oldest signals,
+'reject' refuses new ones with StoreFullError, and 'spill' moves the oldest
+signals to a file (spill.py). Spilled signals are paged back in, newest first,
+once pops have drained the store to half its budget; filtered pops only see
+signals that are in memory.
+
+With a `ttl` (signal_expiry.SignalTTL), signals also expire: each one gets a
+deadline when it arrives, and a TimerWheel removes it once that passes. The
+wheel is advanced by whichever operation next takes the global lock, and pops
+skip any signal past its deadline the wheel hasn't reached yet. Spilled
+signals are checked when they are paged back in. A replayed signal's deadline
+counts from its `timestamp`, so expiry survives a restart.
+"""
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+
+from metrics import ContentionTimedLock
+from signal_codec import decode, encode_signal
+from signal_expiry import TimerWheel, signal_time
+from signal_record import pack, unpack
+from spill import SpillStack
+from storage_backends import OVERFLOW_POLICIES, StorageBackend, StoreFullError
+
+DEFAULT_CAPACITY = 1000
+
+# Approximate bytes a stored signal costs: the entry, its SignalRecord and
+# the encoded JSON. Fields outside the record's slots are held twice (in the
+# record's extra dict and in the JSON). Measured with tracemalloc at about
+# 510 bytes for a typical 170-byte alert and 1.9 kB for a 690-byte one.
+ENTRY_OVERHEAD = 100
+
+
+def entry_size(encoded):
+    """Approximate memory held by a stored signal whose encoded JSON is `encoded`"""
+    return ENTRY_OVERHEAD + len(encoded) * 5 // 2
+
+
+def partition_key(signal):
+    """The (symbol, strategy) pair a signal is stored under"""
+    if not isinstance(signal, dict):
+        return (None, None)
+    symbol = signal.get('symbol')
+    strategy = signal.get('strategy')
+    return (None if symbol is None else str(symbol),
+            None if strategy is None else str(strategy))
+
+
+class _Entry:
+    __slots__ = ('seq', 'signal', 'encoded', 'partition', 'live', 'arrived', 'expires')
+
+    def __init__(self, seq, signal, encoded, partition):
+        self.seq = seq
+        self.signal = signal  # signal_record.pack() of the signal
+        self.encoded = encoded  # JSON bytes from signal_codec.encode_signal, or None
+        self.partition = partition
+        self.live = True  # Only ever goes True -> False, under partition.lock
+        self.arrived = time.time()
+        self.expires = None  # Epoch seconds, with a TTL
+
+
+class _Partition:
+    __slots__ = ('key', 'entries', 'lock')
+
+    def __init__(self, key):
+        self.key = key
+        self.entries = deque()  # Oldest on the left, newest on the right
+        self.lock = threading.Lock()
+
+    def claim(self, entry):
+        """Mark an entry as removed; returns False if another path got it first"""
+        with self.lock:
+            if not entry.live:
+                return False
+            entry.live = False
+            return True
+
+    def newest_live(self):
+        """Drop dead entries from the right and return the newest live one (lock held)"""
+        entries = self.entries
+        while entries and not entries[-1].live:
+            entries.pop()
+        return entries[-1] if entries else None
+
+
+class SignalStore(StorageBackend):
+    """Thread-safe bounded queue of signals, served newest first"""
+
+    name = 'in-memory'
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, overflow='drop-oldest', max_bytes=None, spill_dir=None, ttl=None):
+        if capacity < 1:
+            raise ValueError(f"capacity must be at least 1, got {capacity}")
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {', '.join(OVERFLOW_POLICIES)}, got {overflow!r}")
+        self.capacity = capacity
+        self.overflow = overflow
+        self.max_bytes = max_bytes or None
+        self.spill_dir = spill_dir
+        self.ttl = ttl or None  # signal_expiry.SignalTTL
+        self._lock = ContentionTimedLock()  # Guards _order, _size, _bytes, _spill and the partition indexes
+        self._order = deque()  # Every entry in arrival order, oldest on the left
+        self._size = 0  # Live entries
+        self._bytes = 0  # entry_size() of live entries, only tracked with max_bytes
+        # (entries, bytes) claimed by each filtered pop in progress, still in
+        # _size and _bytes. Pops add and remove their own tuple with single
+        # list operations, which are atomic without a lock
+        self._unsettled = []
+        self._spill = None  # SpillStack, created on the first spill
+        self._wheel = TimerWheel() if self.ttl else None  # Expiry timers of entries with a TTL
+        self._seq = itertools.count(1)
+        self._last_seq = 0
+        self.dropped = 0  # Signals evicted because the store was full
+        self.rejected = 0  # Signals refused because the store was full
+        self.spilled_total = 0  # Signals ever moved to disk
+        self.expired = 0  # Signals removed because their TTL passed
+        self._partitions = {}  # (symbol, strategy) -> _Partition
+        self._by_symbol = {}  # symbol -> [_Partition]
+        self._by_strategy = {}  # strategy -> [_Partition]
+        # Bumped on every push so long-polling consumers wake immediately
+        self._arrival = threading.Condition(threading.Lock())
+        self._generation = 0
+        self._waiters = 0
+
+    def __len__(self):
+        with self._lock:
+            self._expire()
+            return self._live_size() + (len(self._spill) if self._spill else 0)
+
+    @property
+    def spilled(self):
+        """Signals currently on disk"""
+        spill = self._spill
+        return len(spill) if spill else 0
+
+    def push(self, signal, encoded=None):
+        """Add a signal, applying the overflow policy if the store is full; returns its sequence number"""
+        key = partition_key(signal)
+        budget = self.max_bytes
+        if budget is not None and encoded is None:
+            encoded = encode_signal(signal)
+        record = pack(signal)
+        ttl = self.ttl.seconds(signal) if self.ttl else None
+        with self._lock:
+            self._expire()
+            if self.overflow == 'reject':
+                self._check_room(1, 0 if budget is None else entry_size(encoded))
+            partition = self._partitions.get(key)
+            if partition is None:
+                partition = self._add_partition(key)
+            seq = next(self._seq)
+            self._last_seq = seq
+            entry = _Entry(seq, record, encoded, partition)
+            if ttl is not None:
+                self._schedule(entry, entry.arrived + ttl)
+            self._order.append(entry)
+            self._size += 1
+            if budget is not None:
+                self._bytes += entry_size(encoded)
+            if self._over_budget():
+                self._make_room()
+            elif len(self._order) > 2 * self.capacity:
+                # Filtered pops leave dead entries in the middle of _order;
+                # rebuild once they outnumber the capacity (amortized O(1))
+                self._order = deque(e for e in self._order if e.live)
+        with partition.lock:
+            # Trim entries already removed through _order: unfiltered pops take
+            # the newest (right) end, evictions the oldest (left) end
+            entries = partition.entries
+            partition.newest_live()
+            while entries and not entries[0].live:
+                entries.popleft()
+            if entry.live:
+                entries.append(entry)
+        # Waiters re-check _generation under _arrival before sleeping, so the
+        # lock is only needed when someone is actually waiting
+        self._generation += 1
+        if self._waiters:
+            with self._arrival:
+                self._arrival.notify_all()
+        return entry.seq
+
+    def push_many(self, signals, encoded=None):
+        """Add several signals under a single acquisition of the global lock; returns their sequence numbers"""
+        keys = [partition_key(signal) for signal in signals]
+        budget = self.max_bytes
+        if encoded is None:
+            encoded = ([None] * len(signals) if budget is None
+                       else [encode_signal(signal) for signal in signals])
+        added = 0 if budget is None else sum(entry_size(data) for data in encoded)
+        records = [pack(signal) for signal in signals]
+        ttls = [self.ttl.seconds(signal) for signal in signals] if self.ttl else [None] * len(signals)
+        entries = []
+        with self._lock:
+            self._expire()
+            if self.overflow == 'reject':
+                self._check_room(len(signals), added)
+            partitions = self._partitions
+            order = self._order
+            for record, data, key, ttl in zip(records, encoded, keys, ttls):
+                partition = partitions.get(key)
+                if partition is None:
+                    partition = self._add_partition(key)
+                entry = _Entry(next(self._seq), record, data, partition)
+                if ttl is not None:
+                    self._schedule(entry, entry.arrived + ttl)
+                entries.append(entry)
+                order.append(entry)
+            if entries:
+                self._last_seq = entries[-1].seq
+            self._size += len(entries)
+            self._bytes += added
+            if self._over_budget():
+                self._make_room()
+            if len(self._order) > 2 * self.capacity:
+                self._order = deque(e for e in self._order if e.live)
+        # One lock acquisition per partition touched by the batch
+        by_partition = {}
+        for entry in entries:
+            by_partition.setdefault(entry.partition, []).append(entry)
+        for partition, batch in by_partition.items():
+            with partition.lock:
+                partition.newest_live()
+                partition.entries.extend(e for e in batch if e.live)
+        self._generation += 1
+        if self._waiters:
+            with self._arrival:
+                self._arrival.notify_all()
+        return [entry.seq for entry in entries]
+
+    def restore(self, entries):
+        """
+        Bulk-insert (sequence number, signal) pairs, oldest first
+
+        Used to rebuild the store when replaying a log at startup, before the
+        store is shared with other threads. Entries that don't fit are spilled
+        under the 'spill' policy and discarded otherwise. With a TTL, signals
+        whose deadline (counted from their timestamp) has passed are dropped.
+        """
+        entries = list(entries)
+        if self.overflow != 'spill':
+            entries = entries[-self.capacity:]
+        budget = self.max_bytes
+        ttl = self.ttl
+        now = time.time()
+        with self._lock:
+            partitions = self._partitions
+            order = self._order
+            restored = 0
+            for seq, signal in entries:
+                expires = ttl.deadline(signal, signal_time(signal) or now) if ttl else None
+                if expires is not None and expires <= now:
+                    self.expired += 1
+                    continue
+                key = partition_key(signal)
+                partition = partitions.get(key)
+                if partition is None:
+                    partition = self._add_partition(key)
+                entry = _Entry(seq, pack(signal), None if budget is None else encode_signal(signal), partition)
+                if expires is not None:
+                    self._schedule(entry, expires)
+                order.append(entry)
+                partition.entries.append(entry)
+                if budget is not None:
+                    self._bytes += entry_size(entry.encoded)
+                restored += 1
+            self._size += restored
+            if self._over_budget():
+                self._make_room()
+            if entries and entries[-1][0] > self._last_seq:
+                self._seq = itertools.count(entries[-1][0] + 1)
+                self._last_seq = entries[-1][0]
+
+    def reserve_seq(self, last_seq):
+        """Make sure future sequence numbers are greater than `last_seq`"""
+        with self._lock:
+            if last_seq > self._last_seq:
+                self._seq = itertools.count(last_seq + 1)
+                self._last_seq = last_seq
+
+    def pop(self, count, timeout=None, symbol=None, strategy=None):
+        """
+        Remove and return up to `count` signals, most recent first
+
+        If `symbol` and/or `strategy` are given, only matching signals are
+        removed. If `timeout` is given and nothing matches, wait up to that
+        many seconds for a matching signal to arrive before returning.
+        """
+        return [unpack(entry.signal) for entry in self._take(count, timeout, symbol, strategy)]
+
+    def pop_encoded(self, count, timeout=None, symbol=None, strategy=None):
+        """Like pop(), but returns each signal's encoded JSON bytes"""
+        return [entry.encoded or encode_signal(unpack(entry.signal))
+                for entry in self._take(count, timeout, symbol, strategy)]
+
+    def _take(self, count, timeout, symbol, strategy):
+        """Remove and return up to `count` matching _Entry objects, most recent first"""
+        if count <= 0:
+            return []
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            generation = self._generation
+            if self._wheel is not None and self._wheel.due(time.time()):
+                with self._lock:
+                    self._expire()
+            entries = self._pop(count, symbol, strategy)
+            if self._spill and self._page_in() and len(entries) < count:
+                # Paged-in signals are older than anything just popped
+                entries += self._pop(count - len(entries), symbol, strategy)
+            if entries or deadline is None:
+                return entries
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return entries
+            with self._arrival:
+                self._waiters += 1
+                try:
+                    self._arrival.wait_for(lambda: self._generation != generation, remaining)
+                finally:
+                    self._waiters -= 1
+
+    def _pop(self, count, symbol, strategy):
+        if symbol is None and strategy is None:
+            return self._pop_any(count)
+        return self._pop_matching(count, symbol, strategy)
+
+    def snapshot(self):
+        """Return a copy of all stored signals (including spilled ones), most recent first"""
+        now = time.time()
+        with self._lock:
+            self._expire()
+            signals = [unpack(e.signal) for e in reversed(self._order)
+                       if e.live and (e.expires is None or e.expires > now)]
+            if self._spill:
+                signals.extend(signal for _, signal in reversed(self._spilled(now)))
+            return signals
+
+    def snapshot_entries(self):
+        """
+        Return ([(sequence number, signal)], last_seq) with entries oldest first
+
+        last_seq is the highest sequence number issued so far, taken atomically
+        with the entries. Spilled signals are included, expired ones aren't.
+        """
+        now = time.time()
+        with self._lock:
+            self._expire()
+            entries = self._spilled(now) if self._spill else []
+            entries.extend((e.seq, unpack(e.signal)) for e in self._order
+                           if e.live and (e.expires is None or e.expires > now))
+            return entries, self._last_seq
+
+    def oldest_age(self):
+        """Seconds since the oldest stored signal arrived, or None if the store is empty"""
+        with self._lock:
+            self._expire()
+            if self._spill:
+                return time.time() - self._spill.oldest_arrival()
+            order = self._order
+            while order and not order[0].live:
+                order.popleft()
+            return time.time() - order[0].arrived if order else None
+
+    def set_lock_wait_observer(self, observer):
+        self._lock.on_wait = observer
+
+    def clear(self):
+        """Drop every stored signal"""
+        with self._lock:
+            for entry in self._order:
+                entry.partition.claim(entry)
+            self._order.clear()
+            if self._wheel is not None:
+                self._wheel.clear()
+            # Filtered pops still to settle subtract their entries later
+            unsettled = list(self._unsettled)
+            self._size = sum(count for count, _ in unsettled)
+            self._bytes = sum(size for _, size in unsettled)
+            if self._spill:
+                self._spill.clear()
+
+    def close(self):
+        """Remove the spill file, if any"""
+        with self._lock:
+            if self._spill is not None:
+                self._spill.close()
+                self._spill = None
+
+    def _add_partition(self, key):
+        """Create and index a partition (global lock held)"""
+        partition = _Partition(key)
+        self._partitions[key] = partition
+        self._by_symbol.setdefault(key[0], []).append(partition)
+        self._by_strategy.setdefault(key[1], []).append(partition)
+        return partition
+
+    def _schedule(self, entry, expires):
+        """Start the expiry timer of a new entry (global lock held)"""
+        entry.expires = expires
+        wheel = self._wheel
+        if len(wheel) > 2 * self.capacity:
+            # Timers of popped signals are left to fire; drop them once they
+            # outnumber the capacity (amortized O(1), like _order)
+            wheel.compact(lambda e: e.live)
+        wheel.add(expires, entry)
+
+    def _expire(self):
+        """Remove the signals whose TTL has passed (global lock held)"""
+        wheel = self._wheel
+        now = time.time()
+        if wheel is None or not wheel.due(now):
+            return
+        self._discard_expired([entry for entry in wheel.advance(now) if entry.partition.claim(entry)])
+
+    def _discard_expired(self, entries):
+        """Account for expired entries already claimed (global lock held)"""
+        self._size -= len(entries)
+        if self.max_bytes is not None:
+            self._bytes -= sum(entry_size(entry.encoded) for entry in entries)
+        self.expired += len(entries)
+
+    def _spilled(self, now):
+        """(seq, signal) of the spilled signals that haven't expired, oldest first (global lock held)"""
+        ttl = self.ttl
+        entries = []
+        for seq, arrived, data in self._spill.read_all():
+            signal = decode(data)
+            expires = ttl.deadline(signal, arrived) if ttl else None
+            if expires is None or expires > now:
+                entries.append((seq, signal))
+        return entries
+
+    def _live_size(self):
+        """_size less the entries filtered pops have claimed but not yet settled (global lock held)"""
+        unsettled = self._unsettled
+        return self._size - sum(count for count, _ in unsettled) if unsettled else self._size
+
+    def _live_bytes(self):
+        unsettled = self._unsettled
+        return self._bytes - sum(size for _, size in unsettled) if unsettled else self._bytes
+
+    def _over_budget(self):
+        """True if the store holds more than its capacity or memory budget (global lock held)"""
+        return (self._live_size() > self.capacity
+                or (self.max_bytes is not None and self._live_bytes() > self.max_bytes))
+
+    def _check_room(self, count, size):
+        """Raise StoreFullError unless `count` more signals of `size` bytes in total fit (global lock held)"""
+        live = self._live_size()
+        if (live + count > self.capacity
+                or (self.max_bytes is not None and self._live_bytes() + size > self.max_bytes)):
+            self.rejected += count
+            raise StoreFullError(f"Signal store is full ({live} of {self.capacity} signals)")
+
+    def _make_room(self):
+        """Drop or spill the oldest entries until the store is within its budget (global lock held)"""
+        evicted = []
+        order = self._order
+        budget = self.max_bytes
+        while order and self._over_budget():
+            entry = order.popleft()
+            if entry.partition.claim(entry):
+                self._size -= 1
+                if budget is not None:
+                    self._bytes -= entry_size(entry.encoded)
+                evicted.append(entry)
+        if self.overflow != 'spill':
+            # 'reject' only gets here from restore()
+            self.dropped += len(evicted)
+        elif evicted:
+            if self._spill is None:
+                self._spill = SpillStack(self.spill_dir)
+            self._spill.push_many((entry.seq, entry.arrived, entry.encoded or encode_signal(unpack(entry.signal)))
+                                  for entry in evicted)
+            self.spilled_total += len(evicted)
+
+    def _page_in(self):
+        """
+        Once pops have drained the store to half its budget, move the newest
+        spilled signals back into memory until it is three quarters full;
+        returns whether anything was paged in
+        """
+        with self._lock:
+            spill = self._spill
+            budget = self.max_bytes
+            size = self._live_size()
+            if (not spill or size > self.capacity // 2
+                    or (budget is not None and self._live_bytes() > budget // 2)):
+                return False
+            records = spill.pop_many(max(self.capacity * 3 // 4 - size, 1))
+            if budget is not None:
+                room = budget * 3 // 4 - self._live_bytes()
+                for i, (_, _, data) in enumerate(records):
+                    room -= entry_size(data)
+                    if room < 0 and i:
+                        spill.push_many(reversed(records[i:]))
+                        del records[i:]
+                        break
+            partitions = self._partitions
+            order = self._order
+            ttl = self.ttl
+            now = time.time()
+            paged = 0
+            # Newest first, each one older than everything already in memory
+            for seq, arrived, data in records:
+                signal = decode(data)
+                expires = ttl.deadline(signal, arrived) if ttl else None
+                if expires is not None and expires <= now:
+                    self.expired += 1
+                    continue
+                key = partition_key(signal)
+                partition = partitions.get(key)
+                if partition is None:
+                    partition = self._add_partition(key)
+                entry = _Entry(seq, pack(signal), data, partition)
+                entry.arrived = arrived
+                if expires is not None:
+                    self._schedule(entry, expires)
+                order.appendleft(entry)
+                with partition.lock:
+                    entries = partition.entries
+                    while entries and not entries[0].live:
+                        entries.popleft()
+                    entries.appendleft(entry)
+                if budget is not None:
+                    self._bytes += entry_size(data)
+                paged += 1
+            self._size += paged
+            return bool(paged)
+
+    def _pop_any(self, count):
+        result = []
+        expired = []
+        now = time.time()
+        with self._lock:
+            order = self._order
+            while order and len(result) < count:
+                entry = order.pop()
+                if entry.partition.claim(entry):
+                    if entry.expires is not None and entry.expires <= now:
+                        expired.append(entry)  # Due, but the wheel hasn't reached it yet
+                    else:
+                        result.append(entry)
+            self._size -= len(result)
+            if self.max_bytes is not None:
+                self._bytes -= sum(entry_size(entry.encoded) for entry in result)
+            if expired:
+                self._discard_expired(expired)
+        return result
+
+    def _pop_matching(self, count, symbol, strategy):
+        if symbol is not None and strategy is not None:
+            partition = self._partitions.get((symbol, strategy))
+            partitions = [partition] if partition is not None else []
+        elif symbol is not None:
+            partitions = list(self._by_symbol.get(symbol, ()))
+        else:
+            partitions = list(self._by_strategy.get(strategy, ()))
+        if not partitions:
+            return []
+
+        partitions.sort(key=id)  # Consistent lock order between concurrent pops
+        for partition in partitions:
+            partition.lock.acquire()
+        claim = None
+        try:
+            result, expired = self._merge_newest(partitions, count, time.time())
+            if result or expired:
+                # Settled below once the global lock is free; noted now,
+                # before any other thread can see these entries are dead
+                size = (sum(entry_size(entry.encoded) for entry in itertools.chain(result, expired))
+                        if self.max_bytes is not None else 0)
+                claim = (len(result) + len(expired), size)
+                self._unsettled.append(claim)
+        finally:
+            for partition in partitions:
+                partition.lock.release()
+        if claim is not None:
+            with self._lock:
+                self._unsettled.remove(claim)  # Or an equal tuple: same effect
+                self._size -= len(result)
+                if self.max_bytes is not None:
+                    self._bytes -= sum(entry_size(entry.encoded) for entry in result)
+                if expired:
+                    self._discard_expired(expired)
+        return result
+
+    @staticmethod
+    def _merge_newest(partitions, count, now):
+        """
+        Pop the `count` newest live entries across partitions (partition locks held)
+
+        Returns (entries, expired): entries past their deadline at `now` are
+        removed too, but returned separately.
+        """
+        if len(partitions) == 1:
+            heads = None
+            partition = partitions[0]
+        else:
+            # Max-heap on sequence number of each partition's newest entry
+            heads = []
+            for i, p in enumerate(partitions):
+                entry = p.newest_live()
+                if entry is not None:
+                    heads.append((-entry.seq, i))
+            heapq.heapify(heads)
+
+        result = []
+        expired = []
+        while len(result) < count:
+            if heads is None:
+                entry = partition.newest_live()
+                if entry is None:
+                    break
+            else:
+                if not heads:
+                    break
+                _, i = heapq.heappop(heads)
+                partition = partitions[i]
+                entry = partition.newest_live()
+            partition.entries.pop()
+            entry.live = False
+            if entry.expires is not None and entry.expires <= now:
+                expired.append(entry)
+            else:
+                result.append(entry)
+            if heads is not None:
+                entry = partition.newest_live()
+                if entry is not None:
+                    heapq.heappush(heads, (-entry.seq, i))
+        return result, expired
@@ -0,0 +1,133 @@
+"""
+Fan-out of newly stored signals to Server-Sent Events subscribers
+
+SignalBroadcaster encodes each signal once when it is published and hands the
+encoded event to every connected subscriber. Each subscriber has its own
+bounded buffer: if a consumer falls behind, its oldest undelivered events are
+dropped (and counted) instead of making publish() wait, so a slow stream can
+never hold up /webhook.
+
+Every event gets a monotonically increasing ID. The last REPLAY_SIZE events are
+kept so a client that reconnects with `Last-Event-ID` can resume where it left
+off; with `max_bytes` (MAX_SIGNALS_BYTES), fewer if they would take more memory
+than that. Events reach each subscriber in ID order, the same order as the replay
+buffer.
+"""
+import itertools
+import threading
+from collections import deque
+
+from signal_codec import encode_signal
+
+DEFAULT_REPLAY_SIZE = 1000
+DEFAULT_BUFFER_SIZE = 256
+# Approximate bytes a replayed event costs besides its JSON: the (id, data)
+# tuple, the id and the bytes object's header
+EVENT_OVERHEAD = 120
+
+
+class Subscription:
+    """One connected stream consumer and its bounded event buffer"""
+
+    def __init__(self, buffer_size):
+        self._events = deque(maxlen=buffer_size)
+        self._ready = threading.Condition(threading.Lock())
+        self.dropped = 0  # Events discarded because this consumer fell behind
+
+    def _offer(self, event):
+        with self._ready:
+            if len(self._events) == self._events.maxlen:
+                self.dropped += 1
+            self._events.append(event)
+            self._ready.notify()
+
+    def get(self, timeout):
+        """
+        Wait up to `timeout` seconds for events
+
+        Returns (events, dropped): the buffered (id, data) pairs, oldest first,
+        with data the signal's JSON bytes, and how many events were dropped
+        since the previous call.
+        """
+        with self._ready:
+            if not self._events:
+                self._ready.wait(timeout)
+            events = list(self._events)
+            self._events.clear()
+            dropped, self.dropped = self.dropped, 0
+            return events, dropped
+
+
+class SignalBroadcaster:
+    """Publishes signals to every active Subscription"""
+
+    def __init__(self, replay_size=DEFAULT_REPLAY_SIZE, buffer_size=DEFAULT_BUFFER_SIZE,
+                 max_subscribers=None, max_bytes=None):
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self.replay_size = replay_size
+        self.max_bytes = max_bytes or None
+        self._ids = itertools.count(1)
+        self._replay = deque()
+        self._replay_bytes = 0  # EVENT_OVERHEAD + len(data) of the replayed events, with max_bytes
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, signal, encoded=None):
+        """
+        Queue a signal for every subscriber; never blocks on consumers
+
+        Pass `encoded` (signal_codec bytes) to reuse the encoding made at ingest;
+        events keep those bytes rather than a copy, so the replay buffer costs
+        little more than its (id, data) tuples.
+        """
+        data = encoded or encode_signal(signal)
+        with self._lock:
+            # Offered under the lock too, so every subscriber gets events in ID
+            # order even when several threads publish at once
+            event = (next(self._ids), data)
+            replay = self._replay
+            replay.append(event)
+            if self.max_bytes is None:
+                if len(replay) > self.replay_size:
+                    replay.popleft()
+            else:
+                self._replay_bytes += EVENT_OVERHEAD + len(data)
+                while len(replay) > 1 and (len(replay) > self.replay_size or self._replay_bytes > self.max_bytes):
+                    self._replay_bytes -= EVENT_OVERHEAD + len(replay.popleft()[1])
+            for subscription in self._subscribers:
+                subscription._offer(event)
+        return event[0]
+
+    def subscribe(self, last_id=None):
+        """
+        Register a new subscriber, or return None if max_subscribers is reached
+
+        If `last_id` is given, events published after it that are still in the
+        replay buffer are queued immediately. Events older than the replay
+        buffer are reported as dropped.
+        """
+        subscription = Subscription(self.buffer_size)
+        with self._lock:
+            if self.max_subscribers is not None and len(self._subscribers) >= self.max_subscribers:
+                return None
+            if last_id is not None and self._replay:
+                oldest_id, newest_id = self._replay[0][0], self._replay[-1][0]
+                if last_id > newest_id:
+                    # ID from before a server restart: everything retained is new
+                    last_id = 0
+                if last_id + 1 < oldest_id:
+                    subscription.dropped = oldest_id - last_id - 1
+                for event in self._replay:
+                    if event[0] > last_id:
+                        subscription._offer(event)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
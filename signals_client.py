@@ -0,0 +1,318 @@
+"""
+Client library for consuming signals from GET /signals
+
+SignalsClient is what a Python trading bot should use instead of calling
+requests.get for every poll (as the minimal example_bot_client.py does):
+
+- One keep-alive session with a connection pool, so polls reuse a TCP (and
+  TLS) connection instead of opening a new one each time.
+- Long polling (`wait`), so a signal is delivered as soon as it is stored.
+- Adaptive batch size: the `limit` sent with each poll doubles while
+  responses come back full (a backlog is building up) and halves again when
+  they come back mostly empty, between `min_limit` and `max_limit`.
+- Retries with exponential backoff and full jitter for connection errors,
+  timeouts, 429 and 5xx responses (a Retry-After header is honored).
+- iter_signals() and run(callback) to stream signals into a bot, oldest
+  first within each batch.
+
+AsyncSignalsClient has the same API for asyncio bots. It uses only the
+standard library: a small pool of persistent HTTP/1.1 connections.
+
+GET /signals removes the signals it returns, so a response lost after the
+server sent it (e.g. a read timeout) loses those signals. Use consumer groups
+(?group=) where every signal must be processed.
+"""
+import asyncio
+import inspect
+import json
+import logging
+import random
+import ssl
+import time
+from urllib.parse import urlencode, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_URL = 'http://localhost:5000'
+DEFAULT_WAIT = 20  # Seconds the server may hold a poll open (capped by LONG_POLL_MAX_WAIT)
+DEFAULT_TIMEOUT = 5  # Seconds to connect, and to read on top of `wait`
+DEFAULT_POOL_SIZE = 4
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class SignalsClientError(Exception):
+    """A poll failed and was not (or no longer) retried"""
+
+
+class _ClientBase:
+    """Settings, batch-size adaptation and retry policy shared by both clients"""
+
+    def __init__(self, base_url=DEFAULT_URL, wait=DEFAULT_WAIT, timeout=DEFAULT_TIMEOUT,
+                 min_limit=10, max_limit=1000, max_retries=5, backoff=0.25, max_backoff=10.0,
+                 symbol=None, strategy=None):
+        if not 1 <= min_limit <= max_limit:
+            raise ValueError(f"Expected 1 <= min_limit <= max_limit, got {min_limit} and {max_limit}")
+        self.base_url = base_url.rstrip('/')
+        self.wait = wait
+        self.timeout = timeout
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = min_limit
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.symbol = symbol
+        self.strategy = strategy
+
+    def _params(self, limit, wait, symbol, strategy):
+        params = {'limit': limit or self.limit}
+        if wait:
+            params['wait'] = wait
+        symbol = symbol or self.symbol
+        strategy = strategy or self.strategy
+        if symbol:
+            params['symbol'] = symbol
+        if strategy:
+            params['strategy'] = strategy
+        return params
+
+    def _adapt(self, requested, received):
+        """Grow the batch size while polls come back full, shrink it when they are mostly empty"""
+        if received >= requested:
+            self.limit = min(self.limit * 2, self.max_limit)
+        elif received <= requested // 4:
+            self.limit = max(self.limit // 2, self.min_limit)
+
+    def _retry_delay(self, attempt, retry_after=None):
+        """Seconds to sleep before retry number `attempt` (0-based): full jitter, capped"""
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def _give_up(self, attempt, retries, error):
+        retries = self.max_retries if retries is None else retries
+        if retries >= 0 and attempt >= retries:
+            raise SignalsClientError(f"GET /signals failed: {error}") from (
+                error if isinstance(error, BaseException) else None)
+        logger.warning(f"GET /signals failed ({error}); retrying")
+
+
+def _retry_after(value):
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None  # An HTTP date; fall back to our own backoff
+
+
+def _signals(body):
+    result = json.loads(body)
+    if result.get('status') != 'success':
+        raise SignalsClientError(f"Unexpected response: {result}")
+    return result['signals']
+
+
+class SignalsClient(_ClientBase):
+    """Blocking client with a pooled keep-alive session"""
+
+    def __init__(self, base_url=DEFAULT_URL, pool_size=DEFAULT_POOL_SIZE, session=None, **options):
+        super().__init__(base_url, **options)
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def fetch(self, limit=None, wait=None, symbol=None, strategy=None, retries=None):
+        """
+        Remove and return up to `limit` signals, most recent first
+
+        Without `limit` the adaptive batch size is used (and adapted). `wait`
+        long-polls for up to that many seconds. Raises SignalsClientError once
+        `retries` (default: max_retries; negative: forever) retries failed.
+
+        Delivery is at most once: a poll that times out or loses its
+        connection after the server removed the signals is retried, and those
+        signals are lost. Use a consumer group (?group=, with lease and ack)
+        where every signal must be processed.
+        """
+        params = self._params(limit, wait, symbol, strategy)
+        url = f'{self.base_url}/signals'
+        attempt = 0
+        while True:
+            retry_after = None
+            try:
+                response = self.session.get(url, params=params, timeout=(self.timeout, self.timeout + (wait or 0)))
+            except requests.RequestException as e:
+                error = e
+            else:
+                if response.status_code == 200:
+                    signals = _signals(response.content)
+                    if limit is None:
+                        self._adapt(params['limit'], len(signals))
+                    return signals
+                if response.status_code not in RETRY_STATUSES:
+                    raise SignalsClientError(f"GET /signals returned {response.status_code}: {response.text[:200]}")
+                error = f"HTTP {response.status_code}"
+                retry_after = _retry_after(response.headers.get('Retry-After'))
+            self._give_up(attempt, retries, error)
+            time.sleep(self._retry_delay(attempt, retry_after))
+            attempt += 1
+
+    def iter_signals(self, wait=None, symbol=None, strategy=None):
+        """Yield signals as they arrive, forever (oldest first within each batch)"""
+        wait = self.wait if wait is None else wait
+        while True:
+            for signal in reversed(self.fetch(wait=wait, symbol=symbol, strategy=strategy, retries=-1)):
+                yield signal
+
+    def run(self, callback, **options):
+        """Call `callback(signal)` for every signal, forever; options as for iter_signals"""
+        for signal in self.iter_signals(**options):
+            callback(signal)
+
+
+class _Connection:
+    """One persistent HTTP/1.1 connection"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.reusable = True
+        self.used = False  # A full response has been read: a later failure may just be a stale keep-alive
+
+    def close(self):
+        self.reusable = False
+        self.writer.close()
+
+    async def get(self, target, host):
+        """Send a GET; returns (status, headers, body)"""
+        self.writer.write(f'GET {target} HTTP/1.1\r\nHost: {host}\r\nAccept: application/json\r\n'
+                          f'Connection: keep-alive\r\n\r\n'.encode())
+        await self.writer.drain()
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed by the server")
+        status = int(status_line.split()[1])
+        headers = {}
+        while (line := await self.reader.readline()) not in (b'\r\n', b''):
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if 'content-length' in headers:
+            body = await self.reader.readexactly(int(headers['content-length']))
+        elif headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while (size := int((await self.reader.readline()).split(b';')[0], 16)):
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readline()
+            await self.reader.readline()
+            body = b''.join(chunks)
+        else:
+            body = await self.reader.read()
+            self.reusable = False
+        if headers.get('connection', '').lower() == 'close':
+            self.reusable = False
+        self.used = True
+        return status, headers, body
+
+
+class AsyncSignalsClient(_ClientBase):
+    """asyncio client with a pool of persistent connections"""
+
+    def __init__(self, base_url=DEFAULT_URL, pool_size=DEFAULT_POOL_SIZE, **options):
+        super().__init__(base_url, **options)
+        url = urlsplit(self.base_url)
+        self._secure = url.scheme == 'https'
+        self._host = url.hostname
+        self._port = url.port or (443 if self._secure else 80)
+        self._netloc = url.netloc
+        self._path = url.path
+        self._idle = []  # Connections ready for reuse
+        self._slots = asyncio.Semaphore(pool_size)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+    async def _connect(self):
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(
+            self._host, self._port, ssl=ssl.create_default_context() if self._secure else None), self.timeout)
+        return _Connection(reader, writer)
+
+    async def _get(self, target, timeout):
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else await self._connect()
+            try:
+                try:
+                    result = await asyncio.wait_for(connection.get(target, self._netloc), timeout)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    if not connection.used:
+                        raise  # A fresh connection failed: the server may already have removed the signals
+                    # The server closed an idle keep-alive connection; retry once on a new one
+                    connection.close()
+                    connection = await self._connect()
+                    result = await asyncio.wait_for(connection.get(target, self._netloc), timeout)
+            except BaseException:
+                connection.close()
+                raise
+            if connection.reusable:
+                self._idle.append(connection)
+            else:
+                connection.close()
+            return result
+
+    async def fetch(self, limit=None, wait=None, symbol=None, strategy=None, retries=None):
+        """Like SignalsClient.fetch(), and likewise at most once"""
+        params = self._params(limit, wait, symbol, strategy)
+        target = f'{self._path}/signals?{urlencode(params)}'
+        attempt = 0
+        while True:
+            retry_after = None
+            try:
+                status, headers, body = await self._get(target, self.timeout + (wait or 0))
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+                error = e
+            else:
+                if status == 200:
+                    signals = _signals(body)
+                    if limit is None:
+                        self._adapt(params['limit'], len(signals))
+                    return signals
+                if status not in RETRY_STATUSES:
+                    raise SignalsClientError(f"GET /signals returned {status}: {body[:200]!r}")
+                error = f"HTTP {status}"
+                retry_after = _retry_after(headers.get('retry-after'))
+            self._give_up(attempt, retries, error)
+            await asyncio.sleep(self._retry_delay(attempt, retry_after))
+            attempt += 1
+
+    async def iter_signals(self, wait=None, symbol=None, strategy=None):
+        """Like SignalsClient.iter_signals(), as an async iterator"""
+        wait = self.wait if wait is None else wait
+        while True:
+            for signal in reversed(await self.fetch(wait=wait, symbol=symbol, strategy=strategy, retries=-1)):
+                yield signal
+
+    async def run(self, callback, **options):
+        """Call `callback(signal)` (a function or coroutine function) for every signal, forever"""
+        async for signal in self.iter_signals(**options):
+            result = callback(signal)
+            if inspect.isawaitable(result):
+                await result
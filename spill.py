@@ -0,0 +1,101 @@
+"""
+Disk-backed overflow for SignalStore's "spill" overflow policy
+
+When the store is over its count or memory budget, the oldest signals are
+moved here instead of being discarded, and paged back in as consumers drain
+the store. Spilled signals are always older than every signal still in
+memory, and the store pages in the newest of them first, so the file is a
+stack: records are appended at the end and read back (and truncated) from the
+end. Each record is a small header (sequence number, arrival time, length)
+followed by the signal's encoded JSON bytes.
+
+The file is scratch space, not a durability mechanism: it is unlinked on
+close, and a durable store still logs every signal in its WAL.
+SpillStack is not thread-safe; SignalStore only uses it under its global lock.
+"""
+import os
+import struct
+import tempfile
+from array import array
+
+_RECORD = struct.Struct('<QdI')  # seq, arrival time, length of the encoded signal
+
+
+class SpillStack:
+    """Append-only file of (seq, arrived, encoded) records, read back newest first"""
+
+    def __init__(self, directory=None):
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._fd, self.path = tempfile.mkstemp(prefix='signals-spill-', suffix='.bin', dir=directory)
+        self._offsets = array('Q')  # Start of every record, oldest first
+        self._end = 0
+        self.bytes = 0  # Encoded signal bytes currently on disk
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def push_many(self, records):
+        """Append (seq, arrived, encoded) records, oldest first"""
+        chunks = []
+        offset = self._end
+        for seq, arrived, encoded in records:
+            self._offsets.append(offset)
+            chunks.append(_RECORD.pack(seq, arrived, len(encoded)))
+            chunks.append(encoded)
+            offset += _RECORD.size + len(encoded)
+            self.bytes += len(encoded)
+        if chunks:
+            os.pwrite(self._fd, b''.join(chunks), self._end)
+            self._end = offset
+
+    def pop_many(self, count):
+        """Remove and return up to `count` records, newest first"""
+        count = min(count, len(self._offsets))
+        if count <= 0:
+            return []
+        start = self._offsets[-count]
+        records = self._parse(os.pread(self._fd, self._end - start, start))
+        del self._offsets[-count:]
+        os.ftruncate(self._fd, start)
+        self._end = start
+        records.reverse()
+        for record in records:
+            self.bytes -= len(record[2])
+        return records
+
+    def oldest_arrival(self):
+        """Arrival time of the oldest record (the stack must not be empty)"""
+        return _RECORD.unpack(os.pread(self._fd, _RECORD.size, 0))[1]
+
+    def read_all(self):
+        """Every record, oldest first, without removing anything"""
+        return self._parse(os.pread(self._fd, self._end, 0)) if self._end else []
+
+    def clear(self):
+        os.ftruncate(self._fd, 0)
+        del self._offsets[:]
+        self._end = 0
+        self.bytes = 0
+
+    def close(self):
+        if self._fd is None:
+            return
+        os.close(self._fd)
+        self._fd = None
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _parse(data):
+        records = []
+        offset = 0
+        unpack = _RECORD.unpack_from
+        while offset < len(data):
+            seq, arrived, length = unpack(data, offset)
+            offset += _RECORD.size
+            records.append((seq, arrived, data[offset:offset + length]))
+            offset += length
+        return records
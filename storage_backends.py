@@ -0,0 +1,138 @@
+"""
+Storage backends for signals
+
+app.py's save_signal / pop_signals / load_signals talk to a StorageBackend, so
+the in-memory store can be swapped for a shared one (e.g. Redis, which lets
+gunicorn run more than one worker and survives restarts). The backend is
+chosen with the SIGNALS_BACKEND environment variable:
+
+    memory  - SignalStore, in-process (default); durable across restarts
+              when SIGNALS_WAL_DIR is set (signal_log.py)
+    redis   - RedisBackend, see redis_backend.py
+    shm     - SharedMemoryBackend, shared by every worker process on one
+              host, see shm_backend.py
+"""
+from signal_codec import encode_signal
+
+# What a full backend does with a new signal (SIGNALS_OVERFLOW)
+OVERFLOW_POLICIES = ('drop-oldest', 'reject', 'spill')
+
+
+class StoreFullError(Exception):
+    """Raised by push/push_many when the backend is full and its overflow policy is 'reject'"""
+
+
+class StorageBackend:
+    """Interface every signal storage backend implements"""
+
+    name = None  # Reported by /health
+    overflow = 'drop-oldest'  # One of OVERFLOW_POLICIES
+    dropped = 0  # Signals discarded because the backend was full (reported by /metrics)
+    rejected = 0  # Signals refused with StoreFullError
+    spilled = 0  # Signals currently moved to disk
+    expired = 0  # Signals removed because their TTL passed (signal_expiry.py)
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def push(self, signal, encoded=None):
+        """
+        Store a signal; returns its sequence number
+
+        When the backend is full, what happens depends on its overflow policy:
+        the oldest signal is discarded ('drop-oldest'), StoreFullError is raised
+        ('reject'), or the oldest signal is moved to disk ('spill').
+
+        `encoded` is the signal already serialized by signal_codec.encode_signal,
+        so backends don't have to encode it again.
+        """
+        raise NotImplementedError
+
+    def push_many(self, signals, encoded=None):
+        """
+        Store several signals in order; backends override this to do it in one operation
+
+        Under the 'reject' policy a batch that does not fit is refused as a
+        whole.
+        """
+        if encoded is None:
+            return [self.push(signal) for signal in signals]
+        return [self.push(signal, data) for signal, data in zip(signals, encoded)]
+
+    def pop(self, count, timeout=None, symbol=None, strategy=None):
+        """
+        Remove and return up to `count` signals, most recent first
+
+        Filters and long-poll `timeout` behave as described in
+        SignalStore.pop.
+        """
+        raise NotImplementedError
+
+    def pop_encoded(self, count, timeout=None, symbol=None, strategy=None):
+        """Like pop(), but returns each signal as signal_codec-encoded JSON bytes"""
+        return [encode_signal(signal) for signal in self.pop(count, timeout, symbol, strategy)]
+
+    def snapshot(self):
+        """Return a copy of all stored signals, most recent first"""
+        raise NotImplementedError
+
+    def oldest_age(self):
+        """Seconds since the oldest stored signal arrived, or None if unknown or empty"""
+        return None
+
+    def set_lock_wait_observer(self, observer):
+        """
+        Report contended lock waits: `observer` is called with the seconds a
+        push or pop waited for the backend's lock. Backends without a lock of
+        their own ignore it.
+        """
+
+    def clear(self):
+        """Drop every stored signal"""
+        raise NotImplementedError
+
+    def close(self):
+        """Flush anything buffered before the process exits"""
+
+
+def create_backend(name, capacity, wal_dir=None, wal_fsync='group', overflow='drop-oldest',
+                   max_bytes=None, spill_dir=None, ttl=None):
+    """
+    Build the backend called `name` ('memory', 'redis' or 'shm')
+
+    With `wal_dir`, the memory backend logs to (and replays from) a
+    write-ahead log in that directory; see signal_log.py.
+
+    `overflow` is one of OVERFLOW_POLICIES. Only the memory backend supports
+    every policy and a memory budget (`max_bytes`); the shm backend supports
+    'drop-oldest' and 'reject', and Redis only 'drop-oldest' (its list is
+    trimmed by LTRIM).
+
+    `ttl` (a signal_expiry.SignalTTL) expires signals; only the memory
+    backend supports it.
+    """
+    if overflow not in OVERFLOW_POLICIES:
+        raise ValueError(f"Unknown SIGNALS_OVERFLOW {overflow!r} (expected one of {', '.join(OVERFLOW_POLICIES)})")
+    if name == 'memory':
+        options = dict(capacity=capacity, overflow=overflow, max_bytes=max_bytes, spill_dir=spill_dir, ttl=ttl)
+        if wal_dir:
+            from signal_log import DurableSignalStore
+            return DurableSignalStore(directory=wal_dir, fsync_policy=wal_fsync, **options)
+        from signal_store import SignalStore
+        return SignalStore(**options)
+    if name in ('redis', 'shm') and max_bytes:
+        raise ValueError(f"MAX_SIGNALS_BYTES is only supported by the memory backend, not {name!r}")
+    if name in ('redis', 'shm') and ttl:
+        raise ValueError(f"Signal TTLs (SIGNAL_TTL_*) are only supported by the memory backend, not {name!r}")
+    if name == 'redis':
+        if overflow != 'drop-oldest':
+            raise ValueError(f"The redis backend only supports SIGNALS_OVERFLOW=drop-oldest, not {overflow!r}")
+        # Imported lazily so the redis package is only needed when used
+        from redis_backend import RedisBackend
+        return RedisBackend(capacity=capacity)
+    if name == 'shm':
+        if overflow == 'spill':
+            raise ValueError("The shm backend does not support SIGNALS_OVERFLOW=spill")
+        from shm_backend import SharedMemoryBackend
+        return SharedMemoryBackend(capacity=capacity, overflow=overflow)
+    raise ValueError(f"Unknown SIGNALS_BACKEND {name!r} (expected 'memory', 'redis' or 'shm')")
@@ -0,0 +1,49 @@
+"""
+Tests for webhook admission control (allowlist, proxy headers, rate limiting)
+Run with: python -m pytest test_admission.py
+"""
+import time
+
+import pytest
+
+from admission import TRADINGVIEW_IPS, RateLimiter, client_ip, parse_allowlist
+
+
+def test_allowlist_addresses_and_networks():
+    allowlist = parse_allowlist('tradingview, 10.0.0.0/8, 2001:db8::1')
+    assert all(allowlist.allows(ip) for ip in TRADINGVIEW_IPS)
+    assert allowlist.allows('10.20.30.40')
+    assert allowlist.allows('::ffff:52.89.214.238')
+    assert allowlist.allows('2001:DB8:0::1')
+    assert not allowlist.allows('52.89.214.239')
+    assert not allowlist.allows('not an address')
+    assert not allowlist.allows(None)
+
+    assert not parse_allowlist('')
+    with pytest.raises(ValueError):
+        parse_allowlist('52.89.214.238, example.com')
+
+
+def test_client_ip_trusts_only_the_configured_proxies():
+    # The client can put anything at the front; Render's proxy appends the real address
+    forwarded = '1.2.3.4, 52.89.214.238'
+    assert client_ip('10.0.0.1', forwarded, trusted_proxies=1) == '52.89.214.238'
+    assert client_ip('10.0.0.1', forwarded, trusted_proxies=2) == '1.2.3.4'
+    assert client_ip('10.0.0.1', forwarded, trusted_proxies=3) == '10.0.0.1'
+    assert client_ip('10.0.0.1', forwarded) == '10.0.0.1'
+
+
+def test_rate_limiter_refills_and_bounds_sources(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    limiter = RateLimiter(rate=2, burst=3, max_sources=2)
+
+    assert [limiter.take('a') for _ in range(3)] == [0, 0, 0]
+    assert limiter.take('a') == 0.5
+    now[0] += 0.5
+    assert limiter.take('a') == 0
+    assert limiter.take('b') == 0  # Sources have separate buckets
+
+    limiter.take('c')  # Evicts 'a', the least recently used
+    assert len(limiter) == 2
+    assert [limiter.take('a') for _ in range(3)] == [0, 0, 0]
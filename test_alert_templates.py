@@ -0,0 +1,55 @@
+"""
+Tests for plain-text alert templates
+Run with: python -m pytest test_alert_templates.py
+"""
+import pytest
+
+from alert_templates import AlertTemplates, load_templates
+
+
+def test_default_templates():
+    templates = AlertTemplates(load_templates())
+    assert templates.parse('BUY BTCUSDT at 45000') == {'action': 'BUY', 'symbol': 'BTCUSDT', 'price': 45000}
+    assert templates.parse(' sell  ETHUSDT @ 3000.5\n') == {'action': 'SELL', 'symbol': 'ETHUSDT', 'price': 3000.5}
+    assert templates.parse('buy 0.5 BINANCE:BTCUSDT AT 4.5e4') == {
+        'action': 'BUY', 'quantity': 0.5, 'symbol': 'BINANCE:BTCUSDT', 'price': 45000.0}
+    assert templates.parse('Price crossed the moving average') is None
+    assert templates.parse('BUY BTCUSDT at market') is None
+    assert templates.parse('BUY BTCUSDT') is None  # No two-word default
+
+
+def test_tradingview_placeholders():
+    templates = AlertTemplates(['{{strategy.order.action}} {{strategy.order.contracts}} {{ticker}} '
+                                '@ {{close}} ({{interval}})'])
+    assert templates.parse('sell 2 BTCUSDT @ 45000.5 (15)') == {
+        'action': 'SELL', 'quantity': 2, 'symbol': 'BTCUSDT', 'price': 45000.5, 'interval': '15'}
+
+
+def test_first_matching_template_wins_whatever_came_before():
+    templates = AlertTemplates(['{action} {symbol} at {price} tp {target}', '{action} {symbol} at {price}',
+                                '{action} {symbol} {note} at {price}'])
+    messages = ['BUY ETHUSDT soon at 2', 'BUY BTCUSDT at 1 tp 2', 'SELL SOLUSDT at 20']
+    results = [templates.parse(message) for message in messages]
+    # Same results in any order: nothing depends on which message came first
+    assert [templates.parse(message) for message in reversed(messages)] == results[::-1]
+    assert results[0] == {'action': 'BUY', 'symbol': 'ETHUSDT', 'note': 'soon', 'price': 2}
+    assert results[1] == {'action': 'BUY', 'symbol': 'BTCUSDT', 'price': 1, 'target': '2'}
+    assert results[2] == {'action': 'SELL', 'symbol': 'SOLUSDT', 'price': 20}
+
+
+def test_ordinary_text_is_not_a_signal():
+    templates = AlertTemplates(load_templates() + ['{action} {symbol}'])
+    assert templates.parse('Long squeeze!') is None
+    assert templates.parse('Exit now') is None
+    assert templates.parse('Buy the dip at 3') is None
+    assert templates.parse('EXIT ES1!') == {'action': 'EXIT', 'symbol': 'ES1!'}
+
+
+def test_load_templates(tmp_path):
+    path = tmp_path / 'templates.txt'
+    path.write_text('# comment\n\n{action} {symbol}\n')
+    assert load_templates('{symbol} at {price}', str(path)) == ['{symbol} at {price}', '{action} {symbol}']
+    assert load_templates('') == []
+    assert AlertTemplates([]).parse('BUY BTCUSDT') is None
+    with pytest.raises(ValueError):
+        AlertTemplates(['no placeholders'])
@@ -0,0 +1,214 @@
+"""
+Endpoint tests using Flask's test client (no running server needed)
+Run with: python -m pytest test_app.py
+"""
+import gzip
+import json
+import zlib
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def client():
+    app._store.clear()
+    app._latest.clear()
+    yield app.app.test_client()
+    app._store.clear()
+    app._latest.clear()
+
+
+def test_webhook_batch_json_array(client):
+    response = client.post('/webhook/batch', json=[{'symbol': 'BTCUSDT'}, {'symbol': 'ETHUSDT'}, None, 5])
+    body = response.json
+    assert response.status_code == 200
+    assert body['status'] == 'partial'
+    assert (body['received'], body['stored']) == (4, 3)
+    assert [r['status'] for r in body['results']] == ['stored', 'stored', 'error', 'stored']
+
+    signals = client.get('/signals?limit=10').json['signals']
+    assert [s.get('symbol') for s in signals] == [None, 'ETHUSDT', 'BTCUSDT']
+    assert signals[0]['data'] == 5
+    assert len({s['timestamp'] for s in signals}) == 1
+
+
+def test_webhook_batch_ndjson(client):
+    body = '{"symbol": "BTCUSDT"}\n\nnot json\n{"symbol": "ETHUSDT"}\n'
+    response = client.post('/webhook/batch', data=body, content_type='application/x-ndjson')
+    assert response.json['stored'] == 2
+    assert response.json['results'][1]['status'] == 'error'
+    assert app._store.snapshot()[0]['symbol'] == 'ETHUSDT'
+
+
+def test_webhook_batch_limits(client, monkeypatch):
+    assert client.post('/webhook/batch', data='').status_code == 400
+    monkeypatch.setattr(app, 'MAX_BATCH_SIZE', 2)
+    assert client.post('/webhook/batch', json=[{}, {}, {}]).status_code == 413
+
+
+def test_signals_body_served_from_cached_bytes(client):
+    signals = [{'symbol': 'BTCUSDT', 'price': 45000.5, 'note': 'café'}, {'symbol': 'ETHUSDT', 'qty': 1e-9}]
+    for signal in signals:
+        app.save_signal(signal)
+    response = client.get('/signals?limit=10')
+    with app.app.app_context():
+        expected = app.jsonify({'status': 'success', 'count': 2, 'signals': signals[::-1]}).get_data()
+    assert response.status_code == 200
+    assert response.mimetype == 'application/json'
+    assert response.get_data() == expected
+
+
+def test_signals_content_negotiation(client, monkeypatch):
+    monkeypatch.setattr(app, 'SIGNALS_COMPRESS_MIN_BYTES', 500)
+    client.post('/webhook/batch', json=[{'symbol': 'BTCUSDT', 'n': i} for i in range(40)])
+
+    response = client.get('/signals?limit=2', headers={'Accept': 'application/x-ndjson', 'Accept-Encoding': 'gzip'})
+    assert response.mimetype == 'application/x-ndjson'
+    assert 'Content-Encoding' not in response.headers  # Below the threshold
+    assert [json.loads(line)['n'] for line in response.get_data().splitlines()] == [39, 38]
+
+    response = client.get('/signals?limit=20', headers={'Accept': 'application/x-ndjson', 'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Vary'] == 'Accept, Accept-Encoding'
+    lines = gzip.decompress(response.get_data()).splitlines()
+    assert [json.loads(line)['n'] for line in lines] == list(range(37, 17, -1))
+
+    response = client.get('/signals?limit=10', headers={'Accept-Encoding': 'deflate'})
+    assert response.mimetype == 'application/json'
+    assert json.loads(zlib.decompress(response.get_data()))['count'] == 10
+
+    msgpack = pytest.importorskip('msgpack')
+    response = client.get('/signals?limit=5', headers={'Accept': 'application/msgpack, application/json;q=0.5'})
+    assert response.mimetype == 'application/msgpack'
+    body = msgpack.unpackb(response.get_data())
+    assert (body['count'], body['status'], [s['n'] for s in body['signals']]) == (5, 'success', [7, 6, 5, 4, 3])
+    # Anything else gets the JSON it always did
+    assert client.get('/signals?limit=5', headers={'Accept': 'text/html'}).json['count'] == 3
+
+
+def test_metrics_endpoint(client):
+    client.post('/webhook', json={'symbol': 'BTCUSDT'})
+    client.post('/webhook', json={'symbol': 'ETHUSDT'})
+    client.get('/signals?limit=1')
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    samples = dict(line.rsplit(' ', 1) for line in response.get_data(as_text=True).splitlines()
+                   if not line.startswith('#'))
+    assert samples['signals_queue_depth'] == '1'
+    assert float(samples['signals_oldest_age_seconds']) >= 0
+    for stage in ('parse', 'timestamp', 'store', 'pop', 'serialize'):
+        assert int(samples[f'signals_stage_duration_seconds_count{{stage="{stage}"}}']) >= 1
+    assert 'signals_stage_duration_seconds_bucket{stage="parse",le="+Inf"}' in samples
+    assert 'signals_dropped_total' in samples
+
+
+def test_webhook_deduplicates_idempotency_key(client, monkeypatch):
+    monkeypatch.setattr(app, '_dedup', app.DedupIndex(60, 100))
+    headers = {'Idempotency-Key': 'alert-1'}
+    first = client.post('/webhook', json={'symbol': 'BTCUSDT'}, headers=headers).json
+    second = client.post('/webhook', json={'symbol': 'BTCUSDT', 'retry': True}, headers=headers).json
+    assert first['status'] == 'success'
+    assert second['status'] == 'duplicate'
+    assert second['timestamp'] == first['timestamp']
+    # No header and no content hashing by default: identical bodies are both stored
+    client.post('/webhook', json={'symbol': 'BTCUSDT'})
+    client.post('/webhook', json={'symbol': 'BTCUSDT'})
+    assert len(app._store) == 3
+
+
+def test_webhook_deduplicates_key_field_and_content(client, monkeypatch):
+    monkeypatch.setattr(app, '_dedup', app.DedupIndex(60, 100))
+    monkeypatch.setattr(app, 'DEDUP_KEY_FIELD', 'alert_id')
+    monkeypatch.setattr(app, 'DEDUP_CONTENT_HASH', True)
+    assert client.post('/webhook', json={'alert_id': 7, 'price': 1}).json['status'] == 'success'
+    assert client.post('/webhook', json={'alert_id': 7, 'price': 2}).json['status'] == 'duplicate'
+    assert client.post('/webhook', data='BUY BTCUSDT').json['status'] == 'success'
+    assert client.post('/webhook', data='BUY BTCUSDT').json['status'] == 'duplicate'
+
+    body = client.post('/webhook/batch', json=[{'alert_id': 7}, {'alert_id': 8}, {'alert_id': 8}]).json
+    assert [r['status'] for r in body['results']] == ['duplicate', 'stored', 'duplicate']
+    assert (body['status'], body['stored'], body['duplicates']) == ('success', 1, 2)
+    assert len(app._store) == 3
+
+
+def test_overflow_reject_returns_429(client, monkeypatch):
+    monkeypatch.setattr(app, '_store', app.create_backend('memory', capacity=2, overflow='reject'))
+    monkeypatch.setattr(app, '_dedup', app.DedupIndex(60, 100))
+    assert client.post('/webhook/batch', json=[{'n': 0}, {'n': 1}]).status_code == 200
+    response = client.post('/webhook', json={'n': 2}, headers={'Idempotency-Key': 'a'})
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '1'
+    assert client.post('/webhook/batch', json=[{'n': 3}]).status_code == 429
+
+    client.get('/signals?limit=1')
+    # The refused signal's key was released, so its retry goes through
+    assert client.post('/webhook', json={'n': 2}, headers={'Idempotency-Key': 'a'}).status_code == 200
+    overflow = client.get('/health').json['overflow']
+    assert overflow == {'policy': 'reject', 'dropped': 0, 'rejected': 2, 'spilled': 0}
+
+
+def test_webhook_admission_control(client, monkeypatch):
+    monkeypatch.setattr(app, '_webhook_allowlist', app.parse_allowlist('tradingview'))
+    monkeypatch.setattr(app, 'WEBHOOK_TRUSTED_PROXIES', 1)
+    monkeypatch.setattr(app, '_webhook_secret', b's3cret')
+    monkeypatch.setattr(app, '_webhook_limiter', app.RateLimiter(rate=0.001, burst=2))
+    tradingview = {'X-Forwarded-For': '52.89.214.238'}
+    refused = {reason: counter.value for reason, counter in app._webhook_refused.items()}
+
+    assert client.post('/webhook?token=s3cret', json={'n': 0}, headers={'X-Forwarded-For': '6.6.6.6'}).status_code == 403
+    assert client.post('/webhook/batch?token=s3cret', json=[{'n': 0}]).status_code == 403  # Not behind the proxy
+    assert client.post('/webhook?token=guess', json={'n': 0}, headers=tradingview).status_code == 401
+    assert client.post('/webhook', json={'n': 1}, headers={**tradingview, 'X-Webhook-Token': 's3cret'}).status_code == 200
+    response = client.post('/webhook?token=s3cret', json={'n': 2}, headers=tradingview)
+    assert (response.status_code, response.headers['Retry-After']) == (429, '1000')
+    assert len(app._store) == 1
+
+    assert {reason: counter.value - refused[reason] for reason, counter in app._webhook_refused.items()} == {
+        'address': 2, 'token': 1, 'rate_limit': 1}
+
+
+def test_webhook_parses_text_alerts(client):
+    client.post('/webhook', data='SELL ETHUSDT at 3000.5', content_type='text/plain')
+    client.post('/webhook', data='Something happened', content_type='text/plain')
+    signals = client.get('/signals?limit=2').json['signals']
+    assert {k: signals[1][k] for k in ('action', 'symbol', 'price', 'message', 'raw')} == {
+        'action': 'SELL', 'symbol': 'ETHUSDT', 'price': 3000.5, 'message': 'SELL ETHUSDT at 3000.5', 'raw': True}
+    assert 'action' not in signals[0]
+
+
+def test_latest_signals_endpoint(client):
+    client.post('/webhook', json={'symbol': 'BTCUSDT', 'action': 'BUY', 'strategy': 'RSI'})
+    client.post('/webhook', json={'symbol': 'ETHUSDT', 'action': 'BUY'})
+    client.post('/webhook/batch', json=[{'symbol': 'BTCUSDT', 'action': 'SELL', 'strategy': 'MACD'}])
+
+    response = client.get('/signals/latest')
+    assert response.status_code == 200
+    signals = response.json['signals']
+    assert {symbol: s['action'] for symbol, s in signals.items()} == {'BTCUSDT': 'SELL', 'ETHUSDT': 'BUY'}
+    assert len(app._store) == 3  # Nothing consumed
+
+    by_strategy = client.get('/signals/latest?by=strategy&symbol=BTCUSDT').json
+    assert by_strategy['count'] == 2
+    assert by_strategy['signals']['BTCUSDT']['RSI']['action'] == 'BUY'
+    rsi = client.get('/signals/latest?strategy=RSI').json['signals']
+    assert rsi == {'BTCUSDT': {'RSI': by_strategy['signals']['BTCUSDT']['RSI']}}
+    assert client.get('/signals/latest?by=stance').status_code == 400
+
+
+def test_latest_signals_etag(client):
+    client.post('/webhook', json={'symbol': 'BTCUSDT', 'action': 'BUY'})
+    etag = client.get('/signals/latest').headers['ETag']
+    symbol_etag = client.get('/signals/latest?symbol=BTCUSDT').headers['ETag']
+
+    response = client.get('/signals/latest', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.get_data() == b''
+
+    client.post('/webhook', json={'symbol': 'ETHUSDT', 'action': 'SELL'})
+    assert client.get('/signals/latest', headers={'If-None-Match': etag}).status_code == 200
+    # Another symbol changed, this one didn't
+    assert client.get('/signals/latest?symbol=BTCUSDT', headers={'If-None-Match': symbol_etag}).status_code == 304
@@ -0,0 +1,184 @@
+"""
+Tests for the asyncio serving mode (same HTTP contract as the Flask app)
+Run with: python -m pytest test_async_server.py
+"""
+import asyncio
+import gzip
+import http.client
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+import app
+import async_server
+
+
+@pytest.fixture
+def server():
+    """Run the async server on a random local port in a background thread; yields the port"""
+    app._store.clear()
+    started = threading.Event()
+    port = []
+    loop = asyncio.new_event_loop()
+    stop = asyncio.Event()
+
+    def ready(bound_port):
+        port.append(bound_port)
+        started.set()
+
+    thread = threading.Thread(target=loop.run_until_complete,
+                              args=(async_server.serve('127.0.0.1', 0, ready=ready, stop=stop),), daemon=True)
+    thread.start()
+    assert started.wait(5)
+    yield port[0]
+    loop.call_soon_threadsafe(stop.set)
+    thread.join(5)
+    loop.close()
+    app._store.clear()
+
+
+def request(connection, method, path, body=None, headers=None):
+    connection.request(method, path, body, headers or {})
+    response = connection.getresponse()
+    data = response.read()
+    return response, json.loads(data) if data and response.getheader('Content-Type') == 'application/json' else data
+
+
+def test_webhook_signals_and_health(server):
+    connection = http.client.HTTPConnection('127.0.0.1', server)
+    response, body = request(connection, 'POST', '/webhook', json.dumps({'symbol': 'BTCUSDT', 'action': 'BUY'}),
+                             {'Content-Type': 'application/json'})
+    assert (response.status, body['status']) == (200, 'success')
+    response, body = request(connection, 'POST', '/webhook', 'SELL ETHUSDT at 2800.5')
+    assert body['status'] == 'success'
+
+    response, body = request(connection, 'GET', '/signals?limit=10')
+    assert body['count'] == 2
+    assert body['signals'][0] == {**body['signals'][0], 'action': 'SELL', 'symbol': 'ETHUSDT', 'price': 2800.5}
+    assert request(connection, 'GET', '/health')[1]['status'] == 'healthy'
+    assert request(connection, 'POST', '/webhook', b'')[0].status == 400
+    assert request(connection, 'GET', '/webhook')[0].status == 405
+    assert request(connection, 'GET', '/nope')[0].status == 404
+    assert b'signals_received_total' in request(connection, 'GET', '/metrics')[1]
+    connection.close()
+
+
+def test_signals_formats(server):
+    connection = http.client.HTTPConnection('127.0.0.1', server)
+    for i in range(30):
+        request(connection, 'POST', '/webhook', json.dumps({'symbol': 'BTCUSDT', 'n': i, 'padding': 'x' * 50}))
+    response, body = request(connection, 'GET', '/signals?limit=20',
+                             headers={'Accept': 'application/x-ndjson', 'Accept-Encoding': 'gzip'})
+    assert (response.getheader('Content-Type'), response.getheader('Content-Encoding')) == ('application/x-ndjson',
+                                                                                            'gzip')
+    assert [json.loads(line)['n'] for line in gzip.decompress(body).splitlines()] == list(range(29, 9, -1))
+    assert request(connection, 'GET', '/signals?limit=20')[1]['count'] == 10
+    connection.close()
+
+
+def test_long_poll_is_woken_by_a_webhook(server):
+    results = []
+
+    def poll():
+        connection = http.client.HTTPConnection('127.0.0.1', server)
+        started = time.perf_counter()
+        body = request(connection, 'GET', '/signals?wait=5&symbol=BTCUSDT')[1]
+        results.append((time.perf_counter() - started, body))
+        connection.close()
+
+    poller = threading.Thread(target=poll)
+    poller.start()
+    time.sleep(0.2)
+    producer = http.client.HTTPConnection('127.0.0.1', server)
+    request(producer, 'POST', '/webhook', json.dumps({'symbol': 'ETHUSDT'}))  # Doesn't match
+    request(producer, 'POST', '/webhook', json.dumps({'symbol': 'BTCUSDT'}))
+    poller.join(5)
+    producer.close()
+    elapsed, body = results[0]
+    assert body['count'] == 1
+    assert elapsed < 0.2 + async_server.ASYNC_RECHECK_INTERVAL  # Woken, not found by the recheck
+
+
+def test_consumer_group_and_ack(server):
+    connection = http.client.HTTPConnection('127.0.0.1', server)
+    assert request(connection, 'GET', '/signals?group=async-test&start=sideways')[0].status == 400
+    request(connection, 'GET', '/signals?group=async-test')
+    request(connection, 'POST', '/webhook', json.dumps({'symbol': 'BTCUSDT'}))
+    body = request(connection, 'GET', '/signals?group=async-test&wait=1')[1]
+    assert body['count'] == 1
+    ack = json.dumps({'group': 'async-test', 'lease_id': body['lease_id']})
+    assert request(connection, 'POST', '/signals/ack', ack)[1] == {'status': 'success', 'acked': 1}
+    assert request(connection, 'POST', '/signals/ack', ack)[0].status == 409
+    connection.close()
+
+
+def test_many_idle_connections_and_malformed_requests(server):
+    async def run():
+        idle = [await asyncio.open_connection('127.0.0.1', server) for _ in range(300)]
+        reader, writer = await asyncio.open_connection('127.0.0.1', server)
+        writer.write(b'POST /webhook HTTP/1.1\r\nContent-Length: 99999999\r\n\r\n')
+        assert (await reader.readline()).startswith(b'HTTP/1.1 413')
+        idle.append((reader, writer))
+        reader, writer = await asyncio.open_connection('127.0.0.1', server)
+        writer.write(b'nonsense\r\n\r\n')
+        assert (await reader.readline()).startswith(b'HTTP/1.1 400')
+        idle.append((reader, writer))
+        for raw, status in ((b'POST /webhook HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\nzz\r\n', b'400'),
+                            (b'GET /health HTTP/1.1\r\nX-Big: ' + b'x' * 100000 + b'\r\n\r\n', b'431'),
+                            (b'GET /' + b'x' * 100000 + b' HTTP/1.1\r\n\r\n', b'414')):
+            reader, writer = await asyncio.open_connection('127.0.0.1', server)
+            writer.write(raw)
+            assert (await reader.readline()).startswith(b'HTTP/1.1 ' + status)
+            idle.append((reader, writer))
+        # Chunked body, then Connection: close
+        reader, writer = await asyncio.open_connection('127.0.0.1', server)
+        writer.write(b'POST /webhook HTTP/1.1\r\nTransfer-Encoding: chunked\r\nConnection: close\r\n\r\n'
+                     b'5\r\n{"sym\r\n11\r\nbol": "SOLUSDT"}\r\n0\r\n\r\n')
+        response = await reader.read()
+        assert response.startswith(b'HTTP/1.1 200') and b'Connection: close' in response
+        idle.append((reader, writer))
+        for _, idle_writer in idle:
+            idle_writer.close()
+            await idle_writer.wait_closed()
+
+    asyncio.run(run())
+    assert app._store.snapshot()[0]['symbol'] == 'SOLUSDT'
+
+
+def test_webhook_refused_before_body_is_read(server, monkeypatch):
+    monkeypatch.setattr(app, '_webhook_secret', b's3cret')
+    with socket.create_connection(('127.0.0.1', server), timeout=5) as sock:
+        # Announces a body it never sends: the refusal must not wait for it
+        sock.sendall(b'POST /webhook?token=guess HTTP/1.1\r\nHost: x\r\nContent-Length: 1000000\r\n\r\n')
+        response = sock.makefile('rb').read()
+    assert response.startswith(b'HTTP/1.1 401 Unauthorized')
+    assert b'Connection: close' in response
+
+    connection = http.client.HTTPConnection('127.0.0.1', server)
+    assert request(connection, 'POST', '/webhook?token=s3cret', json.dumps({'n': 1}))[0].status == 200
+    connection.close()
+
+
+def test_blocking_store_calls_run_off_the_loop(server, monkeypatch):
+    receive_webhook = app.receive_webhook
+
+    def slow_receive_webhook(*args):
+        time.sleep(0.5)  # Like a WAL fsync or a Redis round trip
+        return receive_webhook(*args)
+
+    monkeypatch.setattr(async_server, 'STORE_BLOCKS', True)
+    monkeypatch.setattr(app, 'receive_webhook', slow_receive_webhook)
+    slow = threading.Thread(target=lambda: request(http.client.HTTPConnection('127.0.0.1', server), 'POST',
+                                                   '/webhook', json.dumps({'symbol': 'BTCUSDT'})))
+    slow.start()
+    time.sleep(0.1)
+    connection = http.client.HTTPConnection('127.0.0.1', server)
+    started = time.perf_counter()
+    assert request(connection, 'GET', '/metrics')[0].status == 200
+    assert time.perf_counter() - started < 0.3  # Not stuck behind the slow webhook
+    slow.join(5)
+    assert request(connection, 'GET', '/signals')[1]['count'] == 1
+    connection.close()
@@ -0,0 +1,162 @@
+"""
+Tests for consumer groups and lease/ack delivery
+Run with: python -m pytest test_consumer_groups.py
+"""
+import time
+from datetime import datetime
+
+import app
+from consumer_groups import ConsumerGroups, SignalFeed, feed_entry_size, timestamp_seconds
+from signal_codec import encode_signal
+from signal_expiry import SignalTTL
+
+
+def make_groups(retention=10, lease_seconds=30):
+    feed = SignalFeed(retention=retention)
+    return feed, ConsumerGroups(feed, lease_seconds=lease_seconds)
+
+
+def test_each_group_sees_every_signal():
+    feed, groups = make_groups()
+    a = groups.get('a', create=True)
+    b = groups.get('b', create=True)
+    for i in range(3):
+        feed.append({'n': i})
+
+    lease_a, entries_a, _ = a.fetch(10)
+    lease_b, entries_b, _ = b.fetch(2)
+    assert [seq for seq, _ in entries_a] == [1, 2, 3]
+    assert [s['n'] for _, s in entries_b] == [0, 1]
+    assert b.fetch(10)[1] == [(3, {'n': 2})]
+    assert a.fetch(10) == (None, [], 0)
+
+
+def test_latest_and_earliest_start():
+    feed, groups = make_groups()
+    feed.append({'n': 0})
+    assert groups.get('late', create=True).fetch(10)[1] == []
+    assert groups.get('early', create=True, start='earliest').fetch(10)[1] == [(1, {'n': 0})]
+
+
+def test_acked_lease_is_not_redelivered():
+    feed, groups = make_groups(lease_seconds=0.01)
+    group = groups.get('bot', create=True)
+    feed.append({'n': 0})
+
+    lease, _, _ = group.fetch(10)
+    assert group.ack(lease.id) == 1
+    time.sleep(0.02)
+    assert group.fetch(10)[1] == []
+    assert group.ack(lease.id) is None
+
+
+def test_expired_signals_are_skipped(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    feed = SignalFeed(retention=10, ttl=SignalTTL(field='ttl'))
+    group = ConsumerGroups(feed).get('bot', create=True)
+    feed.append_many([{'n': 0, 'ttl': 5}, {'n': 1}])
+    now[0] += 5
+    assert group.fetch(10)[1:] == ([(2, {'n': 1})], 1)
+
+
+def test_expired_lease_is_redelivered():
+    feed, groups = make_groups(lease_seconds=0.01)
+    group = groups.get('bot', create=True)
+    feed.append({'n': 0})
+
+    lease, _, _ = group.fetch(10)
+    time.sleep(0.02)
+    redelivered, entries, _ = group.fetch(10)
+    assert entries == [(1, {'n': 0})]
+    assert group.ack(lease.id) is None
+    assert group.ack(redelivered.id) == 1
+
+
+def test_lagging_group_reports_skipped():
+    feed, groups = make_groups(retention=3)
+    group = groups.get('slow', create=True)
+    for i in range(5):
+        feed.append({'n': i})
+
+    _, entries, skipped = group.fetch(10)
+    assert [seq for seq, _ in entries] == [3, 4, 5]
+    assert skipped == 2
+
+
+def test_feed_memory_budget_ages_out_oldest():
+    size = feed_entry_size(encode_signal({'n': 0}))
+    feed = SignalFeed(retention=100, max_bytes=size * 3)
+    groups = ConsumerGroups(feed)
+    group = groups.get('a', create=True, start='earliest')
+    for i in range(5):
+        feed.append({'n': i})
+
+    assert (feed.first_seq, feed.get(2), feed.get(3)) == (3, None, {'n': 2})
+    lease, entries, skipped = group.fetch(10)
+    assert ([s['n'] for _, s in entries], skipped) == ([2, 3, 4], 2)
+    feed.append_many([{'n': 5}, {'n': 6}])
+    assert feed.first_seq == 5 and feed._bytes == size * 3
+
+
+def test_max_groups():
+    feed = SignalFeed(retention=10)
+    groups = ConsumerGroups(feed, max_groups=1)
+    assert groups.get('a', create=True) is not None
+    assert groups.get('b', create=True) is None
+
+
+def test_group_endpoints():
+    client = app.app.test_client()
+    response = client.get('/signals?group=test-endpoints')
+    assert response.json['count'] == 0
+
+    client.post('/webhook', json={'symbol': 'BTCUSDT', 'action': 'BUY'})
+    response = client.get('/signals?group=test-endpoints&limit=5')
+    body = response.json
+    assert body['count'] == 1
+    assert body['signals'][0]['symbol'] == 'BTCUSDT'
+    assert isinstance(body['signals'][0]['seq'], int)
+
+    ack = client.post('/signals/ack', json={'group': 'test-endpoints', 'lease_id': body['lease_id']})
+    assert ack.status_code == 200 and ack.json['acked'] == 1
+    again = client.post('/signals/ack', json={'group': 'test-endpoints', 'lease_id': body['lease_id']})
+    assert again.status_code == 409
+    # The destructive queue is independent of groups
+    assert app.pop_signals(10)[0]['symbol'] == 'BTCUSDT'
+
+
+def minute(m):
+    return datetime(2026, 10, 17, 12, m)
+
+
+def test_feed_time_range():
+    feed = SignalFeed(retention=5)
+    for m in range(8):
+        feed.append({'n': m, 'timestamp': minute(m).isoformat()})
+    feed.append_many([{'n': 8, 'timestamp': minute(8).isoformat()}, {'n': 9}])  # No timestamp: filed with n=8
+
+    assert feed.seq_range() == (6, 10)
+    assert feed.seq_range(since=timestamp_seconds(minute(7))) == (8, 10)
+    assert feed.seq_range(timestamp_seconds(minute(6)), timestamp_seconds(minute(8))) == (7, 8)
+    first, last = feed.seq_range(since=timestamp_seconds(minute(30)))
+    assert first > last
+    # Aged-out minutes are simply not there
+    assert feed.seq_range(until=timestamp_seconds(minute(2))) == (6, 5)
+
+
+def test_history_endpoint(monkeypatch):
+    monkeypatch.setattr(app, '_feed', SignalFeed(retention=10))
+    for m, symbol in enumerate(['BTCUSDT', 'ETHUSDT', 'BTCUSDT', 'BTCUSDT']):
+        app.save_signal({'symbol': symbol, 'timestamp': minute(m).isoformat()})
+    app._store.clear()
+    client = app.app.test_client()
+
+    body = client.get(f'/signals/history?since={minute(1).isoformat()}&symbol=BTCUSDT').json
+    assert body['count'] == 2
+    assert [s['seq'] for s in body['signals']] == [3, 4]
+    until = minute(2).timestamp()  # Unix seconds work too
+    assert [s['seq'] for s in client.get(f'/signals/history?until={until}').json['signals']] == [1, 2]
+    monkeypatch.setattr(app, 'HISTORY_PAGE_SIZE', 1)
+    assert client.get('/signals/history?limit=3').json['count'] == 3
+    assert client.get('/signals/history?since=yesterday').status_code == 400
@@ -0,0 +1,40 @@
+"""
+Tests for the webhook deduplication index
+Run with: python -m pytest test_dedup.py
+"""
+import time
+
+from dedup import DedupIndex, digest
+
+
+def test_claim_returns_first_value_until_window_expires(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    index = DedupIndex(window_seconds=60, max_keys=10)
+
+    assert index.claim(digest('a'), 'first') is None
+    assert index.claim(digest('a'), 'second') == 'first'
+    now[0] += 61
+    assert index.claim(digest('a'), 'third') is None
+    assert len(index) == 1
+
+
+def test_expired_and_excess_keys_are_evicted(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    index = DedupIndex(window_seconds=60, max_keys=3)
+    for key in 'abcd':
+        index.claim(key)
+    assert len(index) == 3
+    assert index.claim('a') is None  # Evicted as the oldest when 'd' arrived
+
+    now[0] += 61
+    index.claim('e')
+    assert len(index) == 1
+
+
+def test_release_forgets_key():
+    index = DedupIndex()
+    index.claim('a')
+    index.release('a')
+    assert index.claim('a') is None
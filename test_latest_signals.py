@@ -0,0 +1,81 @@
+"""
+Tests for the latest-signal-per-symbol snapshot
+Run with: python -m pytest test_latest_signals.py
+"""
+import json
+
+from latest_signals import LatestSignals
+from signal_codec import encode_signal
+
+
+def update(latest, **signal):
+    latest.update(signal, encode_signal(signal))
+
+
+def test_latest_per_symbol_and_strategy():
+    latest = LatestSignals()
+    update(latest, symbol='BTCUSDT', action='BUY', strategy='RSI')
+    update(latest, symbol='ETHUSDT', action='SELL')
+    update(latest, symbol='BTCUSDT', action='SELL', strategy='MACD')
+    update(latest, message='BUY BTCUSDT', raw=True)  # No symbol: not tracked
+
+    body = json.loads(latest.view()[1])
+    assert body['count'] == 2
+    assert body['signals']['BTCUSDT']['action'] == 'SELL'
+    assert body['signals']['ETHUSDT']['action'] == 'SELL'
+
+    body = json.loads(latest.view(by_strategy=True)[1])
+    assert body['count'] == 2
+    assert sorted(body['signals']['BTCUSDT']) == ['MACD', 'RSI']
+    assert 'ETHUSDT' not in body['signals']
+
+    body = json.loads(latest.view(symbol='BTCUSDT', strategy='RSI')[1])
+    assert body['signals'] == {'BTCUSDT': {'RSI': {'symbol': 'BTCUSDT', 'action': 'BUY', 'strategy': 'RSI'}}}
+    assert json.loads(latest.view(symbol='SOLUSDT')[1])['count'] == 0
+
+
+def test_view_versions_change_only_with_their_content():
+    latest = LatestSignals()
+    update(latest, symbol='BTCUSDT', strategy='RSI')
+    btc = latest.view_version(symbol='BTCUSDT')
+    everything = latest.view_version()
+    rsi = latest.view_version(by_strategy=True, strategy='RSI')
+
+    update(latest, symbol='ETHUSDT', strategy='MACD')
+    assert latest.view_version(symbol='BTCUSDT') == btc
+    assert latest.view_version(by_strategy=True, strategy='RSI') == rsi
+    assert latest.view_version() != everything
+    assert latest.view()[0] == latest.view_version()
+
+
+def test_unfiltered_body_is_cached_until_the_next_update():
+    latest = LatestSignals()
+    update(latest, symbol='BTCUSDT')
+    first = latest.view()
+    assert latest.view()[1] is first[1]
+    update(latest, symbol='BTCUSDT', price=1)
+    assert latest.view() != first
+    assert latest.etag(first[0]) != latest.etag(latest.view()[0])
+
+
+def test_least_recently_updated_symbols_and_strategies_are_evicted():
+    latest = LatestSignals(max_symbols=2, max_strategies=2)
+    update(latest, symbol='BTCUSDT', strategy='RSI')
+    update(latest, symbol='ETHUSDT', strategy='RSI')
+    update(latest, symbol='BTCUSDT', strategy='MACD')  # BTCUSDT is now the most recent
+    eth = latest.etag(latest.view_version(symbol='ETHUSDT'))
+    rsi = latest.view_version(by_strategy=True, strategy='RSI')
+    everything = latest.etag(latest.view_version())
+
+    update(latest, symbol='SOLUSDT')
+    assert len(latest) == 2
+    assert sorted(json.loads(latest.view()[1])['signals']) == ['BTCUSDT', 'SOLUSDT']
+    assert latest.etag(latest.view_version(symbol='ETHUSDT')) != eth
+    assert latest.etag(latest.view_version()) != everything
+    assert latest.view_version(by_strategy=True, strategy='RSI') != rsi  # It lost ETHUSDT
+    assert list(json.loads(latest.view(strategy='RSI')[1])['signals']) == ['BTCUSDT']
+
+    update(latest, symbol='BTCUSDT', strategy='EMA')  # Past max_strategies: RSI goes
+    assert sorted(json.loads(latest.view(by_strategy=True)[1])['signals']['BTCUSDT']) == ['EMA', 'MACD']
+    assert latest.view_version(by_strategy=True, strategy='RSI') == 0
+    assert latest._strategies.keys() == {'MACD', 'EMA'}
@@ -0,0 +1,56 @@
+"""
+Tests for the /metrics primitives
+Run with: python -m pytest test_metrics.py
+"""
+import threading
+import time
+
+from metrics import ContentionTimedLock, Registry
+from signal_store import SignalStore
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    histogram = registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0), stage='parse')
+    registry.counter('requests', 'Requests').inc(3)
+    for seconds in (0.05, 0.5, 0.5, 2.0):
+        histogram.observe(seconds)
+
+    assert registry.render().splitlines() == [
+        '# HELP latency_seconds Latency',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{stage="parse",le="0.1"} 1',
+        'latency_seconds_bucket{stage="parse",le="1.0"} 3',
+        'latency_seconds_bucket{stage="parse",le="+Inf"} 4',
+        'latency_seconds_sum{stage="parse"} 3.05',
+        'latency_seconds_count{stage="parse"} 4',
+        '# HELP requests Requests',
+        '# TYPE requests counter',
+        'requests_total 3',
+    ]
+
+
+def test_contended_lock_wait_is_observed():
+    lock = ContentionTimedLock()
+    waits = []
+    lock.on_wait = waits.append
+    with lock:
+        pass
+    assert waits == []
+
+    lock.acquire()
+    thread = threading.Thread(target=lambda: lock.__enter__() and lock.__exit__())
+    thread.start()
+    time.sleep(0.05)
+    lock.release()
+    thread.join()
+    assert len(waits) == 1 and waits[0] >= 0.04
+
+
+def test_store_counts_drops_and_oldest_age():
+    store = SignalStore(capacity=2)
+    assert store.oldest_age() is None
+    for i in range(5):
+        store.push({'n': i})
+    assert store.dropped == 3
+    assert 0 <= store.oldest_age() < 1
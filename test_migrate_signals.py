@@ -0,0 +1,156 @@
+"""
+Tests for the streaming migration/export tool
+Run with: python -m pytest test_migrate_signals.py
+"""
+import json
+import tracemalloc
+
+import pytest
+
+import migrate_signals
+from migrate_signals import JSONFile, MigrationError, NDJSONFile, RedisList, StoreLog, Stats, migrate
+from signal_log import DurableSignalStore
+
+SIGNALS = [{'symbol': 'BTCUSDT', 'action': 'BUY', 'n': i, 'note': 'ünïcode' if i % 7 == 0 else 'x'}
+           for i in reversed(range(25))]  # Most recent first
+
+
+@pytest.fixture
+def redis_client():
+    fakeredis = pytest.importorskip('fakeredis')
+    return fakeredis.FakeRedis()
+
+
+def run(source, destination, tmp_path, **options):
+    options.setdefault('chunk_size', 4)
+    options.setdefault('progress_interval', None)
+    return migrate(source, destination, checkpoint_path=str(tmp_path / 'checkpoint'), **options)
+
+
+def write_json(path, signals, indent=None):
+    with open(path, 'w') as f:
+        json.dump(signals, f, indent=indent)
+
+
+def read_ndjson(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_round_trip_through_every_format(tmp_path, redis_client):
+    write_json(tmp_path / 'in.json', SIGNALS, indent=2)
+    redis_list = RedisList(redis_client, 'signals:list')
+    store = StoreLog(str(tmp_path / 'wal'))
+
+    assert run(JSONFile(str(tmp_path / 'in.json')), NDJSONFile(str(tmp_path / 'a.ndjson')), tmp_path) == 25
+    assert read_ndjson(tmp_path / 'a.ndjson') == SIGNALS
+    run(NDJSONFile(str(tmp_path / 'a.ndjson')), redis_list, tmp_path)
+    assert [json.loads(raw) for raw in redis_client.lrange('signals:list', 0, -1)] == SIGNALS
+    run(redis_list, store, tmp_path)
+    run(store, JSONFile(str(tmp_path / 'out.json')), tmp_path)
+
+    with open(tmp_path / 'out.json') as f:
+        assert json.load(f) == SIGNALS
+    # The app's durable store starts from the migrated snapshot
+    restored = DurableSignalStore(capacity=100, directory=str(tmp_path / 'wal'))
+    assert restored.snapshot() == SIGNALS
+    assert restored.push({'n': 25}) == 26
+    restored.close()
+    assert not (tmp_path / 'checkpoint').exists()
+
+
+def test_json_parsing_is_incremental(tmp_path):
+    path = tmp_path / 'signals.json'
+    with open(path, 'w') as f:
+        f.write(' [\n' + ',\n'.join(json.dumps(s, indent=1) for s in SIGNALS[:10]) + ', 42, "text", \n'
+                + ','.join(json.dumps(s) for s in SIGNALS[10:]) + '\n]\n')
+    for read_size in (1, 3, 64, 1 << 20):
+        stats = Stats()
+        assert [json.loads(e) for e in JSONFile(str(path)).records(None, stats, read_size=read_size)] == SIGNALS
+        assert stats.skipped == 2
+
+    source = JSONFile(str(path))
+    records = source.records(None, Stats(), read_size=16)
+    first = [next(records) for _ in range(12)]
+    rest = list(JSONFile(str(path)).records(None, Stats(), position=source.position, read_size=16))
+    assert [json.loads(e) for e in first + rest] == SIGNALS
+
+    with open(path, 'w') as f:
+        f.write('[{"n": 1}, {"n": 2')
+    with pytest.raises(MigrationError):
+        list(JSONFile(str(path)).records(None, Stats()))
+
+
+def test_resume_after_interruption(tmp_path, redis_client, monkeypatch):
+    write_json(tmp_path / 'in.json', SIGNALS)
+    destination = RedisList(redis_client, 'signals:list')
+    write = RedisList.write
+    calls = []
+
+    def failing_write(self, chunk, order, written):
+        calls.append(len(chunk))
+        write(self, chunk, order, written)
+        if len(calls) == 3:
+            raise ConnectionError('connection lost')  # After Redis took the chunk, before the checkpoint
+
+    monkeypatch.setattr(RedisList, 'write', failing_write)
+    with pytest.raises(ConnectionError):
+        run(JSONFile(str(tmp_path / 'in.json')), destination, tmp_path)
+    assert not redis_client.exists('signals:list')  # Nothing visible until it completes
+    monkeypatch.setattr(RedisList, 'write', write)
+
+    assert run(JSONFile(str(tmp_path / 'in.json')), destination, tmp_path) == 25
+    assert [json.loads(raw) for raw in redis_client.lrange('signals:list', 0, -1)] == SIGNALS
+    assert redis_client.keys('signals:list:*') == []
+
+
+def test_resume_file_export(tmp_path, monkeypatch):
+    write_json(tmp_path / 'in.json', SIGNALS)
+    write = NDJSONFile.write
+
+    def failing_write(self, chunk, order, written):
+        write(self, chunk, order, written)
+        if written == 8:
+            self._file.write(b'{"torn')  # Written past the checkpoint, then the process died
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(NDJSONFile, 'write', failing_write)
+    with pytest.raises(KeyboardInterrupt):
+        run(JSONFile(str(tmp_path / 'in.json')), NDJSONFile(str(tmp_path / 'out.ndjson')), tmp_path)
+    monkeypatch.setattr(NDJSONFile, 'write', write)
+    assert not (tmp_path / 'out.ndjson').exists()
+
+    run(JSONFile(str(tmp_path / 'in.json')), NDJSONFile(str(tmp_path / 'out.ndjson')), tmp_path)
+    assert read_ndjson(tmp_path / 'out.ndjson') == SIGNALS
+
+
+def test_existing_destination(tmp_path, redis_client, capsys):
+    write_json(tmp_path / 'in.json', SIGNALS)
+    redis_client.lpush('signals:list', b'{"old":true}')
+    with pytest.raises(MigrationError, match='--if-exists replace'):
+        run(JSONFile(str(tmp_path / 'in.json')), RedisList(redis_client, 'signals:list'), tmp_path)
+    run(JSONFile(str(tmp_path / 'in.json')), RedisList(redis_client, 'signals:list'), tmp_path, if_exists='replace')
+    assert redis_client.llen('signals:list') == 25
+
+    checkpoint = tmp_path / 'checkpoint'
+    checkpoint.write_text(json.dumps({'source': 'json:a.json', 'destination': 'redis'}))
+    assert migrate_signals.main([str(tmp_path / 'in.json'), str(tmp_path / 'out.json'),
+                                 '--checkpoint', str(checkpoint)]) == 1
+    assert 'is from migrating json:a.json' in capsys.readouterr().err
+    assert migrate_signals.main([str(tmp_path / 'in.json'), str(tmp_path / 'out.json'), '--checkpoint',
+                                 str(checkpoint), '--restart']) == 0
+    assert 'Migrated 25 signals' in capsys.readouterr().err
+
+
+def test_memory_stays_flat(tmp_path):
+    path = tmp_path / 'big.ndjson'
+    with open(path, 'w') as f:
+        for i in range(50000):
+            f.write(json.dumps({'symbol': 'BTCUSDT', 'action': 'BUY', 'price': 45000.5 + i, 'n': i}) + '\n')
+    size = path.stat().st_size
+
+    tracemalloc.start()
+    run(NDJSONFile(str(path)), StoreLog(str(tmp_path / 'wal')), tmp_path, chunk_size=500)  # Reversed via the spool
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert peak < size / 10
@@ -0,0 +1,227 @@
+"""
+Tests for outbound push delivery, against a local stand-in receiver
+Run with: python -m pytest test_push_delivery.py -s  (-s prints the throughput/latency report)
+"""
+import json
+import os
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import app
+import push_delivery
+from push_delivery import PushDispatcher
+from signal_codec import encode_signal
+from signal_expiry import SignalTTL
+
+
+class Receiver(ThreadingHTTPServer):
+    """Keep-alive HTTP server recording every batch POSTed to it"""
+
+    daemon_threads = True
+
+    def __init__(self, statuses=()):
+        self.statuses = list(statuses)  # Status for each request in turn, then 200
+        self.batches = []  # (received at, idempotency key, signals)
+        self.connections = 0
+        self.lock = threading.Lock()
+        super().__init__(('127.0.0.1', 0), ReceiverHandler)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_port}/hook'
+
+    def signals(self):
+        return [signal for _, _, batch in self.batches for signal in batch]
+
+
+class ReceiverHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        with self.server.lock:
+            status = self.server.statuses.pop(0) if self.server.statuses else 200
+            if status == 200:
+                self.server.batches.append((time.perf_counter(), self.headers['Idempotency-Key'], json.loads(body)))
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def receiver():
+    servers = []
+
+    def make(statuses=()):
+        servers.append(Receiver(statuses))
+        return servers[-1]
+
+    yield make
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def publish(dispatcher, signals):
+    dispatcher.publish([(signal, encode_signal(signal)) for signal in signals])
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.005)
+
+
+def test_delivery_throughput_and_latency(receiver):
+    server = receiver()
+    dispatcher = PushDispatcher(workers=2, batch_size=50, batch_delay=0.002)
+    dispatcher.register(server.url)
+    count = 2000
+    started = time.perf_counter()
+    for i in range(count):
+        publish(dispatcher, [{'symbol': 'BTCUSDT', 'n': i, 'sent_at': time.perf_counter()}])
+        if i % 50 == 0:
+            time.sleep(0.001)  # Bursts, as alerts arrive
+    wait_for(lambda: dispatcher.delivered == count)
+    elapsed = time.perf_counter() - started
+    dispatcher.close()
+
+    assert [s['n'] for s in server.signals()] == list(range(count))  # In order, exactly once
+    assert server.connections == 1  # One keep-alive connection
+    assert len(server.batches) < count / 5  # Batched
+    latencies = sorted(received - s['sent_at'] for received, _, batch in server.batches for s in batch)
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f'\npush delivery: {count / elapsed:.0f} signals/s in {len(server.batches)} batches, '
+          f'p50={p50:.2f}ms p99={p99:.2f}ms max={latencies[-1] * 1000:.2f}ms')
+    assert p99 < 1000
+
+
+def test_retry_keeps_the_idempotency_key(receiver):
+    server = receiver(statuses=[503, 500])
+    dispatcher = PushDispatcher(backoff=0.01)
+    destination = dispatcher.register(server.url)
+    publish(dispatcher, [{'symbol': 'BTCUSDT'}])
+    wait_for(lambda: dispatcher.delivered == 1)
+    dispatcher.close()
+
+    assert dispatcher.retries == 2
+    assert [key for _, key, _ in server.batches] == [f'{dispatcher.instance}-{destination.id}-1']
+    assert destination.info()['last_error'] == 'HTTP 500'
+
+
+def test_idempotency_keys_are_unique_across_processes():
+    dispatchers = [PushDispatcher(), PushDispatcher()]
+    keys = [dispatcher._batch_key(dispatcher.register('http://127.0.0.1/hook')) for dispatcher in dispatchers]
+    assert keys[0] != keys[1]  # Both are d1's first batch, e.g. in two workers or before and after a restart
+
+    dispatcher = dispatchers[0]
+    destination = dispatcher.get('d1')
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:  # Child: a worker forked from a preloaded app
+        os.write(write, dispatcher._batch_key(destination).encode())
+        os._exit(0)
+    os.close(write)
+    os.waitpid(pid, 0)
+    with os.fdopen(read) as pipe:
+        child_key = pipe.read()
+    parent_key = dispatcher._batch_key(destination)
+    assert child_key.endswith('-d1-2') and parent_key.endswith('-d1-2')
+    assert child_key != parent_key
+
+
+def test_failed_batches_are_dead_lettered_and_requeued(receiver):
+    server = receiver(statuses=[400, 503, 503])
+    dispatcher = PushDispatcher(max_retries=1, backoff=0.01)
+    destination = dispatcher.register(server.url)
+    publish(dispatcher, [{'n': 1}])
+    wait_for(lambda: len(dispatcher.dead_letters) == 1)  # 4xx: not retried
+    publish(dispatcher, [{'n': 2}])
+    wait_for(lambda: len(dispatcher.dead_letters) == 2)  # 503 twice: out of retries
+    assert dispatcher.dead_letters[1]['error'] == 'HTTP 503'
+    assert destination.dead_lettered == 2
+
+    assert dispatcher.requeue_dead_letters() == 2
+    wait_for(lambda: dispatcher.delivered == 2)
+    dispatcher.close()
+    assert [s['n'] for s in server.signals()] == [1, 2]
+
+
+def test_expired_signals_are_not_pushed_retried_or_requeued(receiver, monkeypatch):
+    monkeypatch.setattr(push_delivery.random, 'uniform', lambda low, high: high)  # Backoff exactly 0.3s
+    server = receiver(statuses=[503, 503, 400])
+    dispatcher = PushDispatcher(max_retries=1, backoff=0.3, ttl=SignalTTL(field='ttl'))
+    destination = dispatcher.register(server.url)
+    publish(dispatcher, [{'n': 1, 'ttl': 1, 'timestamp': '2020-01-01T00:00:00'}])  # Expired on arrival
+    publish(dispatcher, [{'n': 2, 'ttl': 0.1}, {'n': 3}])
+    wait_for(lambda: len(dispatcher.dead_letters) == 1)  # 503, then the retry without n=2 gets 503 too
+    publish(dispatcher, [{'n': 4, 'ttl': 0.1}, {'n': 5}])
+    wait_for(lambda: len(dispatcher.dead_letters) == 2)  # 400
+    time.sleep(0.15)
+
+    assert [data for data, _ in dispatcher.dead_letters[0]['signals']] == [encode_signal({'n': 3})]
+    assert dispatcher.requeue_dead_letters() == 2  # Not n=4, which expired in the dead-letter queue
+    wait_for(lambda: dispatcher.delivered == 2)
+    dispatcher.close()
+    assert [s['n'] for s in server.signals()] == [3, 5]
+    assert dispatcher.expired == destination.expired == 3
+    assert destination.info()['expired'] == 3
+    assert dispatcher.retries == 1
+
+
+def test_unreachable_destination_does_not_block_others(receiver):
+    server = receiver()
+    dispatcher = PushDispatcher(workers=1, max_retries=100, backoff=0.05, queue_size=3)
+    dead = dispatcher.register('http://127.0.0.1:9/hook')
+    live = dispatcher.register(server.url, symbol='BTCUSDT')
+    for i in range(5):
+        publish(dispatcher, [{'symbol': 'BTCUSDT', 'n': i}, {'symbol': 'ETHUSDT'}])
+        wait_for(lambda: live.delivered == i + 1)
+    dispatcher.close()
+
+    assert [s['n'] for s in server.signals()] == list(range(5))
+    assert dead.delivered == 0
+    assert dead.dropped > 0  # Its queue of 3 overflowed while it was retrying
+
+
+def test_destination_endpoints(receiver, monkeypatch):
+    server = receiver()
+    client = app.app.test_client()
+    assert client.post('/destinations', json={'url': server.url}).status_code == 403
+
+    monkeypatch.setattr(app, 'PUSH_REGISTRATION_TOKEN', 'secret')
+    monkeypatch.setattr(app, '_push', PushDispatcher(batch_delay=0))
+    auth = {'Authorization': 'Bearer secret'}
+    assert client.post('/destinations', json={'url': server.url}).status_code == 401
+    assert client.post('/destinations', json={'url': 'ftp://x'}, headers=auth).status_code == 400
+    response = client.post('/destinations', json={'url': server.url, 'symbol': 'BTCUSDT'}, headers=auth)
+    assert response.status_code == 201
+    destination_id = response.json['destination']['id']
+
+    client.post('/webhook', json={'symbol': 'BTCUSDT', 'action': 'BUY'})
+    client.post('/webhook/batch', json=[{'symbol': 'ETHUSDT'}, {'symbol': 'BTCUSDT', 'action': 'SELL'}])
+    wait_for(lambda: app._push.delivered == 2)
+    assert [s['action'] for s in server.signals()] == ['BUY', 'SELL']
+    listed = client.get('/destinations', headers=auth).json['destinations']
+    assert listed[0]['delivered'] == 2
+    assert client.get('/destinations/dead-letters', headers=auth).json['count'] == 0
+
+    assert client.delete(f'/destinations/{destination_id}', headers=auth).status_code == 200
+    assert client.delete(f'/destinations/{destination_id}', headers=auth).status_code == 404
+    app._push.close()
+    app._store.clear()
@@ -3,7 +3,7 @@ Test script to send sample trading signals to the webhook endpoint.
 This populates the in-memory storage with test data.
 
 Usage:
-    python test_send_signals.py
+    python test_send_signals.py [URL] [--batch]
 """
 
 import requests
@@ -168,6 +168,31 @@ def send_all_signals(signals, delay=0.5):
         print(f"   curl http://localhost:5000/signals?limit={success_count}")
 
 
+def send_signals_batch(signals):
+    """
+    Send multiple signals in one request to the batch endpoint
+    
+    Args:
+        signals: List of signal dictionaries
+    """
+    batch_url = WEBHOOK_URL.rstrip("/") + "/batch"
+    print(f"Sending {len(signals)} signals to {batch_url}")
+    try:
+        response = requests.post(batch_url, json=signals, timeout=10)
+        result = response.json()
+        if response.status_code == 200:
+            print(f"✅ Stored {result.get('stored')}/{result.get('received')} signals")
+            for item in result.get("results", []):
+                if item["status"] != "stored":
+                    print(f"   ❌ Signal {item['index']}: {item.get('error')}")
+            return result.get("stored", 0)
+        print(f"❌ Failed: {result.get('error', 'Unknown error')}")
+        return 0
+    except requests.exceptions.RequestException as e:
+        print(f"❌ Error: {e}")
+        return 0
+
+
 def send_single_signal(action, symbol, price, quantity, strategy="TestStrategy"):
     """
     Convenience function to send a single custom signal
@@ -192,13 +217,20 @@ def send_single_signal(action, symbol, price, quantity, strategy="TestStrategy")
 if __name__ == "__main__":
     import sys
     
+    # Send everything in one request with --batch
+    use_batch = "--batch" in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg != "--batch"]
+    
     # Check if custom URL provided
-    if len(sys.argv) > 1:
-        WEBHOOK_URL = sys.argv[1]
+    if args:
+        WEBHOOK_URL = args[0]
         print(f"Using custom URL: {WEBHOOK_URL}\n")
     
     # Send all sample signals
-    send_all_signals(SAMPLE_SIGNALS, delay=0.3)
+    if use_batch:
+        send_signals_batch(SAMPLE_SIGNALS)
+    else:
+        send_all_signals(SAMPLE_SIGNALS, delay=0.3)
     
     # Example: Send a custom signal
     # print("\n" + "=" * 60)
@@ -0,0 +1,96 @@
+"""
+Tests for the shared-memory backend, including several worker processes
+sharing one queue
+Run with: python -m pytest test_shm_backend.py
+"""
+import multiprocessing
+import os
+import uuid
+
+import pytest
+
+from shm_backend import SharedMemoryBackend
+
+WORKERS = 4
+SIGNALS_PER_WORKER = 500
+
+
+@pytest.fixture
+def make_backend():
+    name = f'test_signals_{uuid.uuid4().hex[:12]}'
+    backends = []
+
+    def make(capacity, **kwargs):
+        backend = SharedMemoryBackend(capacity=capacity, shm_name=name, **kwargs)
+        backends.append(backend)
+        return backend
+
+    yield make
+    backends[0].unlink()
+    for backend in backends:
+        backend.close()
+    os.remove(backends[0].lock_path)
+
+
+def worker(shm_name, capacity, worker_id, results):
+    """Push this worker's signals while popping whatever any worker pushed"""
+    backend = SharedMemoryBackend(capacity=capacity, shm_name=shm_name)
+    popped = []
+    for i in range(SIGNALS_PER_WORKER):
+        backend.push({'symbol': f'SYM{i % 3}', 'worker': worker_id, 'n': i})
+        if i % 2:
+            # Mix unfiltered and filtered pops so both removal paths race
+            popped.extend(backend.pop(3, symbol='SYM1' if i % 4 == 1 else None))
+    results.put(popped)
+    backend.close()
+
+
+def test_workers_share_queue_without_loss_or_duplicates(make_backend):
+    capacity = WORKERS * SIGNALS_PER_WORKER  # Large enough that nothing is evicted
+    backend = make_backend(capacity)
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(backend.shm_name, capacity, worker_id, results))
+                 for worker_id in range(WORKERS)]
+    for process in processes:
+        process.start()
+    popped = [signal for _ in processes for signal in results.get(timeout=60)]
+    for process in processes:
+        process.join(timeout=10)
+        assert process.exitcode == 0
+
+    popped.extend(backend.pop(capacity))
+    seen = [(signal['worker'], signal['n']) for signal in popped]
+    assert len(seen) == len(set(seen)) == WORKERS * SIGNALS_PER_WORKER
+    assert len(backend) == 0
+
+
+def test_second_process_sees_same_queue(make_backend):
+    first = make_backend(10)
+    second = make_backend(10)
+    first.push({'n': 1})
+    second.push({'n': 2})
+    assert [s['n'] for s in first.pop(10)] == [2, 1]
+    assert second.pop(10) == []
+
+
+def test_filtered_pops_are_compacted_before_evicting(make_backend):
+    backend = make_backend(4)
+    for i in range(4):
+        backend.push({'symbol': 'BTCUSDT' if i == 1 else 'ETHUSDT', 'n': i})
+    assert [s['n'] for s in backend.pop(1, symbol='BTCUSDT')] == [1]
+
+    # The hole left by the filtered pop is reused; no live signal is evicted
+    backend.push({'n': 4})
+    assert [s['n'] for s in backend.snapshot()] == [4, 3, 2, 0]
+    backend.push({'n': 5})
+    assert [s['n'] for s in backend.pop(10)] == [5, 4, 3, 2]
+
+
+def test_rejects_oversized_signal_and_mismatched_segment(make_backend):
+    backend = make_backend(4, slot_size=64)
+    with pytest.raises(ValueError):
+        backend.push({'message': 'x' * 100})
+    assert len(backend) == 0
+    with pytest.raises(ValueError):
+        SharedMemoryBackend(capacity=8, shm_name=backend.shm_name, slot_size=64)
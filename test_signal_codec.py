@@ -0,0 +1,29 @@
+"""
+Tests for signal_codec (encoded signals must match Flask's jsonify byte for byte)
+Run with: python -m pytest test_signal_codec.py
+"""
+import pytest
+
+import app
+from signal_codec import decode, encode_signal, signals_body
+
+SIGNALS = [
+    {'action': 'BUY', 'symbol': 'BTCUSDT', 'price': 45000, 'quantity': 0.1, 'strategy': 'RSI'},
+    {'price': 1e-7, 'big': 1e20, 'neg': -0.00005, 'nan': float('nan'), 'inf': float('inf')},
+    {'message': 'café ₿ 🚀 \x7f "quoted" \\ \n', 'nested': {'b': [1, 2.5, None, True], 'a': {}}},
+    {'huge': 2 ** 70, 'zero': 0.0, 'neg_zero': -0.0},
+    {'data': 'plain text alert'},
+]
+
+
+@pytest.mark.parametrize('signal', SIGNALS)
+def test_encode_matches_jsonify(signal):
+    with app.app.app_context():
+        expected = app.jsonify({'status': 'success', 'count': 1, 'signals': [signal]}).get_data()
+    assert signals_body([encode_signal(signal)]) == expected
+
+
+def test_decode_round_trip():
+    signal = SIGNALS[0]
+    assert decode(encode_signal(signal)) == signal
+    assert decode(encode_signal(signal).decode()) == signal
@@ -0,0 +1,46 @@
+"""
+Tests for signal TTLs and the timer wheel that expires them
+Run with: python -m pytest test_signal_expiry.py
+"""
+import pytest
+
+from signal_expiry import SignalTTL, TimerWheel, parse_strategy_ttls
+
+
+def test_timer_wheel_fires_each_timer_once_in_order():
+    # 4 slots x 2 levels covers 16 ticks; the 100 second timer starts in the overflow list
+    wheel = TimerWheel(resolution=1.0, slots=4, levels=2, now=0)
+    for deadline in (0.5, 3, 7.2, 15, 100, 2):
+        wheel.add(deadline, deadline)
+    assert len(wheel) == 6
+
+    assert wheel.advance(0.9) == []
+    assert wheel.advance(1) == [0.5]  # Never before the deadline, at most a tick after
+    assert wheel.advance(3) == [2, 3]
+    assert wheel.advance(7.5) == []
+    assert wheel.advance(8) == [7.2]
+    assert not wheel.due(8.5)
+    assert wheel.advance(99.9) == [15]
+    assert wheel.advance(1000) == [100]
+    assert len(wheel) == 0
+
+    wheel.add(1001, 'late')
+    wheel.add(999, 'overdue')  # Already past: fires on the next tick
+    wheel.compact(lambda item: item != 'late')
+    assert wheel.advance(1001) == ['overdue']
+    assert len(wheel) == 0
+
+
+def test_signal_ttl_precedence():
+    ttl = SignalTTL(default=60, by_strategy={'RSI': 300}, field='ttl')
+    assert ttl.seconds({'strategy': 'RSI', 'ttl': 5}) == 5
+    assert ttl.seconds({'strategy': 'RSI', 'ttl': 'soon'}) == 300  # Not a number: ignored
+    assert ttl.seconds({'strategy': 'MACD', 'ttl': -1}) == 60
+    assert ttl.deadline({'ttl': '2.5'}, 100) == 102.5
+    assert SignalTTL(field='ttl').seconds({'data': 1}) is None
+    assert not SignalTTL(default=0)
+
+    assert parse_strategy_ttls(' RSI=300, Breakout v2=60 ,') == {'RSI': 300, 'Breakout v2': 60}
+    for value in ('RSI', 'RSI=0', '=5'):
+        with pytest.raises(ValueError):
+            parse_strategy_ttls(value)
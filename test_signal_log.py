@@ -0,0 +1,120 @@
+"""
+Tests for the write-ahead log behind the durable in-memory store
+Run with: python -m pytest test_signal_log.py
+"""
+import os
+import threading
+import time
+
+import pytest
+
+from signal_log import FSYNC_POLICIES, DurableSignalStore
+
+
+@pytest.mark.parametrize('policy', FSYNC_POLICIES)
+def test_restart_restores_unconsumed_signals(tmp_path, policy):
+    store = DurableSignalStore(capacity=10, directory=str(tmp_path), fsync_policy=policy)
+    for i in range(5):
+        store.push({'symbol': 'BTCUSDT', 'n': i})
+    store.pop(2)
+    store.close()
+
+    restored = DurableSignalStore(capacity=10, directory=str(tmp_path), fsync_policy=policy)
+    assert [s['n'] for s in restored.snapshot()] == [2, 1, 0]
+    # Sequence numbers keep increasing across restarts
+    assert restored.push({'n': 5}) == 6
+    restored.close()
+
+
+def test_restart_applies_capacity(tmp_path):
+    store = DurableSignalStore(capacity=10, directory=str(tmp_path))
+    for i in range(10):
+        store.push({'n': i})
+    store.close()
+
+    restored = DurableSignalStore(capacity=3, directory=str(tmp_path))
+    assert [s['n'] for s in restored.snapshot()] == [9, 8, 7]
+    restored.close()
+
+
+def test_popped_seq_is_not_reused(tmp_path):
+    store = DurableSignalStore(capacity=10, directory=str(tmp_path))
+    store.push({'n': 0})
+    store.pop(1)
+    store.close()
+
+    store = DurableSignalStore(capacity=10, directory=str(tmp_path))
+    store.push({'n': 1})
+    store.close()
+
+    restored = DurableSignalStore(capacity=10, directory=str(tmp_path))
+    assert restored.snapshot() == [{'n': 1}]
+    restored.close()
+
+
+def test_compaction_bounds_log_size(tmp_path):
+    store = DurableSignalStore(capacity=20, directory=str(tmp_path), fsync_policy='never',
+                               segment_size=2000)
+    for i in range(2000):
+        store.push({'symbol': 'BTCUSDT', 'n': i})
+        if i % 3 == 0:
+            store.pop(1)
+    deadline = time.monotonic() + 5
+    while store.log._compacting and time.monotonic() < deadline:
+        time.sleep(0.01)
+    expected = store.snapshot()
+    store.close()
+
+    assert len(os.listdir(tmp_path)) <= 3  # snapshot + a couple of segments
+    restored = DurableSignalStore(capacity=20, directory=str(tmp_path))
+    assert restored.snapshot() == expected
+    restored.close()
+
+
+def test_truncated_record_is_ignored(tmp_path):
+    store = DurableSignalStore(capacity=10, directory=str(tmp_path))
+    store.push({'n': 0})
+    store.close()
+    segment = sorted(os.listdir(tmp_path))[-1]
+    with open(tmp_path / segment, 'ab') as f:
+        f.write(b'S\t2\t{"n": ')
+
+    restored = DurableSignalStore(capacity=10, directory=str(tmp_path))
+    assert restored.snapshot() == [{'n': 0}]
+    restored.close()
+
+
+def test_group_commit_concurrent_pushes(tmp_path):
+    store = DurableSignalStore(capacity=10000, directory=str(tmp_path), fsync_policy='group')
+
+    def produce(t):
+        for i in range(100):
+            store.push({'t': t, 'n': i})
+
+    threads = [threading.Thread(target=produce, args=(t,)) for t in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    store.close()
+
+    restored = DurableSignalStore(capacity=10000, directory=str(tmp_path))
+    assert len(restored) == 800
+    restored.close()
+
+
+def test_spilled_signals_survive_restart(tmp_path):
+    wal = tmp_path / 'wal'
+    store = DurableSignalStore(capacity=5, directory=str(wal), overflow='spill', spill_dir=str(tmp_path))
+    for i in range(20):
+        store.push({'n': i})
+    assert store.spilled == 15
+    store.close()
+
+    restored = DurableSignalStore(capacity=5, directory=str(wal), overflow='spill', spill_dir=str(tmp_path))
+    assert (len(restored), restored.spilled) == (20, 15)
+    received = []
+    while len(restored):
+        received.extend(s['n'] for s in restored.pop(100))
+    assert received == list(range(19, -1, -1))
+    restored.close()
@@ -0,0 +1,57 @@
+"""
+Tests for the compact SignalRecord representation (must round-trip exactly)
+Run with: python -m pytest test_signal_record.py
+"""
+from datetime import datetime
+
+import pytest
+
+from signal_record import SignalRecord, pack, unpack
+from signal_store import SignalStore
+
+
+def stamped(signal, moment):
+    signal['timestamp'] = moment.isoformat()
+    signal['received_at'] = moment.strftime('%Y-%m-%d %H:%M:%S')
+    return signal
+
+
+@pytest.mark.parametrize('signal', [
+    stamped({'action': 'BUY', 'symbol': 'BTCUSDT', 'price': 45000, 'quantity': 0.1, 'strategy': 'RSI'},
+            datetime(2026, 3, 29, 2, 30, 0, 123456)),
+    stamped({'symbol': 'ETHUSDT', 'price': None}, datetime(2026, 1, 1)),
+    stamped({'message': 'BUY BTCUSDT', 'raw': True}, datetime(1999, 12, 31, 23, 59, 59, 999999)),
+    {'timestamp': '2026-10-17T01:02:03.000000', 'received_at': '2026-10-17 01:02:03'},
+    {'timestamp': '2026-10-17 01:02:03', 'received_at': '2026-10-17 01:02:03'},
+    {'timestamp': '2026-10-17T01:02:03', 'received_at': 'yesterday', 'symbol': 5},
+    {'timestamp': 1760000000},
+    {'action': ['BUY'], 'nested': {'a': [1, 2.5]}},
+    {},
+])
+def test_round_trip(signal):
+    record = pack(signal)
+    assert isinstance(record, SignalRecord)
+    assert unpack(record) == signal
+
+
+def test_standard_fields_are_compacted():
+    signal = stamped({'action': 'BUY', 'symbol': 'BTC' + 'USDT', 'strategy': 'RSI'}, datetime.now())
+    record = pack(signal)
+    assert record.extra is None
+    assert isinstance(record.epoch, float)
+    assert record.symbol is pack({'symbol': ''.join(['BTC', 'USDT'])}).symbol  # Interned
+    assert pack(dict(signal, comment='hi')).extra == {'comment': 'hi'}
+
+
+def test_non_dict_signals_are_stored_as_is():
+    assert pack([1, 2]) == [1, 2]
+    assert unpack('text') == 'text'
+
+
+def test_store_serves_identical_signals():
+    store = SignalStore(capacity=10)
+    signals = [stamped({'action': 'SELL', 'symbol': 'BTCUSDT', 'n': i}, datetime.now()) for i in range(3)]
+    for signal in signals:
+        store.push(dict(signal))
+    assert store.snapshot() == signals[::-1]
+    assert store.pop(3) == signals[::-1]
@@ -0,0 +1,228 @@
+"""
+Unit tests for the in-memory SignalStore
+Run with: python -m pytest test_signal_store.py
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from signal_store import SignalStore, entry_size
+from signal_codec import encode_signal
+from signal_expiry import SignalTTL
+from storage_backends import StoreFullError
+
+
+def test_pop_returns_most_recent_first():
+    store = SignalStore(capacity=10)
+    for i in range(5):
+        store.push({'n': i})
+
+    assert [s['n'] for s in store.pop(3)] == [4, 3, 2]
+    assert [s['n'] for s in store.pop(10)] == [1, 0]
+    assert store.pop(1) == []
+
+
+def test_capacity_drops_oldest():
+    store = SignalStore(capacity=3)
+    for i in range(5):
+        store.push({'n': i})
+
+    assert len(store) == 3
+    assert [s['n'] for s in store.snapshot()] == [4, 3, 2]
+
+
+def test_snapshot_does_not_consume():
+    store = SignalStore(capacity=3)
+    store.push({'n': 1})
+    assert store.snapshot() == [{'n': 1}]
+    assert len(store) == 1
+
+
+def test_non_positive_count_pops_nothing():
+    store = SignalStore(capacity=3)
+    store.push({'n': 1})
+    assert store.pop(0) == []
+    assert store.pop(-1) == []
+    assert len(store) == 1
+
+
+def test_invalid_capacity():
+    with pytest.raises(ValueError):
+        SignalStore(capacity=0)
+
+
+def test_pop_waits_for_push():
+    store = SignalStore(capacity=3)
+    timer = threading.Timer(0.05, store.push, args=({'n': 1},))
+    timer.start()
+    started = time.monotonic()
+    assert store.pop(5, timeout=5) == [{'n': 1}]
+    assert time.monotonic() - started < 2
+    timer.join()
+
+
+def test_pop_wait_times_out_empty():
+    store = SignalStore(capacity=3)
+    started = time.monotonic()
+    assert store.pop(5, timeout=0.05) == []
+    assert time.monotonic() - started >= 0.05
+
+
+def test_filtered_pop_only_removes_matching():
+    store = SignalStore(capacity=10)
+    store.push({'symbol': 'BTCUSDT', 'strategy': 'RSI', 'n': 0})
+    store.push({'symbol': 'ETHUSDT', 'strategy': 'RSI', 'n': 1})
+    store.push({'symbol': 'BTCUSDT', 'strategy': 'MACD', 'n': 2})
+    store.push({'symbol': 'BTCUSDT', 'strategy': 'RSI', 'n': 3})
+
+    assert [s['n'] for s in store.pop(10, symbol='BTCUSDT', strategy='RSI')] == [3, 0]
+    assert [s['n'] for s in store.pop(10, strategy='RSI')] == [1]
+    assert len(store) == 1
+    assert [s['n'] for s in store.pop(10)] == [2]
+    assert store.pop(10, symbol='UNKNOWN') == []
+
+
+def test_filtered_pop_merges_partitions_newest_first():
+    store = SignalStore(capacity=10)
+    for i, strategy in enumerate(['A', 'B', 'A', 'C', 'B']):
+        store.push({'symbol': 'BTCUSDT', 'strategy': strategy, 'n': i})
+
+    assert [s['n'] for s in store.pop(3, symbol='BTCUSDT')] == [4, 3, 2]
+    assert [s['n'] for s in store.snapshot()] == [1, 0]
+
+
+def test_capacity_evicts_across_partitions():
+    store = SignalStore(capacity=2)
+    store.push({'symbol': 'A', 'n': 0})
+    store.push({'symbol': 'B', 'n': 1})
+    store.push({'symbol': 'B', 'n': 2})
+
+    assert store.pop(10, symbol='A') == []
+    assert [s['n'] for s in store.pop(10, symbol='B')] == [2, 1]
+
+
+def test_filtered_wait_ignores_other_symbols():
+    store = SignalStore(capacity=10)
+    threading.Timer(0.02, store.push, args=({'symbol': 'ETHUSDT'},)).start()
+    threading.Timer(0.05, store.push, args=({'symbol': 'BTCUSDT'},)).start()
+    assert store.pop(5, timeout=5, symbol='BTCUSDT') == [{'symbol': 'BTCUSDT'}]
+    assert len(store) == 1
+
+
+def test_concurrent_consumers_never_duplicate():
+    store = SignalStore(capacity=100000)
+    symbols = ['A', 'B', 'C']
+    received = []
+
+    def produce():
+        for i in range(3000):
+            store.push({'symbol': symbols[i % 3], 'strategy': 'S', 'n': i})
+
+    def consume(symbol):
+        for _ in range(2000):
+            received.extend(s['n'] for s in store.pop(7, symbol=symbol))
+
+    threads = [threading.Thread(target=produce)]
+    threads += [threading.Thread(target=consume, args=(s,)) for s in symbols + [None]]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    received.extend(s['n'] for s in store.pop(100000))
+
+    assert sorted(received) == list(range(3000))
+
+
+def test_reject_policy_refuses_when_full():
+    store = SignalStore(capacity=3, overflow='reject')
+    store.push_many([{'n': 0}, {'n': 1}])
+    with pytest.raises(StoreFullError):
+        store.push_many([{'n': 2}, {'n': 3}])  # All or nothing
+    store.push({'n': 2})
+    with pytest.raises(StoreFullError):
+        store.push({'n': 3})
+
+    assert (store.rejected, store.dropped) == (3, 0)
+    assert [s['n'] for s in store.pop(10)] == [2, 1, 0]
+
+
+def test_filtered_pop_in_flight_frees_its_room():
+    store = SignalStore(capacity=3, overflow='reject')
+    store.push_many([{'symbol': 'ETHUSDT'}, {'symbol': 'BTCUSDT'}, {'symbol': 'BTCUSDT'}])
+    popped = []
+    with store._lock:
+        # The pop claims its entries, then waits for the global lock to settle them
+        popper = threading.Thread(target=lambda: popped.extend(store.pop(2, symbol='BTCUSDT')))
+        popper.start()
+        while not store._unsettled:
+            time.sleep(0.001)
+        store._check_room(2, 0)  # A push now must not count the claimed signals
+        assert not store._over_budget()
+    popper.join(5)
+    assert len(popped) == 2
+    store.push_many([{'symbol': 'SOLUSDT'}, {'symbol': 'SOLUSDT'}])
+    assert (len(store), store.rejected, store.dropped) == (3, 0, 0)
+
+
+def test_memory_budget_drops_oldest():
+    size = entry_size(encode_signal({'n': 0}))
+    store = SignalStore(capacity=1000, max_bytes=size * 5)
+    for i in range(8):
+        store.push({'n': i})
+
+    assert len(store) == 5
+    assert store.dropped == 3
+    assert [s['n'] for s in store.pop(10)] == [7, 6, 5, 4, 3]
+
+
+def test_spill_policy_pages_signals_back_in(tmp_path):
+    store = SignalStore(capacity=10, overflow='spill', spill_dir=str(tmp_path))
+    for i in range(100):
+        store.push({'n': i, 'symbol': 'BTCUSDT' if i % 2 else 'ETHUSDT'})
+    assert (len(store), store.spilled, store.dropped) == (100, 90, 0)
+    assert [s['n'] for s in store.snapshot()] == list(range(99, -1, -1))
+    assert store.oldest_age() >= 0
+
+    received = []
+    while True:
+        batch = store.pop(7)
+        if not batch:
+            break
+        received.extend(s['n'] for s in batch)
+    assert received == list(range(99, -1, -1))
+    assert (len(store), store.spilled, store.spilled_total) == (0, 0, 90)
+
+    store.push({'n': 100})
+    store.close()
+    assert os.listdir(tmp_path) == []
+
+
+def test_ttl_expires_signals_without_serving_them(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    store = SignalStore(capacity=10, ttl=SignalTTL(default=10, by_strategy={'Scalp': 2}, field='ttl'))
+    store.push({'n': 0})
+    store.push_many([{'n': 1, 'strategy': 'Scalp'}, {'n': 2, 'ttl': 0.5}, {'n': 3, 'ttl': 60}])
+
+    now[0] += 0.6
+    # n=2 is past its deadline but the wheel hasn't ticked yet: skipped all the same
+    assert [s['n'] for s in store.pop(2)] == [3, 1]
+    assert store.expired == 1
+    store.push({'n': 4, 'strategy': 'Scalp'})
+    now[0] += 2.5
+    assert store.pop(10, strategy='Scalp') == []
+    assert len(store) == 1
+    now[0] += 10
+    assert (len(store), store.snapshot(), store.expired) == (0, [], 3)
+
+
+def test_ttl_counts_from_timestamp_on_restore():
+    store = SignalStore(capacity=10, ttl=SignalTTL(default=60))
+    stale = datetime.now() - timedelta(minutes=10)
+    store.restore([(1, {'n': 0, 'timestamp': stale.isoformat()}),
+                   (2, {'n': 1, 'timestamp': datetime.now().isoformat()})])
+    assert [s['n'] for s in store.pop(10)] == [1]
+    assert store.expired == 1
@@ -0,0 +1,111 @@
+"""
+Tests for the /signals/stream Server-Sent Events endpoint
+Run with: python -m pytest test_signal_stream.py -s  (-s prints the latency report)
+"""
+import asyncio
+import statistics
+import threading
+import time
+
+import pytest
+from werkzeug.serving import make_server
+
+import app
+from example_stream_client import stream_signals
+from signal_stream import EVENT_OVERHEAD, SignalBroadcaster
+
+
+@pytest.fixture
+def server():
+    """Run the Flask app on a random local port in a background thread"""
+    httpd = make_server('127.0.0.1', 0, app.app, threaded=True)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_port}'
+    httpd.shutdown()
+
+
+def test_slow_subscriber_is_bounded():
+    broadcaster = SignalBroadcaster(buffer_size=3)
+    subscription = broadcaster.subscribe()
+    for i in range(5):
+        broadcaster.publish({'n': i})
+
+    events, dropped = subscription.get(timeout=0)
+    assert [event_id for event_id, _ in events] == [3, 4, 5]
+    assert dropped == 2
+
+
+def test_resume_from_last_event_id():
+    broadcaster = SignalBroadcaster(replay_size=10)
+    for i in range(5):
+        broadcaster.publish({'n': i})
+
+    events, dropped = broadcaster.subscribe(last_id=3).get(timeout=0)
+    assert [event_id for event_id, _ in events] == [4, 5]
+    assert dropped == 0
+
+
+def test_replay_memory_budget():
+    broadcaster = SignalBroadcaster(replay_size=10, max_bytes=(EVENT_OVERHEAD + len(b'{"n":0}')) * 3)
+    for i in range(5):
+        broadcaster.publish({'n': i})
+
+    events, dropped = broadcaster.subscribe(last_id=0).get(timeout=0)
+    assert [event_id for event_id, _ in events] == [3, 4, 5]
+    assert dropped == 2
+
+
+def test_concurrent_publishers_deliver_in_id_order():
+    broadcaster = SignalBroadcaster(replay_size=4000, buffer_size=4000)
+    subscription = broadcaster.subscribe()
+    publishers = [threading.Thread(target=lambda: [broadcaster.publish({'n': i}) for i in range(1000)])
+                  for _ in range(4)]
+    for publisher in publishers:
+        publisher.start()
+    for publisher in publishers:
+        publisher.join()
+
+    events, dropped = subscription.get(timeout=0)
+    assert [event_id for event_id, _ in events] == list(range(1, 4001))
+    assert dropped == 0
+
+
+def test_webhook_to_stream_latency(server):
+    count = 50
+    latencies = []
+
+    async def consume():
+        received = 0
+        stream = stream_signals(server, reconnect=False)
+        async for signal in stream:
+            latencies.append(time.perf_counter() - signal['sent_at'])
+            received += 1
+            if received == count:
+                await stream.aclose()
+                return
+
+    def produce():
+        deadline = time.monotonic() + 5
+        while not len(app._broadcaster) and time.monotonic() < deadline:
+            time.sleep(0.01)  # Wait for the stream to subscribe
+        client = app.app.test_client()
+        for i in range(count):
+            client.post('/webhook', json={'symbol': 'BTCUSDT', 'n': i, 'sent_at': time.perf_counter()})
+            time.sleep(0.005)
+
+    async def run():
+        producer = threading.Thread(target=produce)
+        producer.start()
+        await asyncio.wait_for(consume(), timeout=10)
+        producer.join()
+
+    asyncio.run(run())
+    app.pop_signals(count)
+
+    assert len(latencies) == count
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f'\nwebhook -> stream delivery: p50={p50:.2f}ms p99={p99:.2f}ms max={latencies[-1] * 1000:.2f}ms')
+    assert p99 < 500
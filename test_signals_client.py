@@ -0,0 +1,185 @@
+"""
+Tests for the signals consumer client library
+Run with: python -m pytest test_signals_client.py
+"""
+import asyncio
+import json
+import threading
+
+import pytest
+from werkzeug.serving import make_server
+
+import app
+from signals_client import AsyncSignalsClient, SignalsClient, SignalsClientError
+
+
+def serve(wsgi_app):
+    httpd = make_server('127.0.0.1', 0, wsgi_app, threaded=True)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd, f'http://127.0.0.1:{httpd.server_port}'
+
+
+@pytest.fixture
+def server():
+    """Run the Flask app on a random local port in a background thread"""
+    app._store.clear()
+    httpd, url = serve(app.app)
+    yield url
+    httpd.shutdown()
+    app._store.clear()
+
+
+@pytest.fixture
+def flaky():
+    """A server answering 503 (with Retry-After: 0) to the first two requests"""
+    calls = []
+
+    def wsgi_app(environ, start_response):
+        calls.append(environ['QUERY_STRING'])
+        if len(calls) <= 2:
+            start_response('503 Service Unavailable', [('Retry-After', '0'), ('Content-Length', '0')])
+            return [b'']
+        body = json.dumps({'status': 'success', 'count': 1, 'signals': [{'n': 1}]}).encode()
+        start_response('200 OK', [('Content-Type', 'application/json'), ('Content-Length', str(len(body)))])
+        return [body]
+
+    httpd, url = serve(wsgi_app)
+    yield url, calls
+    httpd.shutdown()
+
+
+def post(count):
+    client = app.app.test_client()
+    for i in range(count):
+        client.post('/webhook', json={'symbol': 'BTCUSDT', 'n': i})
+
+
+def test_batch_size_follows_the_backlog(server):
+    post(100)
+    with SignalsClient(server, min_limit=10, max_limit=40) as client:
+        sizes = [len(client.fetch()) for _ in range(4)]
+        assert sizes == [10, 20, 40, 30]
+        assert client.limit == 40
+        client.fetch()
+        client.fetch()
+        assert client.limit == 10
+
+
+def test_iter_signals_yields_each_batch_in_arrival_order(server):
+    post(25)
+    with SignalsClient(server, min_limit=10) as client:
+        signals = client.iter_signals(wait=1)
+        received = [next(signals)['n'] for _ in range(25)]
+    # /signals serves the most recent first: 15-24, then the rest (the limit doubled to 20)
+    assert received == list(range(15, 25)) + list(range(15))
+
+
+def test_filters_and_explicit_limit(server):
+    post(3)
+    app.app.test_client().post('/webhook', json={'symbol': 'ETHUSDT'})
+    with SignalsClient(server, symbol='ETHUSDT') as client:
+        assert [s['symbol'] for s in client.fetch(limit=5)] == ['ETHUSDT']
+        assert client.limit == client.min_limit
+    assert len(app._store) == 3
+
+
+def test_retries_with_retry_after(flaky):
+    url, calls = flaky
+    with SignalsClient(url) as client:
+        assert client.fetch() == [{'n': 1}]
+    assert len(calls) == 3
+
+    calls.clear()
+    with SignalsClient(url, max_retries=1) as client, pytest.raises(SignalsClientError):
+        client.fetch()
+
+
+def test_gives_up_on_connection_errors():
+    client = SignalsClient('http://127.0.0.1:9', max_retries=2, backoff=0.01, timeout=1)
+    with pytest.raises(SignalsClientError):
+        client.fetch()
+
+
+def test_retry_delay_is_jittered_and_capped():
+    client = SignalsClient(backoff=1, max_backoff=4)
+    delays = [client._retry_delay(10) for _ in range(100)]
+    assert all(0 <= delay <= 4 for delay in delays)
+    assert len(set(delays)) > 1
+    assert client._retry_delay(0, retry_after=2.5) == 2.5
+
+
+def test_async_client(server):
+    post(5)
+
+    async def run():
+        received = []
+        async with AsyncSignalsClient(server) as client:
+            async for signal in client.iter_signals(wait=1):
+                received.append(signal['n'])
+                if len(received) == 5:
+                    break
+            assert await client.fetch() == []
+        return received
+
+    assert asyncio.run(run()) == list(range(5))
+
+
+def test_async_client_reuses_connections():
+    """The development server closes every connection, so use a minimal keep-alive one"""
+    connections = []
+    body = json.dumps({'status': 'success', 'count': 0, 'signals': []}).encode()
+
+    async def handle(reader, writer):
+        connections.append(writer)
+        try:
+            while await reader.readuntil(b'\r\n\r\n'):
+                writer.write(b'HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n%s' % (len(body), body))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    async def run():
+        server = await asyncio.start_server(handle, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        async with AsyncSignalsClient(f'http://127.0.0.1:{port}') as client:
+            for _ in range(5):
+                assert await client.fetch() == []
+            assert len(connections) == 1
+            connections[0].close()  # The server drops the idle connection
+            await asyncio.sleep(0.01)
+            assert await client.fetch() == []
+            assert len(connections) == 2
+        server.close()
+
+    asyncio.run(run())
+
+
+def test_async_client_does_not_resend_on_a_fresh_connection():
+    """The server may have removed the signals before the connection failed, so only a stale one is retried"""
+    connections = []
+
+    async def handle(reader, writer):
+        connections.append(writer)
+        await reader.readuntil(b'\r\n\r\n')
+        writer.close()  # Request read (signals popped), response lost
+
+    async def run():
+        server = await asyncio.start_server(handle, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        async with AsyncSignalsClient(f'http://127.0.0.1:{port}', max_retries=0) as client:
+            with pytest.raises(SignalsClientError):
+                await client.fetch()
+        server.close()
+
+    asyncio.run(run())
+    assert len(connections) == 1
+
+
+def test_async_client_retries(flaky):
+    url, calls = flaky
+
+    async def run():
+        async with AsyncSignalsClient(url) as client:
+            return await client.fetch()
+
+    assert asyncio.run(run()) == [{'n': 1}]
+    assert len(calls) == 3
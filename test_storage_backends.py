@@ -0,0 +1,134 @@
+"""
+Contract tests run against every storage backend
+Run with: python -m pytest test_storage_backends.py
+
+The shared-memory backend gets a fresh segment per test. The Redis backend is
+tested against an in-process fakeredis server, or against a real redis-server
+when REDIS_TEST_URL is set (e.g. redis://localhost:6379/15; the test key is
+deleted after each test).
+"""
+import os
+import threading
+import uuid
+
+import pytest
+
+from signal_expiry import SignalTTL
+from signal_store import SignalStore
+from storage_backends import StoreFullError, create_backend
+
+REDIS_TEST_URL = os.environ.get('REDIS_TEST_URL')
+
+
+def redis_client():
+    if REDIS_TEST_URL:
+        redis = pytest.importorskip('redis')
+        return redis.Redis.from_url(REDIS_TEST_URL)
+    fakeredis = pytest.importorskip('fakeredis')
+    pytest.importorskip('lupa')  # fakeredis needs it for the filtered-pop Lua script
+    return fakeredis.FakeRedis()
+
+
+@pytest.fixture(params=['memory', 'redis', 'shm'])
+def make_backend(request):
+    backends = []
+
+    def make(capacity, overflow='drop-oldest'):
+        if request.param == 'memory':
+            backend = SignalStore(capacity=capacity, overflow=overflow)
+        elif request.param == 'shm':
+            from shm_backend import SharedMemoryBackend
+            backend = SharedMemoryBackend(capacity=capacity, shm_name=f'test_signals_{uuid.uuid4().hex[:12]}',
+                                          overflow=overflow)
+        else:
+            if overflow != 'drop-oldest':
+                pytest.skip('The redis backend only supports drop-oldest')
+            from redis_backend import RedisBackend
+            backend = RedisBackend(capacity=capacity, client=redis_client(), key='test:signals:list')
+            backend.clear()
+        backends.append(backend)
+        return backend
+
+    yield make
+    for backend in backends:
+        backend.clear()
+        if request.param == 'shm':
+            backend.unlink()
+            backend.close()
+            os.remove(backend.lock_path)
+
+
+def test_push_pop_newest_first(make_backend):
+    backend = make_backend(10)
+    for i in range(5):
+        backend.push({'n': i})
+
+    assert len(backend) == 5
+    assert [s['n'] for s in backend.pop(3)] == [4, 3, 2]
+    assert [s['n'] for s in backend.snapshot()] == [1, 0]
+    assert backend.pop(0) == []
+
+
+def test_capacity_trims_oldest(make_backend):
+    backend = make_backend(3)
+    for i in range(5):
+        backend.push({'n': i})
+
+    assert [s['n'] for s in backend.pop(10)] == [4, 3, 2]
+    assert backend.dropped == 2
+
+
+def test_push_many(make_backend):
+    backend = make_backend(3)
+    backend.push({'n': 0})
+    backend.push_many([{'symbol': 'BTCUSDT', 'n': i} for i in range(1, 5)])
+
+    assert [s['n'] for s in backend.snapshot()] == [4, 3, 2]
+    assert [s['n'] for s in backend.pop(10, symbol='BTCUSDT')] == [4, 3, 2]
+
+
+def test_filtered_pop(make_backend):
+    backend = make_backend(10)
+    backend.push({'symbol': 'BTCUSDT', 'strategy': 'RSI', 'n': 0})
+    backend.push({'symbol': 'ETHUSDT', 'strategy': 'RSI', 'n': 1})
+    backend.push({'symbol': 'BTCUSDT', 'strategy': 'MACD', 'n': 2})
+
+    assert [s['n'] for s in backend.pop(10, symbol='BTCUSDT', strategy='RSI')] == [0]
+    assert [s['n'] for s in backend.pop(10, symbol='BTCUSDT')] == [2]
+    assert [s['n'] for s in backend.pop(10)] == [1]
+
+
+def test_pop_waits_for_push(make_backend):
+    backend = make_backend(10)
+    timer = threading.Timer(0.05, backend.push, args=({'n': 1},))
+    timer.start()
+    assert backend.pop(5, timeout=3) == [{'n': 1}]
+    timer.join()
+
+
+def test_create_backend_rejects_unknown_name():
+    with pytest.raises(ValueError):
+        create_backend('sqlite', capacity=10)
+
+
+def test_reject_overflow(make_backend):
+    backend = make_backend(2, overflow='reject')
+    backend.push_many([{'n': 0}, {'n': 1}])
+    with pytest.raises(StoreFullError):
+        backend.push({'n': 2})
+    assert (len(backend), backend.rejected, backend.dropped) == (2, 1, 0)
+    backend.pop(1)
+    backend.push({'n': 2})
+    assert [s['n'] for s in backend.pop(10)] == [2, 0]
+
+
+@pytest.mark.parametrize('name, options', [
+    ('memory', {'overflow': 'evict'}),
+    ('redis', {'overflow': 'reject'}),
+    ('redis', {'max_bytes': 1 << 20}),
+    ('shm', {'overflow': 'spill'}),
+    ('shm', {'ttl': SignalTTL(default=60)}),
+])
+def test_create_backend_rejects_unsupported_overflow(name, options):
+    with pytest.raises(ValueError):
+        create_backend(name, capacity=10, **options)
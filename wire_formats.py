@@ -0,0 +1,96 @@
+"""
+Response formats for GET /signals, chosen by content negotiation
+
+    Accept: application/json        (default) {"count":N,"signals":[...],"status":"success"}
+    Accept: application/x-ndjson    one signal per line, streamed (also application/ndjson)
+    Accept: application/msgpack     the JSON document's structure in MessagePack
+                                    (also application/x-msgpack; needs the msgpack package)
+
+and, for bodies of at least SIGNALS_COMPRESS_MIN_BYTES,
+
+    Accept-Encoding: gzip / deflate
+
+A client that asks for nothing in particular gets JSON, uncompressed, exactly
+as before. Signals are already encoded once at ingest (signal_codec), so JSON
+and NDJSON bodies are joined from those bytes; NDJSON goes out in slices of
+NDJSON_CHUNK_SIGNALS lines, so the first signals are on the wire while the
+rest are still being joined (and compressed). Small bodies aren't compressed:
+below about one TCP segment it saves nothing worth the CPU.
+"""
+import json
+import zlib
+
+from werkzeug.datastructures import Accept, MIMEAccept
+from werkzeug.http import parse_accept_header
+
+try:
+    import msgpack
+except ImportError:  # Optional: without it MessagePack isn't offered
+    msgpack = None
+
+JSON = 'application/json'
+NDJSON = 'application/x-ndjson'
+MSGPACK = 'application/msgpack'
+# Other names clients use for the same formats
+_ALIASES = {'application/ndjson': NDJSON, 'application/jsonlines': NDJSON, 'application/x-msgpack': MSGPACK}
+# What this process can produce; for `*/*` the first wins
+OFFERED = [JSON, NDJSON, 'application/ndjson', 'application/jsonlines']
+if msgpack is not None:
+    OFFERED += [MSGPACK, 'application/x-msgpack']
+
+DEFAULT_COMPRESS_MIN_BYTES = 1400
+DEFAULT_COMPRESS_LEVEL = 6
+NDJSON_CHUNK_SIGNALS = 100
+
+# zlib wbits: gzip wraps deflate in a gzip header; HTTP's "deflate" is the zlib format
+_WBITS = {'gzip': 16 + zlib.MAX_WBITS, 'deflate': zlib.MAX_WBITS}
+
+
+def choose_format(accept):
+    """JSON, NDJSON or MSGPACK for a parsed Accept header (JSON if nothing offered matches)"""
+    best = accept.best_match(OFFERED, default=JSON)
+    return _ALIASES.get(best, best)
+
+
+def choose_encoding(accept_encoding, size, min_bytes=DEFAULT_COMPRESS_MIN_BYTES):
+    """'gzip', 'deflate' or None for a body of `size` bytes and a parsed Accept-Encoding header (0 = never)"""
+    if not min_bytes or size < min_bytes:
+        return None
+    return accept_encoding.best_match(['gzip', 'deflate'])
+
+
+def parse_accept(value):
+    return parse_accept_header(value, MIMEAccept)
+
+
+def parse_accept_encoding(value):
+    return parse_accept_header(value, Accept)
+
+
+def msgpack_body(fragments):
+    """MessagePack body for encoded signals, decoded with one json.loads over the joined bytes"""
+    signals = json.loads(b'[' + b','.join(fragments) + b']')
+    return msgpack.packb({'count': len(signals), 'signals': signals, 'status': 'success'})
+
+
+def ndjson_chunks(fragments, chunk_signals=NDJSON_CHUNK_SIGNALS):
+    """Yield an NDJSON body a slice of encoded signals at a time"""
+    for start in range(0, len(fragments), chunk_signals):
+        yield b'\n'.join(fragments[start:start + chunk_signals]) + b'\n'
+
+
+def ndjson_size(fragments):
+    return sum(len(fragment) for fragment in fragments) + len(fragments)
+
+
+def compress(body, encoding, level=DEFAULT_COMPRESS_LEVEL):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, _WBITS[encoding])
+    return compressor.compress(body) + compressor.flush()
+
+
+def compress_chunks(chunks, encoding, level=DEFAULT_COMPRESS_LEVEL):
+    """Compress a streamed body, flushing after each chunk so the client can decode it as it arrives"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, _WBITS[encoding])
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()